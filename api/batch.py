@@ -0,0 +1,192 @@
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from joke_app.cache_versions import bump_versions
+from joke_app.models import Joke, FavouriteJoke, FavouriteBucket
+
+OPERATIONS = ('add', 'remove')
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_operations(payload, max_items):
+    """Validate the request body; returns ``(index, op, joke_id, text, error)`` tuples."""
+    operations = payload.get('operations') if isinstance(payload, dict) else payload
+    if not isinstance(operations, list):
+        raise BatchError("expected a list of operations")
+    if len(operations) > max_items:
+        raise BatchError(f"at most {max_items} operations per batch")
+
+    parsed = []
+    for index, item in enumerate(operations):
+        if not isinstance(item, dict) or item.get('op') not in OPERATIONS:
+            parsed.append((index, None, None, None, f"op must be one of: {', '.join(OPERATIONS)}"))
+            continue
+
+        joke_id, text = item.get('joke_id'), item.get('joke')
+        if joke_id is not None:
+            if isinstance(joke_id, bool) or not isinstance(joke_id, int):
+                parsed.append((index, item['op'], None, None, "joke_id must be an integer"))
+                continue
+            text = None
+        elif not isinstance(text, str) or not Joke.normalize(text):
+            parsed.append((index, item['op'], None, None, "joke_id or joke text is required"))
+            continue
+        parsed.append((index, item['op'], joke_id, text, None))
+    return parsed
+
+
+def apply_batch(user, operations):
+    """Apply add/remove operations for ``user`` in one transaction.
+
+    Operations are applied in order, so a later op on the same joke sees the
+    effect of an earlier one. The number of queries does not depend on the
+    batch size: jokes to add are resolved with one insert and one select
+    and jokes to remove with one select, the user's current favourites with
+    one select, and the net difference is written with one bulk insert
+    (followed by a select of what it inserted outside PostgreSQL), one
+    ``DELETE ... WHERE IN``, one counter update and one batch of bucket
+    upserts per direction. Only favourites actually inserted are counted,
+    so a concurrent add of the same joke does not make the counter drift.
+
+    Bulk writes skip the model signals, so popularity counters, trending
+    buckets and cache versions are updated here.
+    """
+    with transaction.atomic():
+        ids_by_hash = _resolve_texts([text for _, op, _, text, error in operations
+                                      if text and not error and op == 'add'])
+        ids_by_hash.update(_find_texts([text for _, op, _, text, error in operations
+                                        if text and not error and op == 'remove']))
+        known_ids = _existing_joke_ids([joke_id for _, _, joke_id, _, error in operations
+                                        if joke_id is not None and not error])
+
+        resolved = []
+        for index, op, joke_id, text, error in operations:
+            if text is not None:
+                joke_id = ids_by_hash.get(Joke.hash_text(text))
+                if joke_id is None:
+                    error = "joke not found"
+            elif not error and joke_id not in known_ids:
+                error = "joke not found"
+            resolved.append((index, op, joke_id, error))
+
+        referenced = {joke_id for _, _, joke_id, error in resolved if not error}
+        added_at = dict(
+            FavouriteJoke.objects.select_for_update()
+            .filter(owner=user, joke_id__in=referenced)
+            .values_list('joke_id', 'created_at')
+        ) if referenced else {}
+        current = set(added_at)
+
+        state = set(current)
+        results = []
+        for index, op, joke_id, error in resolved:
+            if error:
+                results.append({'index': index, 'op': op, 'joke_id': joke_id,
+                                'status': 'invalid', 'detail': error})
+                continue
+            if op == 'add':
+                status = 'exists' if joke_id in state else 'added'
+                state.add(joke_id)
+            else:
+                status = 'removed' if joke_id in state else 'not_found'
+                state.discard(joke_id)
+            results.append({'index': index, 'op': op, 'joke_id': joke_id, 'status': status})
+
+        added = state - current
+        removed = current - state
+        if added:
+            now = timezone.now()
+            inserted = _insert_favourites(user, added, now)
+            # A concurrent add may have inserted some of them since the select
+            for result in results:
+                if result['status'] == 'added' and result['joke_id'] not in inserted:
+                    result['status'] = 'exists'
+            added = inserted
+        if added:
+            Joke.objects.filter(id__in=added).update(favourite_count=F('favourite_count') + 1)
+            FavouriteBucket.objects.record([(joke_id, now) for joke_id in added], 1)
+        if removed:
+            _delete_favourites(user, removed)
+            Joke.objects.filter(id__in=removed, favourite_count__gt=0).update(
+                favourite_count=F('favourite_count') - 1
+            )
+            FavouriteBucket.objects.record([(joke_id, added_at[joke_id]) for joke_id in removed], -1)
+
+    if added or removed:
+        bump_versions(user.id)
+    return results
+
+
+def _resolve_texts(texts):
+    if not texts:
+        return {}
+    jokes = {}
+    for text in texts:
+        text = Joke.normalize(text)
+        jokes.setdefault(Joke.hash_text(text), text)
+
+    Joke.objects.bulk_create(
+        [Joke(text=text, content_hash=content_hash) for content_hash, text in jokes.items()],
+        ignore_conflicts=True,
+    )
+    return dict(
+        Joke.objects.filter(content_hash__in=jokes).values_list('content_hash', 'id')
+    )
+
+
+def _find_texts(texts):
+    """``{content_hash: id}`` of the texts already in the catalog; nothing is inserted."""
+    if not texts:
+        return {}
+    hashes = {Joke.hash_text(text) for text in texts}
+    return dict(Joke.objects.filter(content_hash__in=hashes).values_list('content_hash', 'id'))
+
+
+def _insert_favourites(user, joke_ids, now):
+    """Insert the favourites that do not exist yet; returns the joke ids actually inserted."""
+    connection = connections[FavouriteJoke.objects.db]
+    if connection.vendor == 'postgresql':
+        table = connection.ops.quote_name(FavouriteJoke._meta.db_table)
+        created_at = connection.ops.adapt_datetimefield_value(now)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (owner_id, joke_id, created_at) VALUES "
+                f"{', '.join(['(%s, %s, %s)'] * len(joke_ids))} "
+                "ON CONFLICT (owner_id, joke_id) DO NOTHING RETURNING joke_id",
+                [value for joke_id in joke_ids for value in (user.id, joke_id, created_at)],
+            )
+            return {joke_id for joke_id, in cursor.fetchall()}
+
+    FavouriteJoke.objects.bulk_create(
+        [FavouriteJoke(owner=user, joke_id=joke_id, created_at=now) for joke_id in joke_ids],
+        ignore_conflicts=True,
+    )
+    # Rows skipped as conflicts carry their own, earlier created_at
+    return set(
+        FavouriteJoke.objects.filter(owner=user, joke_id__in=joke_ids, created_at=now)
+        .values_list('joke_id', flat=True)
+    )
+
+
+def _delete_favourites(user, joke_ids):
+    """One ``DELETE ... WHERE IN``.
+
+    Raw SQL, not ``QuerySet.delete()``: that loads the rows to send
+    post_delete, whose receivers would adjust the counters a second time.
+    """
+    connection = connections[FavouriteJoke.objects.db]
+    table = connection.ops.quote_name(FavouriteJoke._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE owner_id = %s AND joke_id IN ({', '.join(['%s'] * len(joke_ids))})",
+            [user.id, *joke_ids],
+        )
+
+
+def _existing_joke_ids(joke_ids):
+    if not joke_ids:
+        return set()
+    return set(Joke.objects.filter(id__in=joke_ids).values_list('id', flat=True))
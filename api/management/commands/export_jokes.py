@@ -0,0 +1,64 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.streaming import EXPORTS, EXPORT_FORMATS, export_chunks, gzip_chunks
+
+
+def open_target(path):
+    """Binary stream of ``path``, ``-`` for stdout."""
+    if path == '-':
+        return open(sys.stdout.fileno(), 'wb', closefd=False)
+    return open(path, 'wb')
+
+
+class Command(BaseCommand):
+    help = (
+        "Export a user's favourites, or the popularity of every favourited "
+        "joke, as CSV or JSONL. Rows are read through a server-side cursor "
+        "and written as they arrive, optionally gzipped, so memory does not "
+        "grow with the export."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(EXPORTS))
+        parser.add_argument('--user', help='Username whose favourites are exported.')
+        parser.add_argument(
+            '--format', dest='file_format', choices=sorted(EXPORT_FORMATS),
+            help='Output format; detected from the file extension by default, else jsonl.',
+        )
+        parser.add_argument('--output', default='-', help='File to write, - for stdout (the default).')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output; implied by a .gz output.')
+
+    def handle(self, *args, table, user, file_format, output, gzip, **options):
+        compress = gzip or output.endswith('.gz')
+        name = output[:-3] if output.endswith('.gz') else output
+        file_format = file_format or next(
+            (extension for extension in EXPORT_FORMATS if name.endswith(f'.{extension}')), 'jsonl'
+        )
+
+        args = ()
+        if table == 'favourites':
+            if not user:
+                raise CommandError("Exporting favourites needs --user")
+            try:
+                args = (User.objects.get(username=user).id,)
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {user}")
+        elif user:
+            raise CommandError(f"--user only applies to favourites, not {table}")
+
+        fields, rows = EXPORTS[table]
+        chunks = export_chunks(rows(*args), fields, file_format)
+        if output == '-' and not compress:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        data = gzip_chunks(chunks) if compress else (chunk.encode('utf-8') for chunk in chunks)
+        try:
+            with open_target(output) as target:
+                for chunk in data:
+                    target.write(chunk)
+        except OSError as error:
+            raise CommandError(f"Writing {output} failed: {error}")
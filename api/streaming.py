@@ -0,0 +1,142 @@
+import csv
+import io
+import json
+import zlib
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from joke_app.models import Joke, FavouriteJoke
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+
+
+def user_page(after=0, limit=DEFAULT_PAGE_SIZE):
+    """One keyset page of users with id > ``after``, in primary-key order.
+
+    The joke count is a correlated subquery on the owner index, so the
+    cost of a page does not depend on the size of the user table.
+    """
+    joke_count = FavouriteJoke.objects.filter(
+        owner=OuterRef('pk')
+    ).order_by().values('owner').annotate(total=Count('id')).values('total')
+
+    return list(
+        User.objects.filter(pk__gt=after).order_by('pk').annotate(
+            joke_count=Coalesce(Subquery(joke_count, output_field=IntegerField()), 0)
+        ).values('id', 'username', 'joke_count')[:limit]
+    )
+
+
+def iter_users(after=0, chunk_size=STREAM_CHUNK_SIZE):
+    while True:
+        page = user_page(after, chunk_size)
+        yield from page
+        if len(page) < chunk_size:
+            return
+        after = page[-1]['id']
+
+
+def iter_favourites(user_id, chunk_size=STREAM_CHUNK_SIZE):
+    """A user's favourites in the order they were added, read through a server-side cursor."""
+    favourites = FavouriteJoke.objects.filter(owner_id=user_id).order_by('id').values_list(
+        'joke_id', 'joke__text', 'created_at'
+    )
+    for joke_id, text, created_at in favourites.iterator(chunk_size=chunk_size):
+        yield {'joke_id': joke_id, 'text': text, 'added_at': created_at and created_at.isoformat()}
+
+
+def iter_popularity(chunk_size=STREAM_CHUNK_SIZE):
+    """Every favourited joke, most popular first, read through a server-side cursor."""
+    jokes = Joke.objects.filter(favourite_count__gt=0).order_by('-favourite_count', 'id').values(
+        'id', 'text', 'favourite_count'
+    )
+    for joke in jokes.iterator(chunk_size=chunk_size):
+        yield {'joke_id': joke['id'], 'text': joke['text'], 'favourite_count': joke['favourite_count']}
+
+
+# Name: (columns, rows); rows are called with the user id, or nothing for global tables
+EXPORTS = {
+    'favourites': (('joke_id', 'text', 'added_at'), iter_favourites),
+    'popularity': (('joke_id', 'text', 'favourite_count'), iter_popularity),
+}
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def export_chunks(rows, fields, file_format):
+    return csv_chunks(rows, fields) if file_format == 'csv' else ndjson_chunks(rows)
+
+
+def ndjson_chunks(rows, rows_per_chunk=STREAM_CHUNK_SIZE):
+    for batch in _batched(rows, rows_per_chunk):
+        yield ''.join(json.dumps(row) + '\n' for row in batch)
+
+
+def json_array_chunks(rows, rows_per_chunk=STREAM_CHUNK_SIZE):
+    yield '['
+    separator = ''
+    for batch in _batched(rows, rows_per_chunk):
+        yield separator + ','.join(json.dumps(row) for row in batch)
+        separator = ','
+    yield ']'
+
+
+def csv_chunks(rows, fields, rows_per_chunk=STREAM_CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fields)
+    writer.writeheader()
+    for batch in _batched(rows, rows_per_chunk):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress text chunks into one gzip stream as they are produced."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(request, chunks):
+    """``chunks`` in the form the server consumes one at a time.
+
+    Under ASGI, Django would read a sync iterator to the end with
+    ``sync_to_async(list)`` before sending anything, so there each chunk
+    is produced in the sync thread instead, as the client reads.
+    """
+    if isinstance(request, ASGIRequest):
+        return _async_chunks(iter(chunks))
+    return chunks
+
+
+async def _async_chunks(chunks):
+    # thread_sensitive: the server-side cursor belongs to the sync thread's connection
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,47 @@
+import csv
+import gzip
+import json
+import pytest
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from joke_app.models import Joke, FavouriteJoke
+
+
+@pytest.mark.django_db
+class TestExportJokes:
+    @pytest.fixture
+    def user(self):
+        user = User.objects.create_user(username='myuser', password='Str0ngP@ssw0rd123!')
+        for text in ('First joke', 'Second joke'):
+            FavouriteJoke.objects.add_favourite(user.id, Joke.objects.for_text(text).id)
+        return user
+
+    def test_favourites_to_stdout(self, user):
+        out = StringIO()
+        call_command('export_jokes', 'favourites', user='myuser', stdout=out)
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [row['text'] for row in rows] == ['First joke', 'Second joke']
+
+    def test_popularity_csv_file(self, user, tmp_path):
+        path = tmp_path / 'popularity.csv'
+        call_command('export_jokes', 'popularity', output=str(path))
+
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert [(row['text'], row['favourite_count']) for row in rows] == [('First joke', '1'), ('Second joke', '1')]
+
+    def test_gzip_implied_by_extension(self, user, tmp_path):
+        path = tmp_path / 'favourites.jsonl.gz'
+        call_command('export_jokes', 'favourites', user='myuser', output=str(path))
+
+        with gzip.open(path, 'rt') as f:
+            assert len(f.readlines()) == 2
+
+    def test_favourites_need_a_user(self, user):
+        with pytest.raises(CommandError):
+            call_command('export_jokes', 'favourites')
+        with pytest.raises(CommandError):
+            call_command('export_jokes', 'favourites', user='nobody')
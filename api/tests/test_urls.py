@@ -8,4 +8,44 @@ def test_index_url():
     assert url == '/api/'
 
     resolved = resolve(url).func
-    assert resolved == views.get_data
\ No newline at end of file
+    assert resolved == views.get_data
+
+@pytest.mark.django_db
+def test_favourites_batch_url():
+    url = reverse('api:favourites_batch')
+    assert url == '/api/favourites/batch'
+
+    resolved = resolve(url).func
+    assert resolved == views.favourites_batch
+
+
+def test_search_url():
+    url = reverse('api:search')
+    assert url == '/api/search'
+
+    resolved = resolve(url).func
+    assert resolved == views.search
+
+
+def test_metrics_url():
+    url = reverse('api:metrics')
+    assert url == '/api/metrics'
+
+    resolved = resolve(url).func
+    assert resolved == views.metrics
+
+
+def test_export_favourites_url():
+    url = reverse('api:export_favourites', args=['csv'])
+    assert url == '/api/export/favourites.csv'
+
+    resolved = resolve(url).func
+    assert resolved == views.export_favourites
+
+
+def test_export_popularity_url():
+    url = reverse('api:export_popularity', args=['jsonl'])
+    assert url == '/api/export/popularity.jsonl'
+
+    resolved = resolve(url).func
+    assert resolved == views.export_popularity
@@ -1,10 +1,20 @@
+import csv
+import gzip
+import io
+import json
+import warnings
 import pytest
+from asgiref.sync import async_to_sync
 from rest_framework.test import APIClient
+from django.test import AsyncClient
 from django.urls import reverse
 from django.core.cache import cache
-from django.db import DatabaseError
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
-from joke_app.models import FavouriteJoke
+from joke_app.models import Joke, FavouriteJoke
+from joke_app.cache_versions import get_versions
+from api.streaming import iter_users
 from unittest.mock import patch
 
 @pytest.mark.django_db
@@ -37,11 +47,11 @@ class TestApiViews:
         client = APIClient()
 
         user = self.authenticated_user(login=False)
-        FavouriteJoke.objects.create(owner=user, joke='Test joke')
+        FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke'))
 
         user = self.authenticated_user(name='myuser_2', login=False)
-        FavouriteJoke.objects.create(owner=user, joke='Test joke 2')
-        FavouriteJoke.objects.create(owner=user, joke='Test joke 3')
+        FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke 2'))
+        FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke 3'))
 
         url = reverse('api:get_data')
         response = client.get(url)
@@ -58,7 +68,7 @@ class TestApiViews:
 
         joke = FavouriteJoke.objects.create(
             owner=user,
-            joke='Test joke'
+            joke=Joke.objects.for_text('Test joke')
         )
         joke.delete()
         
@@ -78,15 +88,8 @@ class TestApiViews:
         assert response.status_code == 200
         assert response.json() == [{'username': 'myuser', 'joke_count': 0}]
 
-    @pytest.mark.parametrize(
-        'key, user', [
-            ('get_data_cache_key', 'authenticated'),
-            ('get_data_cache_key', 'anonymous'),
-            ('get_data_cache_timestamp_key', 'authenticated'),
-            ('get_data_cache_timestamp_key', 'anonymous'),
-        ]
-    )
-    def test_cache_keys_behaviour(self, key, user, clear_cache):
+    @pytest.mark.parametrize('user', ['authenticated', 'anonymous'])
+    def test_cache_keys_behaviour(self, user, clear_cache):
         if user == 'authenticated':
             user, client = self.authenticated_user()
         else:
@@ -96,14 +99,38 @@ class TestApiViews:
                 password='Str0ngP@ssw0rd123!',
             )
 
-        FavouriteJoke.objects.create(owner=user, joke='Test joke')
+        FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke'))
 
         response = client.get(reverse('api:get_data'))
-        assert cache.get(key) is not None
+        global_version, _ = get_versions()
+        assert cache.get(f"get_data_cache_key_v{global_version}") is not None
 
         response_cached = client.get(reverse('api:get_data'))
         assert response.content == response_cached.content
 
+    def test_cache_hit_without_queries(self, clear_cache, django_assert_num_queries):
+        client = APIClient()
+        self.authenticated_user(login=False)
+        client.get(reverse('api:get_data'))
+
+        with django_assert_num_queries(0):
+            response = client.get(reverse('api:get_data'))
+
+        assert response.json() == [{'username': 'myuser', 'joke_count': 0}]
+
+    def test_cache_invalidated_on_add_and_delete(self, clear_cache):
+        client = APIClient()
+        user = self.authenticated_user(login=False)
+        client.get(reverse('api:get_data'))
+
+        favourite = FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke'))
+        response = client.get(reverse('api:get_data'))
+        assert response.json() == [{'username': 'myuser', 'joke_count': 1}]
+
+        favourite.delete()
+        response = client.get(reverse('api:get_data'))
+        assert response.json() == [{'username': 'myuser', 'joke_count': 0}]
+
     def test_handles_db_error(self, clear_cache):
         client = APIClient()
 
@@ -114,3 +141,316 @@ class TestApiViews:
             response = client.get(reverse('api:get_data'))
             assert response.status_code == 200
             assert response.json() == []
+            assert 'ETag' not in response
+            assert 'no-store' in response['Cache-Control']
+
+    def test_not_modified(self, clear_cache, django_assert_num_queries):
+        client = APIClient()
+        user = self.authenticated_user(login=False)
+        response = client.get(reverse('api:get_data'))
+        etag = response['ETag']
+        assert 'no-cache' in response['Cache-Control']
+
+        with django_assert_num_queries(0):
+            response = client.get(reverse('api:get_data'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response.content == b''
+
+        FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke'))
+        response = client.get(reverse('api:get_data'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+class TestGetDataKeyset:
+    @pytest.fixture
+    def users(self):
+        users = [
+            User.objects.create_user(username=f'user_{i}', password='Str0ngP@ssw0rd123!')
+            for i in range(5)
+        ]
+        FavouriteJoke.objects.create(owner=users[1], joke=Joke.objects.for_text('Test joke'))
+        return users
+
+    def test_pages_in_primary_key_order(self, users):
+        client = APIClient()
+
+        first = client.get(reverse('api:get_data'), {'limit': 2}).json()
+        second = client.get(reverse('api:get_data'), {'after': first['next'], 'limit': 2}).json()
+        last = client.get(reverse('api:get_data'), {'after': second['next'], 'limit': 2}).json()
+
+        assert [u['username'] for u in first['results']] == ['user_0', 'user_1']
+        assert first['results'][1]['joke_count'] == 1
+        assert [u['username'] for u in second['results']] == ['user_2', 'user_3']
+        assert [u['username'] for u in last['results']] == ['user_4']
+        assert last['next'] is None
+
+    @pytest.mark.parametrize('params', [{'after': 'x'}, {'limit': 'x'}, {'stream': 'xml'}])
+    def test_invalid_params(self, params):
+        response = APIClient().get(reverse('api:get_data'), params)
+
+        assert response.status_code == 400
+
+    def test_stream_ndjson(self, users):
+        with patch('api.views.iter_users', lambda after: iter_users(after, chunk_size=2)):
+            response = APIClient().get(reverse('api:get_data'), {'stream': 'ndjson'})
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+        assert response['Content-Type'] == 'application/x-ndjson'
+        assert [json.loads(line)['username'] for line in lines] == [u.username for u in users]
+
+    def test_stream_async_iterator_under_asgi(self, users):
+        async def download():
+            response = await AsyncClient().get(reverse('api:get_data'), {'stream': 'ndjson'})
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+
+        with warnings.catch_warnings():
+            warnings.filterwarnings('error', message='StreamingHttpResponse must consume synchronous iterators')
+            response, content = async_to_sync(download)()
+
+        assert response.is_async
+        assert [json.loads(line)['username'] for line in content.splitlines()] == [u.username for u in users]
+
+    def test_pages_have_own_etags(self, users):
+        client = APIClient()
+        first = client.get(reverse('api:get_data'), {'limit': 2})
+        second = client.get(reverse('api:get_data'), {'limit': 2, 'after': users[1].id})
+
+        assert first['ETag'] != second['ETag']
+        response = client.get(reverse('api:get_data'), {'limit': 2}, HTTP_IF_NONE_MATCH=first['ETag'])
+        assert response.status_code == 304
+
+    def test_stream_not_validated(self, users):
+        response = APIClient().get(reverse('api:get_data'), {'stream': 'ndjson'})
+        assert 'ETag' not in response
+
+    def test_stream_json(self, users):
+        response = APIClient().get(reverse('api:get_data'), {'stream': 'json', 'after': users[2].id})
+        data = json.loads(b''.join(response.streaming_content))
+
+        assert [u['username'] for u in data] == ['user_3', 'user_4']
+
+
+@pytest.mark.django_db
+class TestFavouritesBatch:
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username='myuser', password='Str0ngP@ssw0rd123!')
+
+    @pytest.fixture
+    def client(self, user):
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def post(self, client, operations):
+        return client.post(reverse('api:favourites_batch'), {'operations': operations}, format='json')
+
+    def test_requires_authentication(self):
+        response = APIClient().post(reverse('api:favourites_batch'), {'operations': []}, format='json')
+        assert response.status_code == 403
+
+    def test_add_and_remove(self, client, user):
+        kept = Joke.objects.for_text('Kept joke')
+        gone = Joke.objects.for_text('Gone joke')
+        FavouriteJoke.objects.create(owner=user, joke=gone)
+
+        response = self.post(client, [
+            {'op': 'add', 'joke': 'New  joke'},
+            {'op': 'add', 'joke_id': kept.id},
+            {'op': 'remove', 'joke_id': gone.id},
+        ])
+
+        assert response.status_code == 200
+        assert [r['status'] for r in response.json()['results']] == ['added', 'added', 'removed']
+        assert set(FavouriteJoke.objects.filter(owner=user).values_list('joke__text', flat=True)) == {
+            'New joke', 'Kept joke',
+        }
+        assert Joke.objects.get(id=kept.id).favourite_count == 1
+        assert Joke.objects.get(id=gone.id).favourite_count == 0
+
+    def test_per_item_results(self, client, user):
+        joke = Joke.objects.for_text('Test joke')
+        FavouriteJoke.objects.create(owner=user, joke=joke)
+
+        response = self.post(client, [
+            {'op': 'add', 'joke_id': joke.id},
+            {'op': 'remove', 'joke_id': joke.id},
+            {'op': 'remove', 'joke_id': joke.id},
+            {'op': 'add', 'joke_id': 999999},
+            {'op': 'share', 'joke_id': joke.id},
+            {'op': 'add'},
+        ])
+
+        statuses = [r['status'] for r in response.json()['results']]
+        assert statuses == ['exists', 'removed', 'not_found', 'invalid', 'invalid', 'invalid']
+        assert not FavouriteJoke.objects.filter(owner=user).exists()
+        assert Joke.objects.get(id=joke.id).favourite_count == 0
+
+    def test_concurrent_add_is_not_counted_twice(self, client, user):
+        joke = Joke.objects.for_text('Test joke')
+        bulk_create = FavouriteJoke.objects.bulk_create
+
+        def add_first(objs, **kwargs):
+            FavouriteJoke.objects.add_favourite(user.id, joke.id)
+            return bulk_create(objs, **kwargs)
+
+        with patch.object(FavouriteJoke.objects, 'bulk_create', side_effect=add_first):
+            response = self.post(client, [{'op': 'add', 'joke_id': joke.id}])
+
+        assert [r['status'] for r in response.json()['results']] == ['exists']
+        assert FavouriteJoke.objects.filter(owner=user).count() == 1
+        assert Joke.objects.get(id=joke.id).favourite_count == 1
+
+    def test_remove_unknown_text_does_not_create_joke(self, client):
+        response = self.post(client, [{'op': 'remove', 'joke': 'Never seen joke'}])
+
+        assert [r['status'] for r in response.json()['results']] == ['invalid']
+        assert not Joke.objects.filter(text='Never seen joke').exists()
+
+    @pytest.mark.parametrize('operations', [{'op': 'add'}, 'jokes'])
+    def test_rejects_malformed_body(self, client, operations):
+        assert self.post(client, operations).status_code == 400
+
+    def test_rejects_oversized_batch(self, client, settings):
+        settings.FAVOURITES_BATCH_MAX = 2
+        response = self.post(client, [{'op': 'add', 'joke': f'Joke {i}'} for i in range(3)])
+        assert response.status_code == 400
+
+    def test_constant_number_of_queries(self, client, user):
+        def run(count, offset):
+            operations = [{'op': 'add', 'joke': f'Joke {offset + i}'} for i in range(count)]
+            operations += [{'op': 'remove', 'joke_id': j.id}
+                           for j in Joke.objects.filter(favouritejoke__owner=user)]
+            with CaptureQueriesContext(connection) as queries:
+                assert self.post(client, operations).status_code == 200
+            return len(queries)
+
+        run(5, 0)
+        # Kept under SQLite's 999-parameter bulk_create split
+        assert run(5, 100) == run(300, 1000)
+        assert FavouriteJoke.objects.filter(owner=user).count() == 300
+
+    def test_invalidates_caches(self, client, user):
+        global_version, user_version = get_versions(user.id)
+        self.post(client, [{'op': 'add', 'joke': 'Test joke'}])
+        assert get_versions(user.id) != (global_version, user_version)
+
+
+@pytest.mark.django_db
+class TestSearch:
+    @pytest.fixture
+    def user(self):
+        user = User.objects.create_user(username='myuser', password='Str0ngP@ssw0rd123!')
+        FavouriteJoke.objects.add_favourite(user.id, Joke.objects.for_text('My chicken joke').id)
+        Joke.objects.for_text('Another chicken joke')
+        return user
+
+    def test_search(self, user):
+        response = APIClient().get(reverse('api:search'), {'q': 'chick', 'limit': 1})
+
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert len(results) == 1
+        assert set(results[0]) == {'id', 'text', 'favourite_count'}
+        assert 'chicken' in results[0]['text']
+
+    def test_only_my_favourites(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.get(reverse('api:search'), {'q': 'chicken', 'mine': '1'})
+
+        assert [joke['text'] for joke in response.json()['results']] == ['My chicken joke']
+
+    def test_mine_requires_authentication(self, user):
+        response = APIClient().get(reverse('api:search'), {'q': 'chicken', 'mine': '1'})
+        assert response.status_code == 403
+
+    def test_invalid_limit(self):
+        response = APIClient().get(reverse('api:search'), {'q': 'chicken', 'limit': 'many'})
+        assert response.status_code == 400
+
+    def test_handles_db_error(self):
+        with patch('api.views.search_jokes', side_effect=DatabaseError):
+            response = APIClient().get(reverse('api:search'), {'q': 'chicken'})
+
+        assert response.status_code == 200
+        assert response.json() == {'results': []}
+        assert response['Cache-Control'] == 'no-store'
+
+
+@pytest.mark.django_db
+class TestExport:
+    @pytest.fixture
+    def user(self):
+        user = User.objects.create_user(username='myuser', password='Str0ngP@ssw0rd123!')
+        for text in ('First, joke', 'Second "joke"'):
+            FavouriteJoke.objects.add_favourite(user.id, Joke.objects.for_text(text).id)
+        return user
+
+    @pytest.fixture
+    def client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_favourites_csv(self, client):
+        response = client.get(reverse('api:export_favourites', args=['csv']))
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'] == 'text/csv'
+        assert response['Content-Disposition'] == 'attachment; filename="favourites.csv"'
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert [row['text'] for row in rows] == ['First, joke', 'Second "joke"']
+        assert set(rows[0]) == {'joke_id', 'text', 'added_at'}
+
+    def test_popularity_jsonl(self, user):
+        Joke.objects.for_text('Nobody likes this one')
+
+        response = APIClient().get(reverse('api:export_popularity', args=['jsonl']))
+
+        assert response['Content-Type'] == 'application/x-ndjson'
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        assert [row['text'] for row in rows] == ['First, joke', 'Second "joke"']
+        assert rows[0]['favourite_count'] == 1
+
+    def test_gzip_when_accepted(self, client):
+        response = client.get(reverse('api:export_favourites', args=['jsonl']), HTTP_ACCEPT_ENCODING='gzip, br')
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        assert len(lines) == 2
+
+    def test_favourites_require_authentication(self, user):
+        response = APIClient().get(reverse('api:export_favourites', args=['csv']))
+        assert response.status_code == 403
+
+    def test_unknown_format(self, client):
+        response = client.get(reverse('api:export_favourites', args=['xml']))
+        assert response.status_code == 404
+
+    def test_async_iterator_under_asgi(self, user):
+        async def download():
+            client = AsyncClient()
+            await client.aforce_login(user)
+            response = await client.get(reverse('api:export_favourites', args=['jsonl']))
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+
+        with warnings.catch_warnings():
+            warnings.filterwarnings('error', message='StreamingHttpResponse must consume synchronous iterators')
+            response, content = async_to_sync(download)()
+
+        assert response.is_async
+        assert [json.loads(line)['text'] for line in content.splitlines()] == ['First, joke', 'Second "joke"']
+
+    def test_reads_through_iterator(self, client):
+        with patch('django.db.models.query.QuerySet.iterator', autospec=True,
+                   side_effect=lambda qs, chunk_size=None: iter(list(qs))) as iterator:
+            b''.join(client.get(reverse('api:export_favourites', args=['csv'])).streaming_content)
+
+        assert iterator.call_args.kwargs['chunk_size'] > 0
@@ -4,4 +4,9 @@ from . import views
 app_name = 'api'
 urlpatterns = [
     path('', views.get_data, name='get_data'),
+    path('favourites/batch', views.favourites_batch, name='favourites_batch'),
+    path('search', views.search, name='search'),
+    path('export/favourites.<str:file_format>', views.export_favourites, name='export_favourites'),
+    path('export/popularity.<str:file_format>', views.export_popularity, name='export_popularity'),
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
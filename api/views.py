@@ -1,21 +1,55 @@
 import logging
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.contrib.auth.models import User
 from django.db import DatabaseError
 from django.db.models import Count
-from django.contrib.auth.models import User
-from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from joke_app.cache_versions import get_versions, versioned_etag
+from joke_app.search import search_jokes
+from random_joke.metrics import REGISTRY, CONTENT_TYPE
+from random_joke.tiered_cache import get_or_compute
+from .batch import BatchError, parse_operations, apply_batch
+from .streaming import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, EXPORTS, EXPORT_FORMATS, iter_users, user_page,
+    ndjson_chunks, json_array_chunks, export_chunks, gzip_chunks, stream,
+)
 
 logger = logging.getLogger('api')
 
+STREAM_FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_chunks),
+    'json': ('application/json', json_array_chunks),
+}
+
+
+def get_data_etag(request):
+    # Streams are generated on the fly and not validated
+    if 'stream' in request.GET:
+        return None
+    global_version, _ = get_versions()
+    after, limit = request.GET.get('after', ''), request.GET.get('limit', '')
+    if not (after or '0').isdigit() or not (limit or '0').isdigit():
+        return None
+    return f"get_data-{global_version}-{after}-{limit}"
+
+
+@versioned_etag(get_data_etag, lambda request: {'no_cache': True})
 @api_view(['GET'])
 def get_data(request):
-    CACHE_GET_DATA_KEY = "get_data_cache_key"
-    CACHE_GET_DATA_TIMESTAMP_KEY = "get_data_cache_timestamp_key"
+    logger.info("Processing request: %s %s", request.method, request.path)
 
-    logger.info(f"Processing request: {request.method} {request.path}")
+    params = request.query_params
+    if 'stream' in params or 'after' in params or 'limit' in params:
+        return get_data_keyset(request)
 
-    try:
+    global_version, _ = get_versions()
+    CACHE_GET_DATA_KEY = f"get_data_cache_key_v{global_version}"
+
+    def build_data():
         users = User.objects.annotate(joke_count=Count('favouritejoke'))
         data = [
             {
@@ -23,24 +57,141 @@ def get_data(request):
                 'joke_count': user.joke_count,
             } for user in users
         ]
+        logger.info("Cache updated with new response data")
+        return data
+
+    try:
+        response_data = get_or_compute(
+            CACHE_GET_DATA_KEY, build_data, 60 * 15, stale_key='get_data_cache_key'
+        )
     except DatabaseError as e:
-        logger.error(f"Database error while fetching user data: {e}", exc_info=True)
-        data = []
+        logger.error("Database error while fetching user data: %s", e, exc_info=True)
+        return Response([], headers={'Cache-Control': 'no-store'})
 
-    cache_timestamp = cache.get(CACHE_GET_DATA_TIMESTAMP_KEY)
-    current_state = hash((d['username'], d['joke_count']) for d in data)
+    logger.info("Request processed successfully: returning %s records", len(response_data))
+    return Response(response_data)
 
-    if cache_timestamp == current_state:
-        cached_response = cache.get(CACHE_GET_DATA_KEY)
-        if cached_response:
-            logger.info("Returning response from cache")
-            return Response(cached_response)
+def get_data_keyset(request):
+    params = request.query_params
+    try:
+        after = int(params.get('after', 0))
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        logger.warning("Invalid pagination parameters: %s", dict(params))
+        return Response({'detail': 'after and limit must be integers'}, status=400)
 
-    response_data = data
+    if 'stream' in params:
+        if params['stream'] not in STREAM_FORMATS:
+            return Response(
+                {'detail': f"stream must be one of: {', '.join(STREAM_FORMATS)}"},
+                status=400,
+            )
+        content_type, encode = STREAM_FORMATS[params['stream']]
+        logger.info("Streaming users after id %s as %s", after, params['stream'])
+        return StreamingHttpResponse(
+            stream(request._request, encode(iter_users(after))), content_type=content_type,
+        )
 
-    cache.set(CACHE_GET_DATA_KEY, response_data, 60 * 15)
-    cache.set(CACHE_GET_DATA_TIMESTAMP_KEY, current_state, 60 * 15)
-    logger.info("Cache updated with new response data")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    try:
+        page = user_page(after, limit)
+    except DatabaseError as e:
+        logger.error("Database error while fetching user page: %s", e, exc_info=True)
+        return Response({'results': [], 'next': None}, headers={'Cache-Control': 'no-store'})
 
-    logger.info(f"Request processed successfully: returning {len(data)} records")
-    return Response(response_data)
+    logger.info("Request processed successfully: returning %s records after id %s", len(page), after)
+    return Response({
+        'results': page,
+        'next': page[-1]['id'] if len(page) == limit else None,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def favourites_batch(request):
+    logger.info("Processing request: %s %s", request.method, request.path)
+
+    try:
+        operations = parse_operations(request.data, settings.FAVOURITES_BATCH_MAX)
+    except BatchError as e:
+        logger.warning("Rejected favourites batch from user %s: %s", request.user.username, e)
+        return Response({'detail': str(e)}, status=400)
+
+    try:
+        results = apply_batch(request.user, operations)
+    except DatabaseError as e:
+        logger.error("Database error while applying favourites batch: %s", e, exc_info=True)
+        return Response({'detail': 'database error, no changes were applied'}, status=503)
+
+    logger.info("Applied %s favourite operations for user %s", len(results), request.user.username)
+    return Response({'results': results})
+
+
+@api_view(['GET'])
+def search(request):
+    """Full-text search; ``mine=1`` limits it to the logged-in user's favourites."""
+    logger.info("Processing request: %s %s", request.method, request.path)
+
+    params = request.query_params
+    query = params.get('q', '')
+    try:
+        limit = max(1, min(int(params.get('limit', settings.SEARCH_RESULTS)), MAX_PAGE_SIZE))
+    except ValueError:
+        return Response({'detail': 'limit must be an integer'}, status=400)
+
+    mine = params.get('mine') in ('1', 'true')
+    if mine and not request.user.is_authenticated:
+        return Response({'detail': 'log in to search your favourites'}, status=403)
+
+    try:
+        results = search_jokes(query, request.user.id if mine else None, limit)
+    except DatabaseError as e:
+        logger.error("Database error while searching jokes: %s", e, exc_info=True)
+        return Response({'results': []}, headers={'Cache-Control': 'no-store'})
+
+    logger.info("Search returned %s jokes (mine: %s)", len(results), mine)
+    return Response({'results': results})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_favourites(request, file_format):
+    """The logged-in user's favourites as a CSV or JSONL download."""
+    return export(request, 'favourites', file_format, request.user.id)
+
+
+@api_view(['GET'])
+def export_popularity(request, file_format):
+    """Every favourited joke with its favourite count, as a CSV or JSONL download."""
+    return export(request, 'popularity', file_format)
+
+
+def export(request, name, file_format, *args):
+    """Stream an ``EXPORTS`` table; gzipped on the fly when the client accepts it.
+
+    Rows come from a server-side cursor and leave in chunks, so memory
+    does not grow with the table.
+    """
+    logger.info("Processing request: %s %s", request.method, request.path)
+
+    if file_format not in EXPORT_FORMATS:
+        return Response({'detail': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}, status=404)
+
+    fields, rows = EXPORTS[name]
+    chunks = export_chunks(rows(*args), fields, file_format)
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = StreamingHttpResponse(
+        stream(request._request, gzip_chunks(chunks) if compress else chunks),
+        content_type=EXPORT_FORMATS[file_format],
+    )
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    response['Content-Disposition'] = f'attachment; filename="{name}.{file_format}"'
+    logger.info("Streaming %s as %s (gzip: %s)", name, file_format, compress)
+    return response
+
+
+def metrics(request):
+    """Prometheus scrape target."""
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
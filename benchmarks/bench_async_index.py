@@ -0,0 +1,84 @@
+"""Concurrent throughput of the sync (WSGI) and async (ASGI) index view.
+
+Both paths run in-process against a local stub joke API with a fixed
+latency and the joke pool disabled, so every request waits on upstream.
+The sync path is served by a fixed number of worker threads, the async
+path by a single event loop.
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup_django, summarize, report, use_joke_api
+
+setup_django()
+
+from django.test import Client, AsyncClient, override_settings  # noqa: E402
+from django.urls import path, include  # noqa: E402
+from joke_app import views  # noqa: E402
+from joke_app.tests.stub_api import StubJokeAPI  # noqa: E402
+
+
+class SyncURLs:
+    urlpatterns = [
+        path('', views.index),
+        path('', include('random_joke.urls')),
+    ]
+
+
+class AsyncURLs:
+    urlpatterns = [
+        path('', views.index_async),
+        path('', include('random_joke.urls')),
+    ]
+
+
+def run_sync(total, threads):
+    def one(_):
+        started = time.perf_counter()
+        assert Client().get('/').status_code == 200
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        latencies = list(executor.map(one, range(total)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def run_async(total, concurrency):
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get('/')
+            assert response.status_code == 200
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one() for _ in range(total)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=8, help='sync worker threads')
+    parser.add_argument('--concurrency', type=int, default=200, help='in-flight async requests')
+    parser.add_argument('--latency', type=float, default=0.1, help='stub API latency (s)')
+    args = parser.parse_args()
+
+    results = {}
+    with StubJokeAPI(latency=args.latency) as stub, use_joke_api(stub.url):
+        with override_settings(ROOT_URLCONF=SyncURLs):
+            results['wsgi_sync'] = run_sync(args.requests, args.threads)
+        with override_settings(ROOT_URLCONF=AsyncURLs):
+            results['asgi_async'] = asyncio.run(run_async(args.requests, args.concurrency))
+
+    report('async_index', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
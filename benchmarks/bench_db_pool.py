@@ -0,0 +1,85 @@
+"""Per-request connection overhead with and without connection reuse.
+
+Every simulated request runs ``SELECT 1`` and then does what Django does
+when a request finishes (``close_old_connections``), from ``--concurrency``
+threads at once. Three setups are compared against the configured
+PostgreSQL database:
+
+* ``connect_per_request``: ``CONN_MAX_AGE=0`` without a pool, a new
+  connection for every request;
+* ``persistent``: ``CONN_MAX_AGE=60``, one connection kept per thread;
+* ``pool``: the psycopg pool from ``settings.DATABASES``.
+
+Only read queries are run, so no test database is created.
+"""
+import argparse
+import copy
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup_django, summarize, report
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.db import close_old_connections, connection, connections  # noqa: E402
+
+DEFAULT_POOL = {'name': 'default', 'min_size': 2, 'max_size': 10}
+
+
+def configure(mode, pool_options):
+    settings_dict = connections.settings['default']
+    connection.close()
+    connection.close_pool()
+    options = dict(settings_dict['OPTIONS'])
+    options.pop('pool', None)
+    if mode == 'pool':
+        options['pool'] = pool_options
+    settings_dict['OPTIONS'] = options
+    settings_dict['CONN_MAX_AGE'] = 60 if mode == 'persistent' else 0
+
+
+def one_request(_):
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    close_old_connections()
+    return time.perf_counter() - started
+
+
+def measure(total, concurrency):
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(one_request, range(concurrency * 2)))  # warm up
+        started = time.perf_counter()
+        latencies = list(executor.map(one_request, range(total)))
+        elapsed = time.perf_counter() - started
+        # Threads keep their own connection objects; close them before moving on
+        list(executor.map(lambda _: connections.close_all(), range(concurrency)))
+    return summarize(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    if connection.vendor != 'postgresql':
+        sys.exit(f"This benchmark needs PostgreSQL, the configured database is {connection.vendor}")
+
+    pool_options = copy.deepcopy(settings.DATABASES['default']['OPTIONS'].get('pool') or DEFAULT_POOL)
+    results = {}
+    for mode in ('connect_per_request', 'persistent', 'pool'):
+        configure(mode, pool_options)
+        results[mode] = measure(args.requests, args.concurrency)
+        if mode == 'pool':
+            results[mode]['pool_stats'] = connection.pool.get_stats()
+    connection.close_pool()
+
+    report('db_pool', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Peak memory, time-to-first-byte and throughput of the popularity export.
+
+For every catalog size, ``api:export_popularity`` is requested in-process
+as CSV and JSONL, plain and gzipped, and compared with ``materialized``:
+the same CSV built from a list of every row, the way ``api:get_data``
+answered before it could stream. Peak memory is the Python heap
+high-water mark (tracemalloc) while building and consuming one response.
+"""
+import argparse
+import csv
+import io
+import time
+import tracemalloc
+
+from benchmarks.common import setup_django, report, test_database
+
+setup_django()
+
+from django.test import Client, override_settings  # noqa: E402
+from api.streaming import EXPORTS  # noqa: E402
+from joke_app.models import Joke  # noqa: E402
+
+
+def seed(count, start, batch_size=10000):
+    for first in range(start, start + count, batch_size):
+        Joke.objects.bulk_create([
+            Joke(text=f"Exported joke number {n}, with a punchline",
+                 content_hash=Joke.hash_text(f"Exported joke number {n}, with a punchline"),
+                 favourite_count=n % 1000 + 1)
+            for n in range(first, min(first + batch_size, start + count))
+        ])
+
+
+def materialized():
+    fields, rows = EXPORTS['popularity']
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fields)
+    writer.writeheader()
+    writer.writerows(list(rows()))
+    return [buffer.getvalue().encode('utf-8')]
+
+
+def measure(fetch):
+    tracemalloc.start()
+    started = time.perf_counter()
+    chunks = iter(fetch())
+    size = len(next(chunks))
+    ttfb = time.perf_counter() - started
+    size += sum(len(chunk) for chunk in chunks)
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'ttfb_ms': round(ttfb * 1000, 2),
+        'total_ms': round(total * 1000, 2),
+        'bytes': size,
+        'peak_heap_mb': round(peak / 2**20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 3_000_000])
+    args = parser.parse_args()
+
+    client = Client()
+
+    def export(file_format, compress=False):
+        headers = {'HTTP_ACCEPT_ENCODING': 'gzip'} if compress else {}
+        return lambda: client.get(f'/api/export/popularity.{file_format}', **headers).streaming_content
+
+    results = {}
+    with test_database(), override_settings(ALLOWED_HOSTS=['*']):
+        seeded = 0
+        for size in sorted(args.sizes):
+            seed(size - seeded, seeded)
+            seeded = size
+            measure(export('csv'))  # warm up imports and URL resolution
+            results[size] = {
+                'csv_stream': measure(export('csv')),
+                'csv_gzip_stream': measure(export('csv', compress=True)),
+                'jsonl_stream': measure(export('jsonl')),
+                'jsonl_gzip_stream': measure(export('jsonl', compress=True)),
+                'materialized': measure(materialized),
+            }
+
+    report('export', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
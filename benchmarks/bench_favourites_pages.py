@@ -0,0 +1,87 @@
+"""Uncached favourites page latency as a user's collection grows.
+
+For each collection size one user is seeded with that many favourites,
+and the page is built the way ``joke_app.views.favourites`` does on a
+cache miss: query, then render. ``all`` is the previous behaviour, every
+favourite on one page. ``first_page`` and ``last_page`` use keyset
+pagination at ``FAVOURITES_PAGE_SIZE``.
+"""
+import argparse
+import time
+
+from benchmarks.common import setup_django, report, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from django.middleware.csrf import get_token  # noqa: E402
+from joke_app.models import Joke, FavouriteJoke  # noqa: E402
+from joke_app.views import favourites_page  # noqa: E402
+
+
+def seed_collection(size, batch_size=5000):
+    user = User.objects.create(username=f"bench_collection_{size}", password='!')
+    first_id = (Joke.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+    for start in range(0, size, batch_size):
+        texts = [f"Collection {size} joke {first_id + i}" for i in range(start, min(start + batch_size, size))]
+        jokes = Joke.objects.bulk_create([Joke(text=text, content_hash=Joke.hash_text(text)) for text in texts])
+        FavouriteJoke.objects.bulk_create([FavouriteJoke(owner=user, joke_id=joke.id) for joke in jokes])
+    return user
+
+
+def timed(build, repeat):
+    build()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        build()
+    return round((time.perf_counter() - started) / repeat * 1000, 3)
+
+
+def measure(sizes, repeat):
+    page_size = settings.FAVOURITES_PAGE_SIZE
+    results = {}
+    for size in sizes:
+        user = seed_collection(size)
+        request = RequestFactory().get('/')
+        request.user = user
+        get_token(request)
+        # The cursor that leaves exactly one full page after it
+        last_cursor = FavouriteJoke.objects.filter(owner=user).order_by('-id').values_list(
+            'id', flat=True
+        )[page_size] if size > page_size else 0
+
+        def render_all():
+            jokes = Joke.objects.filter(favouritejoke__owner=user).order_by('favouritejoke__id')
+            return render_to_string('joke_app/favourites.html', {'favourite_jokes': jokes}, request)
+
+        def render_page(after):
+            jokes, next_after = favourites_page(user.id, after, page_size)
+            context = {'favourite_jokes': jokes, 'after': after, 'next_after': next_after}
+            return render_to_string('joke_app/favourites.html', context, request)
+
+        results[f"favourites_{size}"] = {
+            'all_ms': timed(render_all, repeat),
+            'first_page_ms': timed(lambda: render_page(0), repeat),
+            'last_page_ms': timed(lambda: render_page(last_cursor), repeat),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=settings.FAVOURITES_PAGE_SIZE)
+    args = parser.parse_args()
+
+    with test_database(), override_settings(FAVOURITES_PAGE_SIZE=args.page_size):
+        results = measure(args.sizes, args.repeat)
+
+    report('favourites_pages', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
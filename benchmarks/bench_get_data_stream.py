@@ -0,0 +1,71 @@
+"""Peak memory and time-to-first-byte of api:get_data, full list vs streamed.
+
+For every user-table size the legacy in-memory list and the NDJSON stream
+are requested in-process. Peak memory is the Python heap high-water mark
+(tracemalloc) while building and consuming one response; the process-wide
+peak RSS is reported alongside it.
+"""
+import argparse
+import resource
+import time
+import tracemalloc
+
+from benchmarks.common import setup_django, report, test_database, seed_users
+
+setup_django()
+
+from django.core.cache import cache  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+
+
+def measure(params):
+    cache.clear()
+    client = Client()
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    response = client.get('/api/', params)
+    if response.streaming:
+        chunks = iter(response.streaming_content)
+        size = len(next(chunks))
+        ttfb = time.perf_counter() - started
+        size += sum(len(chunk) for chunk in chunks)
+    else:
+        ttfb = time.perf_counter() - started
+        size = len(response.content)
+
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'ttfb_ms': round(ttfb * 1000, 2),
+        'total_ms': round(total * 1000, 2),
+        'bytes': size,
+        'peak_heap_mb': round(peak / 2**20, 2),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    results = {}
+    with test_database(), override_settings(ALLOWED_HOSTS=['*']):
+        seeded = 0
+        for size in sorted(args.sizes):
+            seed_users(size - seeded)
+            seeded = size
+            measure({'limit': 1})  # warm up imports and URL resolution
+            # Streaming first: the list mode's allocations inflate ru_maxrss for good
+            results[size] = {
+                'ndjson_stream': measure({'stream': 'ndjson'}),
+                'full_list': measure({}),
+            }
+
+    report('get_data_stream', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Throughput and memory of ``manage.py import_jokes``.
+
+A JSONL corpus of ``--records`` jokes, ``--duplicates`` of them repeats,
+is written to a temporary file and imported into an empty catalog:
+
+* ``one_at_a_time``: ``Joke.objects.for_text`` per record, the way jokes
+  reached the catalog before, over the first ``--baseline`` records;
+* ``batch_<n>``: the command with ``--batch-size n``.
+
+Peak memory is the Python heap high-water mark (tracemalloc) of one more
+import at the default batch size, of the whole file and of its first
+tenth; the two staying close shows the file is streamed.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+
+from benchmarks.common import setup_django, report, test_database
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from joke_app.models import Joke  # noqa: E402
+
+
+def write_corpus(path, records, duplicates):
+    unique = int(records * (1 - duplicates))
+    with open(path, 'w') as f:
+        for n in range(records):
+            number = n if n < unique else random.randrange(unique)
+            f.write(json.dumps({'setup': f"Why did joke {number} cross the road?",
+                                'punchline': f"To get to line {number}."}) + '\n')
+
+
+def empty_catalog():
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {connection.ops.quote_name(Joke._meta.db_table)}")
+
+
+def one_at_a_time(path, limit):
+    with open(path) as f:
+        started = time.perf_counter()
+        for line, _ in zip(f, range(limit)):
+            record = json.loads(line)
+            Joke.objects.for_text(f"{record['setup']} {record['punchline']}")
+        return round(limit / (time.perf_counter() - started))
+
+
+def import_rate(path, records, **options):
+    started = time.perf_counter()
+    call_command('import_jokes', path, stdout=StringIO(), **options)
+    return round(records / (time.perf_counter() - started))
+
+
+def peak_heap_mb(path):
+    tracemalloc.start()
+    call_command('import_jokes', path, stdout=StringIO())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 2**20, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--duplicates', type=float, default=0.1, help='fraction of repeated records')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[500, 5000, 20000])
+    parser.add_argument('--baseline', type=int, default=20000, help='records imported one at a time')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, test_database():
+        path = os.path.join(directory, 'jokes.jsonl')
+        write_corpus(path, args.records, args.duplicates)
+        tenth = os.path.join(directory, 'tenth.jsonl')
+        with open(path) as source, open(tenth, 'w') as target:
+            target.writelines(line for line, _ in zip(source, range(args.records // 10)))
+
+        results['one_at_a_time_rows_per_s'] = one_at_a_time(path, min(args.baseline, args.records))
+        for batch_size in args.batch_sizes:
+            empty_catalog()
+            results[f"batch_{batch_size}_rows_per_s"] = import_rate(path, args.records, batch_size=batch_size)
+        results['jokes'] = Joke.objects.count()
+
+        empty_catalog()
+        results['peak_heap_tenth_mb'] = peak_heap_mb(tenth)
+        empty_catalog()
+        results['peak_heap_full_mb'] = peak_heap_mb(path)
+
+    report('import', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
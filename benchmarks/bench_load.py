@@ -0,0 +1,143 @@
+"""HTTP load test of the main pages against a seeded database and a stub joke API.
+
+The project is served by a threaded WSGI server on a random local port and
+every endpoint is driven over real HTTP at a fixed concurrency, one worker
+thread per simulated client. Each client is logged in as a different
+seeded user. The joke API is replaced by a local stub with configurable
+latency and failure rate.
+
+Results are JSON. Save a run with ``--output`` and compare a later one
+against it with ``--baseline``; the script exits with status 1 when an
+endpoint's p95 latency or throughput regressed by more than
+``--tolerance``::
+
+    python -m benchmarks.bench_load --output before.json
+    python -m benchmarks.bench_load --baseline before.json
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.common import (
+    setup_django, summarize, report, use_joke_api, test_database, seed_users, serve_app,
+)
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from joke_app.tests.stub_api import StubJokeAPI  # noqa: E402
+
+ENDPOINTS = {
+    'index': 'joke_app:index',
+    'favourites': 'joke_app:favourites',
+    'jokes_rating': 'joke_app:jokes_rating',
+    'get_data': 'api:get_data',
+}
+
+
+def session_cookies(count):
+    """Log in ``count`` distinct seeded users; returns their session cookie values."""
+    cookies = []
+    for user in User.objects.order_by('id')[:count]:
+        client = Client()
+        client.force_login(user)
+        cookies.append(client.cookies[settings.SESSION_COOKIE_NAME].value)
+    return cookies
+
+
+def run_endpoint(url, cookies, total, concurrency):
+    local = threading.local()
+    unused = iter(cookies)
+    lock = threading.Lock()
+
+    def session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+            with lock:
+                local.session.cookies.set(settings.SESSION_COOKIE_NAME, next(unused))
+        return local.session
+
+    def one(_):
+        started = time.perf_counter()
+        try:
+            ok = session().get(url, timeout=30).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        outcomes = list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize([latency for latency, _ in outcomes], elapsed)
+    result['errors'] = sum(1 for _, ok in outcomes if not ok)
+    return result
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or 'p95_ms' not in current:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            found.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            found.append(
+                f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s"
+            )
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--users', type=int, default=1000, help='seeded users')
+    parser.add_argument('--latency', type=float, default=0.05, help='stub API latency (s)')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='stub API failure rate')
+    parser.add_argument('--pool-size', type=int, default=50, help='JOKE_POOL_SIZE, 0 disables the pool')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    parser.add_argument('--baseline', help='JSON report of a previous run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    results = {}
+    with StubJokeAPI(latency=args.latency, failure_rate=args.failure_rate) as stub, \
+            use_joke_api(stub.url, pool_size=args.pool_size), test_database():
+        seed_users(max(args.users, args.concurrency))
+        cookies = session_cookies(args.concurrency)
+        cache.clear()
+
+        with serve_app() as base_url:
+            for name in args.endpoints:
+                url = base_url + reverse(ENDPOINTS[name])
+                run_endpoint(url, cookies, args.warmup, args.concurrency)
+                results[name] = run_endpoint(url, cookies, args.requests, args.concurrency)
+        results['stub_api'] = {'requests': stub.requests, 'connections': stub.connections}
+
+    report('load', vars(args), results, output=args.output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
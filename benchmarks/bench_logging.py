@@ -0,0 +1,102 @@
+"""Request latency with synchronous vs queued logging.
+
+``sync`` is the previous setup: every logger writes straight to a stream
+handler and rotating files from the request thread. ``queued`` is
+``settings.LOGGING``; ``queued_sampled`` additionally keeps only a
+fraction of INFO records. Console output goes to a temporary file in all
+three so the terminal does not skew the numbers.
+"""
+import argparse
+import copy
+import logging
+import logging.config
+import os
+import tempfile
+import time
+
+from benchmarks.common import setup_django, summarize, report, use_joke_api, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from joke_app.tests.stub_api import StubJokeAPI  # noqa: E402
+
+FILE_HANDLERS = ('file_joke_app', 'file_users', 'file_api', 'file_errors')
+APP_LOGGERS = ('joke_app', 'users', 'api')
+
+
+def queued_config(directory, sample_rate=1.0):
+    config = copy.deepcopy(settings.LOGGING)
+    handlers = config['handlers']
+    handlers['console'] = {
+        'level': 'INFO',
+        'class': 'logging.FileHandler',
+        'filename': os.path.join(directory, 'console.log'),
+        'formatter': 'simple',
+    }
+    for name in FILE_HANDLERS:
+        handlers[name]['filename'] = os.path.join(directory, f"{name}.log")
+    config['filters']['sample_info']['rate'] = sample_rate
+    return config
+
+
+def sync_config(directory):
+    config = queued_config(directory)
+    del config['handlers']['queue']
+    for name in FILE_HANDLERS:
+        config['handlers'][name].update({
+            'class': 'logging.handlers.RotatingFileHandler',
+            'maxBytes': 1024 * 1024 * 5,
+            'backupCount': 3,
+        })
+    for name in APP_LOGGERS:
+        config['loggers'][name]['handlers'] = ['console', f"file_{name}"]
+    config['loggers']['django']['handlers'] = ['console', 'file_errors']
+    return config
+
+
+def measure(config, urls, total):
+    logging.config.dictConfig(config)
+    client = Client()
+    for url in urls:
+        client.get(url)  # warm caches and the joke pool
+
+    results = {}
+    for url in urls:
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(total):
+            request_started = time.perf_counter()
+            client.get(url)
+            latencies.append(time.perf_counter() - request_started)
+        results[url] = summarize(latencies, time.perf_counter() - started)
+    logging.shutdown()  # flush the queue so the next run starts empty
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000, help='requests per URL')
+    parser.add_argument('--sample-rate', type=float, default=0.1)
+    args = parser.parse_args()
+
+    logging.disable(logging.NOTSET)
+    results = {}
+    with StubJokeAPI() as stub, use_joke_api(stub.url, pool_size=1000), test_database():
+        cache.clear()
+        urls = [reverse('joke_app:index'), reverse('joke_app:jokes_rating'), reverse('api:get_data')]
+        with tempfile.TemporaryDirectory() as directory:
+            results['sync'] = measure(sync_config(directory), urls, args.requests)
+            results['queued'] = measure(queued_config(directory), urls, args.requests)
+            results['queued_sampled'] = measure(
+                queued_config(directory, args.sample_rate), urls, args.requests
+            )
+
+    report('logging', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Cost of recording metrics, per operation and per request.
+
+The micro section times the individual recording calls. The request
+section serves a cached api:get_data response through the full middleware
+stack with and without ``metrics_middleware``, alternating for several
+rounds and keeping the fastest of each, and reports the difference per
+request.
+"""
+import argparse
+import time
+
+from benchmarks.common import setup_django, report, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from random_joke import metrics  # noqa: E402
+
+METRICS_MIDDLEWARE = 'random_joke.metrics.metrics_middleware'
+
+
+def per_call_ns(fn, iterations):
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter_ns() - started) / iterations, 1)
+
+
+def micro(iterations):
+    counter = metrics.Counter('bench_total', 'Benchmark.', ['view'])
+    histogram = metrics.Histogram('bench_seconds', 'Benchmark.', ['view'])
+
+    def execute(sql, params, many, context):
+        return None
+
+    def counted_query():
+        metrics._count_query(execute, 'SELECT 1', (), False, {})
+
+    token = metrics._current_request.set(metrics.RequestStats())
+    try:
+        return {
+            'counter_inc_ns': per_call_ns(lambda: counter.inc('index'), iterations),
+            'histogram_observe_ns': per_call_ns(lambda: histogram.observe(0.042, 'index'), iterations),
+            'cache_record_ns': per_call_ns(
+                lambda: metrics.record_cache('favourites_cache_key_5_v1700000000', 'hit'), iterations
+            ),
+            'query_wrapper_ns': per_call_ns(counted_query, iterations),
+        }
+    finally:
+        metrics._current_request.reset(token)
+
+
+def seconds_per_request(total):
+    client = Client()
+    url = reverse('api:get_data')
+    client.get(url)  # fill the cache
+    started = time.perf_counter()
+    for _ in range(total):
+        client.get(url)
+    elapsed = time.perf_counter() - started
+    return elapsed / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200_000)
+    parser.add_argument('--requests', type=int, default=2000, help='requests per round')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    results = {'micro': micro(args.iterations)}
+    with test_database(), override_settings(ALLOWED_HOSTS=['*']):
+        cache.clear()
+        without = [m for m in settings.MIDDLEWARE if m != METRICS_MIDDLEWARE]
+        bare = instrumented = float('inf')
+        for _ in range(args.rounds):
+            with override_settings(MIDDLEWARE=without):
+                bare = min(bare, seconds_per_request(args.requests))
+            with override_settings(MIDDLEWARE=[METRICS_MIDDLEWARE, *without]):
+                instrumented = min(instrumented, seconds_per_request(args.requests))
+
+    results['request'] = {
+        'without_metrics_us': round(bare * 1e6, 1),
+        'with_metrics_us': round(instrumented * 1e6, 1),
+        'overhead_us': round((instrumented - bare) * 1e6, 1),
+        'overhead_pct': round((instrumented - bare) / bare * 100, 2),
+    }
+    report('metrics_overhead', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
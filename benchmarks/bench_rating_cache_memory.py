@@ -0,0 +1,81 @@
+"""Shared-cache footprint of the rating page as the number of viewers grows.
+
+Every seeded user requests the rating page once. The shared cache is a
+LocMemCache for the run so its contents can be measured directly. The
+``per_user_pages_bytes`` column is what caching one rendered page per user
+would have cost: the pickled size of a single authenticated response times
+the number of users.
+"""
+import argparse
+import pickle
+import time
+
+from benchmarks.common import setup_django, report, test_database, seed_users
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.core.cache.backends import locmem  # noqa: E402
+from django.http import HttpResponse  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+SHARED_LOCATION = 'bench-rating-shared'
+
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'random_joke.tiered_cache.TieredCache',
+        'LOCATION': 'bench-rating-l1',
+        'OPTIONS': {'L2_ALIAS': 'shared'},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': SHARED_LOCATION,
+        'OPTIONS': {'MAX_ENTRIES': 10_000_000},
+    },
+}
+
+
+def measure(users):
+    caches['default'].clear()
+    client = Client()
+    page_bytes = 0
+    started = time.perf_counter()
+
+    for user in users:
+        client.force_login(user)
+        response = client.get(reverse('joke_app:jokes_rating'))
+        if not page_bytes:
+            page = HttpResponse(response.content)
+            page_bytes = len(pickle.dumps(page, pickle.HIGHEST_PROTOCOL))
+
+    elapsed = time.perf_counter() - started
+    store = locmem._caches[SHARED_LOCATION]
+    shared_bytes = sum(len(value) for value in store.values())
+    return {
+        'requests_per_second': round(len(users) / elapsed, 1),
+        'shared_cache_entries': len(store),
+        'shared_cache_bytes': shared_bytes,
+        'bytes_per_user': round(shared_bytes / len(users), 1),
+        'per_user_pages_bytes': page_bytes * len(users),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, nargs='+', default=[100, 1000])
+    args = parser.parse_args()
+
+    results = {}
+    with test_database(), override_settings(ALLOWED_HOSTS=['*'], CACHES=BENCH_CACHES):
+        seed_users(max(args.users))
+        users = list(User.objects.order_by('id'))
+        for count in sorted(args.users):
+            results[count] = measure(users[:count])
+
+    report('rating_cache_memory', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
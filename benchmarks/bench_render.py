@@ -0,0 +1,134 @@
+"""Rendering time of the favourites page at 10, 100 and 1,000 favourites.
+
+No database or HTTP is involved: the templates are rendered directly from
+in-memory jokes with a request carrying a CSRF token.
+
+* ``per_row_forms``: the previous markup, a form with its own CSRF token
+  and URL lookups for every joke;
+* ``uncached_loader``: the current template, read and compiled on every
+  render as with a loader that does not cache;
+* ``current``: the current template through ``settings.TEMPLATES``.
+
+The rating page is measured on a fragment miss and a fragment hit.
+"""
+import argparse
+import time
+
+from benchmarks.common import setup_django, report
+
+setup_django()
+
+from django.contrib.auth.models import AnonymousUser, User  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.middleware.csrf import get_token  # noqa: E402
+from django.template import Engine, RequestContext, engines  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from joke_app.models import Joke  # noqa: E402
+
+PER_ROW_FORMS = """
+{% for joke in favourite_jokes %}
+  <li class="margin-10px">
+    {{ joke.text }}
+    <form class="favouriteForm" method="post" action="{% url 'joke_app:toggle_favourite' %}">
+      {% csrf_token %}
+      <input type="hidden" name="joke_id" value="{{ joke.id }}">
+      <input type="hidden" name="favourite" value="false">
+      <input type="hidden" name="next" value="{% url 'joke_app:favourites' %}">
+      <button type="submit" class="btn btn-light btn-sm">Delete</button>
+    </form>
+  </li>
+{% endfor %}
+"""
+
+
+def make_request(user):
+    request = RequestFactory().get('/')
+    request.user = user
+    get_token(request)
+    return request
+
+
+def timed(render, repeat):
+    render()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render()
+    return round((time.perf_counter() - started) / repeat * 1000, 3)
+
+
+def uncached_engine():
+    django_engine = engines['django'].engine
+    return Engine(
+        dirs=django_engine.dirs,
+        context_processors=django_engine.context_processors,
+        loaders=['django.template.loaders.filesystem.Loader',
+                 'django.template.loaders.app_directories.Loader'],
+        builtins=django_engine.builtins,
+        libraries=django_engine.libraries,
+    )
+
+
+def measure(args):
+    user = User(id=1, username='bench_user')
+    request = make_request(user)
+    per_row_forms = engines['django'].from_string(PER_ROW_FORMS)
+    uncached = uncached_engine()
+
+    results = {}
+    for size in args.sizes:
+        jokes = [Joke(id=i, text=f"Benchmark joke number {i} & its punchline") for i in range(1, size + 1)]
+        context = {'favourite_jokes': jokes}
+
+        def render_uncached():
+            template = uncached.get_template('joke_app/favourites.html')
+            return template.render(RequestContext(request, context))
+
+        results[f"favourites_{size}"] = {
+            'per_row_forms_ms': timed(lambda: per_row_forms.render(context, request), args.repeat),
+            'uncached_loader_ms': timed(render_uncached, args.repeat),
+            'current_ms': timed(
+                lambda: render_to_string('joke_app/favourites.html', context, request), args.repeat
+            ),
+        }
+
+    popular_jokes = [{'id': i, 'text': f"Popular joke {i}", 'favourite_count': 100 - i} for i in range(1, 16)]
+    rating = {
+        'popular_jokes': popular_jokes,
+        'favourite_ids': set(),
+        'rows': [(joke, False) for joke in popular_jokes],
+        'version': 1,
+        'favourite_states': '0' * len(popular_jokes),
+        'fragment_timeout': 60,
+    }
+    anonymous = {**rating, 'rows': [(joke, None) for joke in popular_jokes], 'favourite_states': 'anonymous'}
+    anonymous_request = make_request(AnonymousUser())
+    fragments = caches['template_fragments']
+
+    def rating_miss():
+        fragments.clear()
+        return render_to_string('joke_app/rating.html', rating, request)
+
+    results['rating_15'] = {
+        'fragment_miss_ms': timed(rating_miss, args.repeat),
+        'fragment_hit_ms': timed(lambda: render_to_string('joke_app/rating.html', rating, request), args.repeat),
+        'anonymous_ms': timed(lambda: render_to_string('joke_app/rating.html', anonymous, anonymous_request),
+                              args.repeat),
+    }
+    fragments.clear()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    results = measure(args)
+
+    report('render', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
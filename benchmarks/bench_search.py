@@ -0,0 +1,106 @@
+"""Search latency at a million jokes: the full-text index against a LIKE scan.
+
+Jokes are random sentences over a synthetic vocabulary with Zipf-like
+word frequencies, so there are common words, rare ones and shared
+prefixes. One user has ``--favourites`` of them as favourites. Every
+query runs through ``joke_app.search.search_jokes`` (``indexed``), the
+same with every match ranked instead of the first SEARCH_RANKED_MATCHES
+(``rank_all``) and the unindexed fallback used on other databases
+(``scan``), each returning SEARCH_RESULTS jokes.
+"""
+import argparse
+import random
+import string
+import time
+
+from benchmarks.common import setup_django, report, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from joke_app import search  # noqa: E402
+from joke_app.models import Joke, FavouriteJoke  # noqa: E402
+
+
+def vocabulary(size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(random.choices(string.ascii_lowercase, k=random.randint(3, 10))))
+    words = sorted(words)
+    random.shuffle(words)
+    return words
+
+
+def seed(jokes, favourites, words, batch_size=10000):
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    for start in range(0, jokes, batch_size):
+        texts = {' '.join(random.choices(words, weights, k=random.randint(6, 16)))
+                 for _ in range(min(batch_size, jokes - start))}
+        Joke.objects.bulk_create(
+            [Joke(text=text, content_hash=Joke.hash_text(text)) for text in texts], ignore_conflicts=True,
+        )
+
+    user = User.objects.create(username='bench_search', password='!')
+    joke_ids = random.sample(list(Joke.objects.values_list('id', flat=True)), favourites)
+    FavouriteJoke.objects.bulk_create([FavouriteJoke(owner=user, joke_id=joke_id) for joke_id in joke_ids])
+    return user
+
+
+def timed(run, repeat):
+    result = run()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return round((time.perf_counter() - started) / repeat * 1000, 3), len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jokes', type=int, default=1_000_000)
+    parser.add_argument('--words', type=int, default=20000, help='vocabulary size')
+    parser.add_argument('--favourites', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    results = {}
+    with test_database():
+        words = vocabulary(args.words)
+        started = time.perf_counter()
+        user = seed(args.jokes, args.favourites, words)
+        results['seed_s'] = round(time.perf_counter() - started, 1)
+        results['jokes'] = Joke.objects.count()
+
+        queries = {
+            'common_word': (words[0], None),
+            'rare_word': (words[-1], None),
+            'prefix_3': (words[10][:3], None),
+            'two_words': (f"{words[1]} {words[50]}", None),
+            'common_word_mine': (words[0], user.id),
+            'rare_word_mine': (words[-1], user.id),
+        }
+        limit = settings.SEARCH_RESULTS
+        for name, (query, owner_id) in queries.items():
+            indexed_ms, found = timed(lambda: search.search_jokes(query, owner_id, limit), args.repeat)
+            rank_all_ms, _ = timed(
+                lambda: search.search_jokes(query, owner_id, limit, candidates=args.jokes), args.repeat
+            )
+            scan_ms, scanned = timed(
+                lambda: search._scan(search.query_terms(query), owner_id, limit, 'default'), args.repeat
+            )
+            results[name] = {
+                'query': query,
+                'indexed_ms': indexed_ms,
+                'rank_all_ms': rank_all_ms,
+                'scan_ms': scan_ms,
+                'results': found,
+                'scan_results': scanned,
+            }
+
+    report('search', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""HTTP throughput of ``runserver`` against ``manage.py serve``.
+
+Each server is started as a separate process on a free local port, with
+the joke API pointed at a local stub, and driven over real HTTP at a fixed
+concurrency. Compared are ``runserver`` (one process, a thread per
+request), ``serve`` with pre-forked sync workers and ``serve --asgi`` with
+uvicorn workers. The servers use the configured database, which must be
+migrated; ``get_data`` reads it, ``index`` only touches the joke pool.
+Static files are collected into STATIC_ROOT first, as for a deployment,
+since the servers run with the manifest storage. Like a deployment they
+also need SHARED_CACHE_URL pointing at Redis or Memcached.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.common import setup_django, summarize, report
+
+setup_django()
+
+from django.urls import reverse  # noqa: E402
+from joke_app.checks import check_shared_cache  # noqa: E402
+from joke_app.tests.stub_api import StubJokeAPI  # noqa: E402
+
+ENDPOINTS = {
+    'index': 'joke_app:index',
+    'get_data': 'api:get_data',
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_commands(port, workers):
+    address = f"127.0.0.1:{port}"
+    serve = [sys.executable, 'manage.py', 'serve', '--bind', address, '--workers', str(workers)]
+    return {
+        'runserver': [sys.executable, 'manage.py', 'runserver', address, '--noreload'],
+        'serve_wsgi': serve,
+        'serve_asgi': serve + ['--asgi'],
+    }
+
+
+def collect_static(env):
+    subprocess.run([sys.executable, 'manage.py', 'collectstatic', '--noinput'],
+                   env=env, stdout=subprocess.DEVNULL, check=True)
+
+
+def start_server(command, base_url, env, timeout=30):
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(command)} exited with status {process.returncode}")
+        try:
+            requests.get(base_url + reverse('api:metrics'), timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{' '.join(command)} did not start within {timeout}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_endpoint(url, total, concurrency):
+    local = threading.local()
+
+    def one(_):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            ok = local.session.get(url, timeout=30).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        outcomes = list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize([latency for latency, _ in outcomes], elapsed)
+    result['errors'] = sum(1 for _, ok in outcomes if not ok)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', choices=('runserver', 'serve_wsgi', 'serve_asgi'),
+                        default=['runserver', 'serve_wsgi', 'serve_asgi'])
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=2000, help='requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=50, help='unmeasured requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=0, help='serve workers, 0 derives them from CPUs')
+    parser.add_argument('--latency', type=float, default=0.05, help='stub API latency (s)')
+    parser.add_argument('--pool-size', type=int, default=50, help='JOKE_POOL_SIZE, 0 disables the pool')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+    for error in check_shared_cache(None):
+        parser.error(f"{error.msg} {error.hint}")
+
+    results = {}
+    with StubJokeAPI(latency=args.latency) as stub:
+        env = dict(
+            os.environ,
+            JOKE_API_URL=stub.url,
+            JOKE_POOL_SIZE=str(args.pool_size),
+            JOKE_POOL_LOW_WATER=str(args.pool_size // 5),
+        )
+        collect_static(env)
+        for name in args.servers:
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            server_env = dict(env, ASYNC_VIEWS='True') if name == 'serve_asgi' else env
+            process = start_server(server_commands(port, args.workers)[name], base_url, server_env)
+            try:
+                results[name] = {}
+                for endpoint in args.endpoints:
+                    url = base_url + reverse(ENDPOINTS[endpoint])
+                    run_endpoint(url, args.warmup, args.concurrency)
+                    results[name][endpoint] = run_endpoint(url, args.requests, args.concurrency)
+            finally:
+                stop_server(process)
+
+    report('serve', vars(args), results, output=args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Windowed leaderboard latency: trending buckets against a GROUP BY over favourites.
+
+Favourites are inserted directly, spread evenly over the last week, with
+every user favouriting ``--per-user`` consecutive jokes of the catalog.
+The buckets are then rebuilt from them, laid out as after compaction.
+For each window the top 15 is computed three ways, uncached:
+
+* ``naive``: count the window's favourites grouped by joke;
+* ``naive_indexed``: the same with an index on ``created_at``, which the
+  app does not create;
+* ``buckets``: ``joke_app.trending.leaderboard``.
+
+All three are checked to return the same jokes and counts.
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from benchmarks.common import setup_django, report, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, models  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from joke_app import trending  # noqa: E402
+from joke_app.models import Joke, FavouriteJoke, FavouriteBucket  # noqa: E402
+
+CREATED_AT_INDEX = models.Index(fields=['created_at'], name='bench_favourite_created_idx')
+
+
+def seed(favourites, jokes, per_user, now, batch_size=50000):
+    Joke.objects.bulk_create(
+        [Joke(text=f"Trending joke {i}", content_hash=Joke.hash_text(f"Trending joke {i}")) for i in range(jokes)],
+        batch_size=batch_size,
+    )
+    joke_ids = list(Joke.objects.order_by('id').values_list('id', flat=True))
+    users = -(-favourites // per_user)
+    User.objects.bulk_create(
+        [User(username=f"bench_trending_{i}", password='!') for i in range(users)], batch_size=batch_size,
+    )
+    user_ids = list(User.objects.filter(username__startswith='bench_trending_').order_by('id')
+                    .values_list('id', flat=True))
+
+    week = int(trending.WINDOWS['7d'].total_seconds())
+    adapt = connection.ops.adapt_datetimefield_value
+    sql = (f"INSERT INTO {connection.ops.quote_name(FavouriteJoke._meta.db_table)} "
+           "(owner_id, joke_id, created_at) VALUES (%s, %s, %s)")
+    rows = ((user_ids[n // per_user], joke_ids[(n // per_user + n % per_user) % jokes],
+             adapt(now - timedelta(seconds=random.randrange(week))))
+            for n in range(favourites))
+    with connection.cursor() as cursor:
+        while batch := [row for _, row in zip(range(batch_size), rows)]:
+            cursor.executemany(sql, batch)
+
+
+def analyze():
+    # Planner statistics, as autovacuum would have gathered after the load
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def naive(window, now):
+    return list(
+        FavouriteJoke.objects.filter(created_at__gte=trending.window_start(window, now))
+        .values('joke').annotate(total=Count('id')).order_by('-total', 'joke')
+        .values_list('joke', 'total')[:15]
+    )
+
+
+def buckets(window, now):
+    return [(joke['id'], joke['favourite_count']) for joke in trending.leaderboard(window, 15, now)]
+
+
+def timed(run, repeat):
+    result = run()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return round((time.perf_counter() - started) / repeat * 1000, 3), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--favourites', type=int, default=10_000_000)
+    parser.add_argument('--jokes', type=int, default=5000)
+    parser.add_argument('--per-user', type=int, default=100, help='favourites per user')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    results = {}
+    with test_database():
+        now = timezone.now()
+        started = time.perf_counter()
+        seed(args.favourites, args.jokes, args.per_user, now)
+        results['seed_s'] = round(time.perf_counter() - started, 1)
+        started = time.perf_counter()
+        trending.rebuild(now=now)
+        results['rebuild_s'] = round(time.perf_counter() - started, 1)
+        analyze()
+        results['favourite_rows'] = FavouriteJoke.objects.count()
+        results['bucket_rows'] = FavouriteBucket.objects.count()
+
+        for window in trending.WINDOWS:
+            naive_ms, expected = timed(lambda: naive(window, now), args.repeat)
+            buckets_ms, actual = timed(lambda: buckets(window, now), args.repeat)
+            results[window] = {
+                'naive_ms': naive_ms,
+                'buckets_ms': buckets_ms,
+                'bucket_rows_read': FavouriteBucket.objects.filter(
+                    start__gte=trending.window_start(window, now)
+                ).count(),
+                'matches': actual == expected,
+            }
+
+        with connection.schema_editor() as editor:
+            editor.add_index(FavouriteJoke, CREATED_AT_INDEX)
+        analyze()
+        for window in trending.WINDOWS:
+            results[window]['naive_indexed_ms'], expected = timed(lambda: naive(window, now), args.repeat)
+            results[window]['matches'] &= buckets(window, now) == expected
+
+    report('trending', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks are plain scripts run from the project root, for example::
+
+    python -m benchmarks.bench_async_index --requests 500
+
+Each one prints its results as JSON on stdout.
+"""
+import io
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'random_joke.settings')
+    import django
+    django.setup()
+    # Per-request INFO logs would dominate the numbers
+    logging.disable(logging.INFO)
+
+    from django.conf import settings
+    from django.test import override_settings
+    # The manifest storage needs collectstatic to have run; benchmarks use
+    # the source files, as the tests do
+    override_settings(STORAGES={
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }).enable()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    return {
+        'requests': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def report(name, params, results, output=None):
+    document = json.dumps({'benchmark': name, 'params': params, 'results': results}, indent=2)
+    print(document)
+    if output:
+        with open(output, 'w') as f:
+            f.write(document + '\n')
+
+
+def use_joke_api(url, pool_size=0):
+    """Point the joke pool at ``url``; returns an ``override_settings`` context."""
+    from django.test import override_settings
+    from joke_app import joke_pool
+
+    joke_pool._pool = None
+    return override_settings(
+        JOKE_API_URL=url,
+        JOKE_POOL_SIZE=pool_size,
+        JOKE_POOL_LOW_WATER=pool_size // 5,
+        ALLOWED_HOSTS=['*'],
+    )
+
+
+@contextmanager
+def test_database():
+    """Run the benchmark against a throwaway copy of the configured database."""
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_users(count, jokes=100, favourites_per_user=2, batch_size=10000):
+    """Bulk-insert synthetic users, each with a few favourites of a shared joke set.
+
+    Bypasses model signals, so popularity counters are rebuilt at the end.
+    """
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from joke_app.models import Joke, FavouriteJoke
+
+    catalog = [Joke.objects.for_text(f"Benchmark joke {i}") for i in range(jokes)]
+    first_id = (User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+
+    for start in range(0, count, batch_size):
+        end = min(start + batch_size, count)
+        User.objects.bulk_create([
+            User(username=f"bench_user_{first_id + i}", password='!')
+            for i in range(start, end)
+        ])
+    user_ids = User.objects.filter(id__gte=first_id).order_by('id').values_list('id', flat=True)
+
+    batch = []
+    for n, user_id in enumerate(user_ids.iterator(chunk_size=batch_size)):
+        for k in range(favourites_per_user):
+            batch.append(FavouriteJoke(owner_id=user_id, joke=catalog[(n + k) % jokes]))
+        if len(batch) >= batch_size:
+            FavouriteJoke.objects.bulk_create(batch)
+            batch = []
+    FavouriteJoke.objects.bulk_create(batch)
+    call_command('rebuild_popularity', stdout=io.StringIO())
+
+
+@contextmanager
+def serve_app(host='127.0.0.1'):
+    """Serve the project over real HTTP from a threaded WSGI server; yields the base URL."""
+    import threading
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        # Headers and body go out in separate writes; without this every
+        # keep-alive response waits on the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadedWSGIServer):
+        request_queue_size = 1024
+
+    server = Server((host, 0), QuietHandler, allow_reuse_address=False)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
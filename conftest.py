@@ -0,0 +1,18 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def plain_static_storage(settings):
+    """The manifest storage needs collectstatic to have run; tests use the source files."""
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_template_fragments():
+    """Fragment keys reuse joke ids and versions, which repeat between tests."""
+    yield
+    caches['template_fragments'].clear()
@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import FavouriteJoke
+from .models import Joke, FavouriteJoke
 
+admin.site.register(Joke)
 admin.site.register(FavouriteJoke)
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class JokeAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'joke_app'
+
+    def ready(self):
+        import joke_app.checks
+        import joke_app.signals
@@ -0,0 +1,101 @@
+"""Version counters used to build cache keys for favourites-derived pages.
+
+Every favourite or user change bumps the owner's version and the global
+one (see ``signals.py``), so cached responses are invalidated by key
+instead of by re-running the query and comparing the result. The same
+versions make ETags: ``versioned_etag`` answers ``If-None-Match`` before
+the view runs.
+"""
+import time
+from functools import wraps
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from random_joke.tiered_cache import served_stale
+
+GLOBAL_VERSION_KEY = 'favourites_version'
+
+
+def user_version_key(user_id):
+    return f"favourites_version_{user_id}"
+
+
+def get_versions(user_id=None):
+    """Return ``(global_version, user_version)``; ``user_version`` is None without a user."""
+    keys = [GLOBAL_VERSION_KEY]
+    if user_id is not None:
+        keys.append(user_version_key(user_id))
+
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = _initial_version(key)
+
+    return (
+        versions[GLOBAL_VERSION_KEY],
+        versions.get(user_version_key(user_id)) if user_id is not None else None,
+    )
+
+
+def bump_versions(user_id=None, global_version=True):
+    keys = [GLOBAL_VERSION_KEY] if global_version else []
+    if user_id is not None:
+        keys.append(user_version_key(user_id))
+
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            _initial_version(key)
+
+
+def _initial_version(key):
+    # Start from the clock rather than 1 so an evicted counter can never
+    # come back to a value that still has cached responses under it
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key)
+
+
+def versioned_etag(etag_func, cache_control=None):
+    """Decorate a view with an ETag computed by ``etag_func(request, *args, **kwargs)``.
+
+    A matching ``If-None-Match`` gets a 304 without calling the view. The
+    ETag is only attached to 200 responses, and not to ones the view marked
+    ``no-store`` (fallbacks after a database error), so a client never
+    revalidates a degraded page. Neither is a response built from a value
+    ``get_or_compute`` served stale while another worker recomputes it: it
+    gets no ETag and ``no-cache`` only. ``etag_func`` may return None to
+    skip, and ``cache_control(request)`` gives the Cache-Control directives
+    for the others.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            etag = None
+            if request.method in ('GET', 'HEAD'):
+                etag = etag_func(request, *args, **kwargs)
+            if etag is not None:
+                etag = quote_etag(etag)
+                response = get_conditional_response(request, etag=etag)
+            else:
+                response = None
+
+            stale = False
+            if response is None:
+                token = served_stale.set(False)
+                try:
+                    response = view(request, *args, **kwargs)
+                    stale = served_stale.get()
+                finally:
+                    served_stale.reset(token)
+                if stale:
+                    # Built from an older version than ``etag`` names
+                    patch_cache_control(response, no_cache=True)
+                elif etag is not None and response.status_code == 200 and not response.has_header('ETag') \
+                        and 'no-store' not in response.get('Cache-Control', ''):
+                    response['ETag'] = etag
+            if cache_control is not None and not stale and 'no-store' not in response.get('Cache-Control', ''):
+                patch_cache_control(response, **cache_control(request))
+            return response
+        return inner
+    return decorator
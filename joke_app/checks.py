@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose add() and incr() are atomic across processes
+ATOMIC_CACHE_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """The shared cache holds recompute locks, version counters and sessions.
+
+    FileBasedCache checks then sets in add() and incr(), so several workers
+    can take one lock or lose a version bump, and it culls entries at
+    random. It stays usable as a stand-in for tests and with DEBUG on.
+    """
+    backend = settings.CACHES.get('shared', {}).get('BACKEND')
+    if settings.DEBUG or backend in ATOMIC_CACHE_BACKENDS:
+        return []
+    return [Error(
+        f"The 'shared' cache uses {backend}, which is not atomic across workers.",
+        hint="Set SHARED_CACHE_URL to a Redis or Memcached URL, e.g. redis://localhost:6379/1.",
+        id='joke_app.E001',
+    )]
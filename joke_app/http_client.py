@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from random_joke.metrics import UPSTREAM_REQUESTS, record_upstream
+
+logger = logging.getLogger('joke_app')
+
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+
+class CircuitBreaker:
+    """Stops calling upstream after ``failure_threshold`` consecutive failures.
+
+    Once ``cooldown`` seconds have passed a single probe request is let
+    through: success closes the circuit again, failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, cooldown=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self.opened_at >= self.cooldown:
+                self._set_state(self.HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+                if self.state != self.OPEN:
+                    self._set_state(self.OPEN)
+
+    def _set_state(self, state):
+        logger.warning("Joke API circuit breaker: %s -> %s", self.state, state)
+        self.state = state
+
+
+class JokeAPIClient:
+    """Keep-alive HTTP client for the joke API with timeouts and a circuit breaker."""
+
+    def __init__(self, connect_timeout=3.05, read_timeout=5, pool_maxsize=10, breaker=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_json(self, url):
+        if not self.breaker.allow_request():
+            UPSTREAM_REQUESTS.inc('sync', 'circuit_open')
+            raise CircuitOpenError(f"Circuit open, not calling {url}")
+
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            self.breaker.record_failure()
+            record_upstream('sync', _outcome(e), time.perf_counter() - started)
+            raise
+
+        self.breaker.record_success()
+        record_upstream('sync', 'ok', time.perf_counter() - started)
+        return data
+
+
+class AsyncJokeAPIClient:
+    """Non-blocking counterpart of JokeAPIClient built on httpx.
+
+    An ``httpx.AsyncClient`` is bound to the event loop it was created on,
+    so ``get_async_client()`` keeps one instance per running loop.
+    """
+
+    def __init__(self, connect_timeout=3.05, read_timeout=5, pool_maxsize=10, breaker=None):
+        self.breaker = breaker or CircuitBreaker()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_keepalive_connections=pool_maxsize, max_connections=None),
+        )
+
+    async def get_json(self, url):
+        if not self.breaker.allow_request():
+            UPSTREAM_REQUESTS.inc('async', 'circuit_open')
+            raise CircuitOpenError(f"Circuit open, not calling {url}")
+
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(url)
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self.breaker.record_failure()
+            record_upstream('async', _outcome(e), time.perf_counter() - started)
+            raise
+
+        self.breaker.record_success()
+        record_upstream('async', 'ok', time.perf_counter() - started)
+        return data
+
+
+def _outcome(error):
+    if isinstance(error, (requests.Timeout, httpx.TimeoutException)):
+        return 'timeout'
+    if isinstance(error, (requests.HTTPError, httpx.HTTPStatusError)):
+        return 'http_status'
+    if isinstance(error, (requests.RequestException, httpx.HTTPError)):
+        return 'connection_error'
+    return 'invalid_response'
+
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = JokeAPIClient(
+                    connect_timeout=settings.JOKE_API_CONNECT_TIMEOUT,
+                    read_timeout=settings.JOKE_API_READ_TIMEOUT,
+                    pool_maxsize=settings.JOKE_API_POOL_MAXSIZE,
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.JOKE_API_BREAKER_THRESHOLD,
+                        cooldown=settings.JOKE_API_BREAKER_COOLDOWN,
+                    ),
+                )
+    return _client
+
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncJokeAPIClient(
+            connect_timeout=settings.JOKE_API_CONNECT_TIMEOUT,
+            read_timeout=settings.JOKE_API_READ_TIMEOUT,
+            pool_maxsize=settings.JOKE_API_POOL_MAXSIZE,
+            breaker=get_client().breaker,
+        )
+        _async_clients[loop] = client
+    return client
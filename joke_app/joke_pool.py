@@ -0,0 +1,212 @@
+import logging
+import random
+import threading
+from collections import deque
+
+import httpx
+import requests
+from django.conf import settings
+from .http_client import get_client, get_async_client, CircuitOpenError
+
+logger = logging.getLogger('joke_app')
+
+FALLBACK_JOKE = "Could not fetch joke. Please try again later."
+
+FETCH_ERRORS = (requests.RequestException, httpx.HTTPError, ValueError, KeyError, TypeError)
+
+
+def parse_jokes(data):
+    if isinstance(data, dict):
+        data = [data]
+    return [f"{joke['setup']} {joke['punchline']}" for joke in data]
+
+
+def fetch_jokes(url):
+    return parse_jokes(get_client().get_json(url))
+
+
+async def afetch_jokes(url):
+    return parse_jokes(await get_async_client().get_json(url))
+
+
+class JokePool:
+    """Process-local buffer of jokes, refilled in batches from the upstream API.
+
+    ``get()`` serves from memory and kicks off a background refill once the
+    buffer drops to ``low_water``. Only an empty buffer makes the caller wait
+    for upstream, and then for a single batch; if that fails too, a recently
+    served joke is returned.
+    A ``size`` of 0 disables buffering and fetches upstream on every call.
+    """
+
+    def __init__(self, url, size=50, low_water=10, fetch=None, afetch=None):
+        self.url = url
+        self.size = size
+        self.low_water = low_water
+        self._fetch = fetch
+        self._afetch = afetch
+        self._jokes = deque()
+        self._stale = deque(maxlen=max(size, 1))
+        self._lock = threading.Lock()
+        self._stored = threading.Condition(self._lock)
+        self._refill_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_errors = 0
+
+    def get(self):
+        if self.size == 0:
+            return self._direct(self._fetch_batch())
+
+        joke = self._take_counted()
+        if joke is None:
+            # One upstream round trip at most; refill_in_background() tops up
+            # the rest once the request has its joke
+            if self._refill_lock.acquire(blocking=False):
+                try:
+                    self._store(self._fetch_batch())
+                finally:
+                    self._release_refill()
+                with self._lock:
+                    joke = self._take()
+            else:
+                # A refill is in flight: wait for its next batch, not the whole loop
+                with self._stored:
+                    self._stored.wait_for(lambda: self._jokes or not self._refill_lock.locked())
+                    joke = self._take()
+            if joke is None:
+                joke = self._stale_joke()
+
+        if len(self._jokes) <= self.low_water:
+            self.refill_in_background()
+        return joke
+
+    async def aget(self):
+        if self.size == 0:
+            return self._direct(await self._afetch_batch())
+
+        joke = self._take_counted()
+        if joke is None:
+            if self._refill_lock.acquire(blocking=False):
+                try:
+                    self._store(await self._afetch_batch())
+                finally:
+                    self._release_refill()
+            with self._lock:
+                joke = self._take()
+            if joke is None:
+                joke = self._stale_joke()
+
+        if len(self._jokes) <= self.low_water:
+            self.refill_in_background()
+        return joke
+
+    def refill(self, blocking=True):
+        if not self._refill_lock.acquire(blocking=blocking):
+            return
+        try:
+            while len(self._jokes) < self.size:
+                if not self._store(self._fetch_batch()):
+                    return
+        finally:
+            self._release_refill()
+
+    def refill_in_background(self):
+        if self._refill_lock.locked():
+            return
+        threading.Thread(
+            target=self.refill, kwargs={'blocking': False}, daemon=True
+        ).start()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'refills': self.refills,
+            'refill_errors': self.refill_errors,
+            'buffered': len(self._jokes),
+        }
+
+    def _fetch_batch(self):
+        try:
+            return (self._fetch or fetch_jokes)(self.url)
+        except FETCH_ERRORS as e:
+            return self._fetch_failed(e)
+
+    async def _afetch_batch(self):
+        try:
+            return await (self._afetch or afetch_jokes)(self.url)
+        except FETCH_ERRORS as e:
+            return self._fetch_failed(e)
+
+    def _fetch_failed(self, e):
+        if isinstance(e, CircuitOpenError):
+            logger.info("Skipping joke fetch: %s", e)
+        else:
+            logger.error("Outer API error occurred: %s", e, exc_info=True)
+        self.refill_errors += 1
+        return []
+
+    def _store(self, batch):
+        if not batch:
+            return False
+        with self._lock:
+            self._jokes.extend(batch[:self.size - len(self._jokes)])
+            self.refills += 1
+            self._stored.notify_all()
+        logger.info("Joke pool refilled with %s jokes", len(batch))
+        return True
+
+    def _release_refill(self):
+        self._refill_lock.release()
+        # Wake requests waiting on a refill that ended without storing anything
+        with self._stored:
+            self._stored.notify_all()
+
+    def _direct(self, batch):
+        with self._lock:
+            self.misses += 1
+            if batch:
+                self._stale.append(batch[0])
+                return batch[0]
+        return self._stale_joke()
+
+    def _take_counted(self):
+        with self._lock:
+            joke = self._take()
+            if joke is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return joke
+
+    def _take(self):
+        if not self._jokes:
+            return None
+        joke = self._jokes.popleft()
+        self._stale.append(joke)
+        return joke
+
+    def _stale_joke(self):
+        with self._lock:
+            if self._stale:
+                return random.choice(self._stale)
+        return FALLBACK_JOKE
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = JokePool(
+                    settings.JOKE_API_URL,
+                    size=settings.JOKE_POOL_SIZE,
+                    low_water=settings.JOKE_POOL_LOW_WATER,
+                )
+    return _pool
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from joke_app import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge old trending buckets into hourly ones and drop those no window "
+        "reaches. Run it periodically, e.g. hourly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recount all buckets from the favourites instead. Use after bulk '
+                 'changes that bypass the model signals.',
+        )
+
+    def handle(self, *args, rebuild, **options):
+        if rebuild:
+            written = trending.rebuild()
+            self.stdout.write(f"Rebuilt {written} trending buckets")
+            return
+
+        hours, deleted = trending.compact()
+        self.stdout.write(f"Compacted {hours} hours, deleted {deleted} trending buckets")
@@ -0,0 +1,200 @@
+import csv
+import gzip
+import io
+import json
+import os
+import resource
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from joke_app.models import Joke
+
+FORMATS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv'}
+
+COPY_TABLE = 'joke_import'
+
+
+def open_source(path):
+    """Text stream of ``path``, ``-`` for stdin; ``.gz`` files are decompressed on the fly."""
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    return FORMATS.get(os.path.splitext(name)[1].lower())
+
+
+def joke_text(record, field):
+    """The joke in one record: ``field``, or setup and punchline as the joke API sends them."""
+    if isinstance(record, str):
+        return record
+    if not isinstance(record, dict):
+        return None
+    if record.get(field):
+        return record[field]
+    if record.get('setup') and record.get('punchline'):
+        return f"{record['setup']} {record['punchline']}"
+    return None
+
+
+def read_records(source, file_format, field):
+    """Yield the raw text of every record, None for one that cannot be used."""
+    if file_format == 'csv':
+        for row in csv.DictReader(source):
+            yield joke_text(row, field)
+        return
+
+    for line in source:
+        if not line.strip():
+            continue
+        try:
+            yield joke_text(json.loads(line), field)
+        except json.JSONDecodeError:
+            yield None
+
+
+def dedupe(texts):
+    """``{content_hash: text}`` of the normalized, non-empty texts, first occurrence kept."""
+    jokes = {}
+    for text in texts:
+        text = Joke.normalize(text) if isinstance(text, str) else ''
+        if text:
+            jokes.setdefault(Joke.hash_text(text), text)
+    return jokes
+
+
+def insert_bulk(jokes):
+    """Insert the jokes not already in the catalog; returns how many were new."""
+    existing = set(Joke.objects.filter(content_hash__in=jokes).values_list('content_hash', flat=True))
+    new = [Joke(text=text, content_hash=content_hash)
+           for content_hash, text in jokes.items() if content_hash not in existing]
+    # A concurrent writer may still add one of them first
+    Joke.objects.bulk_create(new, ignore_conflicts=True)
+    return len(new)
+
+
+def insert_copy(jokes):
+    """PostgreSQL only: COPY the batch into a temporary table, then insert what is new from it."""
+    table = connection.ops.quote_name(Joke._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {COPY_TABLE} "
+            "(text text, content_hash varchar(64)) ON COMMIT DELETE ROWS"
+        )
+        with cursor.cursor.copy(f"COPY {COPY_TABLE} (text, content_hash) FROM STDIN") as copy:
+            for content_hash, text in jokes.items():
+                copy.write_row((text, content_hash))
+        cursor.execute(
+            f"INSERT INTO {table} (text, content_hash, favourite_count) "
+            f"SELECT text, content_hash, 0 FROM {COPY_TABLE} ON CONFLICT (content_hash) DO NOTHING"
+        )
+        return cursor.rowcount
+
+
+def read_checkpoint(path, source):
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return 0
+    if checkpoint.get('source') != source:
+        raise CommandError(f"{path} records progress of {checkpoint.get('source')}, not {source}")
+    return checkpoint['records']
+
+
+def write_checkpoint(path, source, records):
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump({'source': source, 'records': records}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def peak_memory_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 2**20 if sys.platform == 'darwin' else 2**10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+class Command(BaseCommand):
+    help = (
+        "Import jokes from a JSONL or CSV file (optionally gzipped, - for "
+        "stdin) into the catalog. The file is streamed, deduplicated by "
+        "content hash and inserted one batch per transaction; progress is "
+        "saved after every batch so an interrupted import can --resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', dest='file_format', choices=sorted(set(FORMATS.values())),
+            help='Input format; detected from the file extension by default.',
+        )
+        parser.add_argument(
+            '--field', default='text',
+            help='JSON key or CSV column holding the joke. Records without it '
+                 'are read as setup and punchline.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Records per transaction.')
+        parser.add_argument(
+            '--method', choices=('bulk', 'copy'), default='bulk',
+            help='bulk_create, or COPY through a temporary table (PostgreSQL only).',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Progress file; defaults to PATH.progress. Removed when the import completes.',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Skip the records a previous run saved as imported.',
+        )
+
+    def handle(self, *args, path, file_format, field, batch_size, method, checkpoint, resume, **options):
+        file_format = file_format or detect_format(path)
+        if file_format is None:
+            raise CommandError(f"Cannot tell the format of {path}; pass --format")
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError("--method copy needs PostgreSQL")
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive")
+
+        source = 'stdin' if path == '-' else os.path.abspath(path)
+        checkpoint = checkpoint or (None if path == '-' else f"{path}.progress")
+        if resume and checkpoint is None:
+            raise CommandError("--resume needs a --checkpoint when reading stdin")
+        skip = read_checkpoint(checkpoint, source) if resume else 0
+        insert = insert_copy if method == 'copy' else insert_bulk
+
+        started = time.perf_counter()
+        read = inserted = invalid = 0
+        try:
+            with open_source(path) as stream:
+                records = islice(read_records(stream, file_format, field), skip, None)
+                while batch := list(islice(records, batch_size)):
+                    jokes = dedupe(batch)
+                    with transaction.atomic():
+                        inserted += insert(jokes) if jokes else 0
+                    read += len(batch)
+                    invalid += sum(1 for text in batch if not isinstance(text, str) or not text.strip())
+                    if checkpoint:
+                        write_checkpoint(checkpoint, source, skip + read)
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f"{skip + read} records, {inserted} new jokes")
+        except (OSError, csv.Error, UnicodeDecodeError) as error:
+            raise CommandError(f"Reading {path} failed after {skip + read} records: {error}")
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        duplicates = read - invalid - inserted
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Read {read} records{f' after skipping {skip}' if skip else ''}: "
+            f"{inserted} new jokes, {duplicates} duplicates, {invalid} invalid "
+            f"in {elapsed:.1f}s ({read / elapsed if elapsed else 0:.0f} rows/s, "
+            f"peak memory {peak_memory_mb():.0f} MB)"
+        )
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max
+from joke_app.models import Joke, FavouriteJoke
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Joke.favourite_count from FavouriteJoke rows, one id range "
+        "at a time. Use after bulk changes that bypass the model signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Number of joke ids to process per transaction.',
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only report mismatched counters, do not fix them.',
+        )
+
+    def handle(self, *args, chunk_size, verify, **options):
+        max_id = Joke.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        checked = mismatched = 0
+
+        for start in range(0, max_id + 1, chunk_size):
+            with transaction.atomic():
+                checked_chunk, stale = self.check_chunk(start, start + chunk_size)
+                checked += checked_chunk
+                mismatched += len(stale)
+                if stale and not verify:
+                    Joke.objects.bulk_update(stale, ['favourite_count'])
+
+        action = 'found' if verify else 'fixed'
+        self.stdout.write(f"Checked {checked} jokes, {action} {mismatched} mismatched counters")
+        if verify and mismatched:
+            raise CommandError(f"{mismatched} popularity counters are out of date")
+
+    def check_chunk(self, start, end):
+        actual = dict(
+            FavouriteJoke.objects.filter(joke_id__gte=start, joke_id__lt=end)
+            .values('joke').annotate(total=Count('id')).order_by()
+            .values_list('joke', 'total')
+        )
+        jokes = Joke.objects.filter(id__gte=start, id__lt=end).only('id', 'favourite_count')
+
+        checked = 0
+        stale = []
+        for joke in jokes:
+            checked += 1
+            total = actual.get(joke.id, 0)
+            if joke.favourite_count != total:
+                joke.favourite_count = total
+                stale.append(joke)
+        return checked, stale
@@ -0,0 +1,109 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import get_resolver
+
+WSGI_APP = 'random_joke.wsgi:application'
+ASGI_APP = 'random_joke.asgi:application'
+ASGI_WORKER = 'uvicorn_worker.UvicornWorker'
+
+
+def default_workers(cpus=None):
+    """The usual ``2 * CPUs + 1`` for sync workers."""
+    return 2 * (cpus or os.cpu_count() or 1) + 1
+
+
+def server_options(*, bind, workers, threads, max_requests, max_requests_jitter,
+                   timeout, graceful_timeout, asgi):
+    """Gunicorn settings for the given command line options."""
+    return {
+        'bind': bind,
+        'workers': workers or default_workers(),
+        'threads': threads,
+        'worker_class': ASGI_WORKER if asgi else 'sync' if threads == 1 else 'gthread',
+        # Import the project once in the master so workers share the loaded
+        # modules and URL patterns copy-on-write instead of each importing them
+        'preload_app': True,
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests_jitter if max_requests else 0,
+        'timeout': timeout,
+        'graceful_timeout': graceful_timeout,
+        'post_fork': post_fork,
+    }
+
+
+def post_fork(server, worker):
+    # Anything opened while preloading belongs to the master; a worker must
+    # not reuse its sockets
+    connections.close_all()
+
+
+def make_application(app_path, options):
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.util import import_app
+
+    class ServerApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            application = import_app(app_path)
+            get_resolver().url_patterns  # resolve the URLconf before forking
+            return application
+
+    return ServerApplication()
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the project with gunicorn: pre-forked workers, the app loaded "
+        "before forking, worker recycling and graceful shutdown on SIGTERM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default=settings.SERVER_BIND)
+        parser.add_argument(
+            '--workers', type=int, default=settings.SERVER_WORKERS,
+            help='Worker processes; 0 means 2 * CPUs + 1.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=settings.SERVER_THREADS,
+            help='Threads per sync worker.',
+        )
+        parser.add_argument(
+            '--max-requests', type=int, default=settings.SERVER_MAX_REQUESTS,
+            help='Restart a worker after this many requests; 0 disables recycling.',
+        )
+        parser.add_argument(
+            '--max-requests-jitter', type=int, default=settings.SERVER_MAX_REQUESTS_JITTER,
+            help='Random extra requests so workers do not all restart together.',
+        )
+        parser.add_argument('--timeout', type=int, default=settings.SERVER_TIMEOUT)
+        parser.add_argument(
+            '--graceful-timeout', type=int, default=settings.SERVER_GRACEFUL_TIMEOUT,
+            help='Seconds workers get to finish in-flight requests after SIGTERM.',
+        )
+        parser.add_argument(
+            '--asgi', action='store_true', default=settings.ASYNC_VIEWS,
+            help='Serve random_joke.asgi with uvicorn workers (default when ASYNC_VIEWS is set).',
+        )
+
+    def handle(self, *args, asgi, **options):
+        if asgi and not settings.ASYNC_VIEWS:
+            # Settings are loaded before random_joke.asgi could set it, so the
+            # URLconf would route the index to the sync view
+            raise CommandError("--asgi needs ASYNC_VIEWS=True in the environment")
+        options = server_options(
+            asgi=asgi, **{key: options[key] for key in (
+                'bind', 'workers', 'threads', 'max_requests', 'max_requests_jitter',
+                'timeout', 'graceful_timeout',
+            )}
+        )
+        try:
+            application = make_application(ASGI_APP if asgi else WSGI_APP, options)
+        except ImportError as error:
+            raise CommandError(f"gunicorn is not installed: {error}")
+        application.run()
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('joke_app', '0006_alter_favouritejoke_joke'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Joke',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='favouritejoke',
+            name='joke',
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='favouritejoke',
+            name='joke_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='joke_app.joke'),
+        ),
+    ]
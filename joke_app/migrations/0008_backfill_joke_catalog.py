@@ -0,0 +1,77 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:05
+
+import hashlib
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def normalize(text):
+    return ' '.join(text.split())
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def backfill_jokes(apps, schema_editor):
+    Joke = apps.get_model('joke_app', 'Joke')
+    FavouriteJoke = apps.get_model('joke_app', 'FavouriteJoke')
+
+    joke_ids = {}
+    batch = []
+    favourites = FavouriteJoke.objects.order_by('id').only('id', 'joke')
+    for favourite in favourites.iterator(chunk_size=BATCH_SIZE):
+        text = normalize(favourite.joke)
+        content_hash = hash_text(text)
+        if content_hash not in joke_ids:
+            joke, _ = Joke.objects.get_or_create(
+                content_hash=content_hash,
+                defaults={'text': text},
+            )
+            joke_ids[content_hash] = joke.id
+        favourite.joke_ref_id = joke_ids[content_hash]
+        batch.append(favourite)
+
+        if len(batch) >= BATCH_SIZE:
+            FavouriteJoke.objects.bulk_update(batch, ['joke_ref'])
+            batch = []
+    FavouriteJoke.objects.bulk_update(batch, ['joke_ref'])
+
+    seen = set()
+    duplicates = []
+    rows = FavouriteJoke.objects.order_by('id').values_list('id', 'owner_id', 'joke_ref_id')
+    for favourite_id, owner_id, joke_id in rows.iterator(chunk_size=BATCH_SIZE):
+        if (owner_id, joke_id) in seen:
+            duplicates.append(favourite_id)
+        else:
+            seen.add((owner_id, joke_id))
+
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        FavouriteJoke.objects.filter(id__in=duplicates[start:start + BATCH_SIZE]).delete()
+
+
+def restore_joke_text(apps, schema_editor):
+    FavouriteJoke = apps.get_model('joke_app', 'FavouriteJoke')
+
+    batch = []
+    favourites = FavouriteJoke.objects.select_related('joke_ref').order_by('id')
+    for favourite in favourites.iterator(chunk_size=BATCH_SIZE):
+        favourite.joke = favourite.joke_ref.text
+        batch.append(favourite)
+
+        if len(batch) >= BATCH_SIZE:
+            FavouriteJoke.objects.bulk_update(batch, ['joke'])
+            batch = []
+    FavouriteJoke.objects.bulk_update(batch, ['joke'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('joke_app', '0007_joke_favouritejoke_joke_ref'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_jokes, restore_joke_text),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('joke_app', '0008_backfill_joke_catalog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='favouritejoke',
+            name='joke',
+        ),
+        migrations.RenameField(
+            model_name='favouritejoke',
+            old_name='joke_ref',
+            new_name='joke',
+        ),
+        migrations.AlterField(
+            model_name='favouritejoke',
+            name='joke',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='joke_app.joke'),
+        ),
+        migrations.AddConstraint(
+            model_name='favouritejoke',
+            constraint=models.UniqueConstraint(fields=('owner', 'joke'), name='unique_favourite_joke'),
+        ),
+    ]
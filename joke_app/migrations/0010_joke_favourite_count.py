@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+BATCH_SIZE = 2000
+
+
+def backfill_favourite_counts(apps, schema_editor):
+    Joke = apps.get_model('joke_app', 'Joke')
+    FavouriteJoke = apps.get_model('joke_app', 'FavouriteJoke')
+
+    counts = FavouriteJoke.objects.values('joke').annotate(total=Count('id')).order_by()
+    batch = []
+    for row in counts.iterator(chunk_size=BATCH_SIZE):
+        batch.append(Joke(id=row['joke'], favourite_count=row['total']))
+
+        if len(batch) >= BATCH_SIZE:
+            Joke.objects.bulk_update(batch, ['favourite_count'])
+            batch = []
+    Joke.objects.bulk_update(batch, ['favourite_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('joke_app', '0009_favouritejoke_joke_fk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joke',
+            name='favourite_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='joke',
+            index=models.Index(fields=['-favourite_count', 'id'], name='joke_popularity_idx'),
+        ),
+        migrations.RunPython(backfill_favourite_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('joke_app', '0010_joke_favourite_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favouritejoke',
+            index=models.Index(fields=['owner', 'id'], name='favourite_owner_id_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('joke_app', '0011_favouritejoke_owner_id_idx'),
+    ]
+
+    operations = [
+        # Added without a default first: existing favourites keep NULL rather
+        # than all appearing to have been added at migration time
+        migrations.AddField(
+            model_name='favouritejoke',
+            name='created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='favouritejoke',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+        migrations.CreateModel(
+            name='FavouriteBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('joke', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='joke_app.joke')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['start'], name='favourite_bucket_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('joke', 'start'), name='unique_favourite_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:02
+
+from django.db import migrations
+
+# PostgreSQL computes the tsvector on every insert and update of a joke
+POSTGRESQL_SQL = [
+    "ALTER TABLE joke_app_joke ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', text)) STORED",
+    "CREATE INDEX joke_search_idx ON joke_app_joke USING GIN (search_vector)",
+]
+POSTGRESQL_REVERSE_SQL = [
+    "DROP INDEX joke_search_idx",
+    "ALTER TABLE joke_app_joke DROP COLUMN search_vector",
+]
+
+# SQLite keeps an external-content FTS5 table in step with triggers. Altering
+# a table on SQLite rebuilds it and drops its triggers, so a later migration
+# that alters joke_app_joke has to create them again
+SQLITE_SQL = [
+    "CREATE VIRTUAL TABLE joke_app_joke_search USING fts5("
+    "text, content='joke_app_joke', content_rowid='id', tokenize='porter unicode61', prefix='2 3')",
+    "CREATE TRIGGER joke_app_joke_search_insert AFTER INSERT ON joke_app_joke BEGIN "
+    "INSERT INTO joke_app_joke_search (rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER joke_app_joke_search_delete AFTER DELETE ON joke_app_joke BEGIN "
+    "INSERT INTO joke_app_joke_search (joke_app_joke_search, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER joke_app_joke_search_update AFTER UPDATE OF text ON joke_app_joke BEGIN "
+    "INSERT INTO joke_app_joke_search (joke_app_joke_search, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO joke_app_joke_search (rowid, text) VALUES (new.id, new.text); END",
+    "INSERT INTO joke_app_joke_search (joke_app_joke_search) VALUES ('rebuild')",
+]
+SQLITE_REVERSE_SQL = [
+    "DROP TRIGGER joke_app_joke_search_insert",
+    "DROP TRIGGER joke_app_joke_search_delete",
+    "DROP TRIGGER joke_app_joke_search_update",
+    "DROP TABLE joke_app_joke_search",
+]
+
+
+def run_for_vendor(postgresql_sql, sqlite_sql):
+    def run(apps, schema_editor):
+        statements = {
+            'postgresql': postgresql_sql,
+            'sqlite': sqlite_sql,
+        }.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('joke_app', '0012_favouritejoke_created_at_favouritebucket'),
+    ]
+
+    operations = [
+        # Other databases get no index; joke_app.search falls back to a scan
+        migrations.RunPython(
+            run_for_vendor(POSTGRESQL_SQL, SQLITE_SQL),
+            run_for_vendor(POSTGRESQL_REVERSE_SQL, SQLITE_REVERSE_SQL),
+        ),
+    ]
@@ -1,9 +1,207 @@
-from django.db import models
+import hashlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .cache_versions import bump_versions
+
+
+class JokeManager(models.Manager):
+    def for_text(self, text):
+        text = Joke.normalize(text)
+        joke, _ = self.get_or_create(
+            content_hash=Joke.hash_text(text),
+            defaults={'text': text},
+        )
+        return joke
+
+    async def afor_text(self, text):
+        text = Joke.normalize(text)
+        joke, _ = await self.aget_or_create(
+            content_hash=Joke.hash_text(text),
+            defaults={'text': text},
+        )
+        return joke
+
+
+class Joke(models.Model):
+    text = models.TextField()
+    content_hash = models.CharField(max_length=64, unique=True)
+    favourite_count = models.PositiveIntegerField(default=0)
+
+    objects = JokeManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-favourite_count', 'id'], name='joke_popularity_idx'),
+        ]
+
+    @staticmethod
+    def normalize(text):
+        return ' '.join(text.split())
+
+    @staticmethod
+    def hash_text(text):
+        return hashlib.sha256(Joke.normalize(text).encode('utf-8')).hexdigest()
+
+    def __str__(self):
+        return f"{self.text[:30]}..."
+
+
+class FavouriteJokeManager(models.Manager):
+    """Atomic add/remove that also maintain ``Joke.favourite_count``.
+
+    Both return ``(changed, favourite_count)``; ``favourite_count`` is None
+    when the joke does not exist. The unique constraint makes a concurrent
+    duplicate add a no-op instead of a second row. On PostgreSQL the write
+    and the counter update are a single statement (data-modifying CTE);
+    elsewhere they run as separate statements in one transaction. Raw SQL
+    skips the model signals, so trending buckets and cache versions are
+    updated here.
+    """
+
+    ADD_SQL = (
+        "INSERT INTO {favourite} (owner_id, joke_id, created_at) VALUES (%s, %s, %s) "
+        "ON CONFLICT (owner_id, joke_id) DO NOTHING RETURNING joke_id, created_at"
+    )
+    REMOVE_SQL = (
+        "DELETE FROM {favourite} WHERE owner_id = %s AND joke_id = %s "
+        "RETURNING joke_id, created_at"
+    )
+    COUNTER_SQL = {
+        1: "UPDATE {joke} SET favourite_count = favourite_count + 1 WHERE id IN ({ids})",
+        -1: "UPDATE {joke} SET favourite_count = favourite_count - 1 WHERE id IN ({ids}) AND favourite_count > 0",
+    }
+    COUNT_SQL = "SELECT favourite_count FROM {joke} WHERE id = %s"
+
+    def add_favourite(self, owner_id, joke_id):
+        created_at = connections[self.db].ops.adapt_datetimefield_value(timezone.now())
+        return self._write([owner_id, joke_id, created_at], joke_id, self.ADD_SQL, 1)
+
+    def remove_favourite(self, owner_id, joke_id):
+        return self._write([owner_id, joke_id], joke_id, self.REMOVE_SQL, -1)
+
+    async def aadd_favourite(self, owner_id, joke_id):
+        return await sync_to_async(self.add_favourite)(owner_id, joke_id)
+
+    async def aremove_favourite(self, owner_id, joke_id):
+        return await sync_to_async(self.remove_favourite)(owner_id, joke_id)
+
+    def _write(self, params, joke_id, write_sql, delta):
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        tables = {'favourite': quote(self.model._meta.db_table), 'joke': quote(Joke._meta.db_table)}
+
+        with transaction.atomic(using=self.db), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                counter_sql = self.COUNTER_SQL[delta].format(ids='SELECT joke_id FROM changed', **tables)
+                cursor.execute(
+                    f"WITH changed AS ({write_sql.format(**tables)}), "
+                    f"counted AS ({counter_sql} RETURNING favourite_count) "
+                    "SELECT EXISTS (SELECT 1 FROM changed), (SELECT created_at FROM changed), "
+                    "COALESCE((SELECT favourite_count FROM counted), "
+                    f"({self.COUNT_SQL.format(**tables)}))",
+                    [*params, joke_id],
+                )
+                changed, created_at, favourite_count = cursor.fetchone()
+            else:
+                cursor.execute(write_sql.format(**tables), params)
+                row = cursor.fetchone()
+                changed, created_at = row is not None, row and row[1]
+                if changed:
+                    cursor.execute(self.COUNTER_SQL[delta].format(ids='%s', **tables), [joke_id])
+                cursor.execute(self.COUNT_SQL.format(**tables), [joke_id])
+                row = cursor.fetchone()
+                favourite_count = row[0] if row else None
+
+            if changed:
+                FavouriteBucket.objects.db_manager(self.db).record([(joke_id, created_at)], delta)
+
+        if changed:
+            bump_versions(params[0])
+        return changed, favourite_count
+
 
 class FavouriteJoke(models.Model):
-    joke = models.TextField()
+    joke = models.ForeignKey(Joke, on_delete=models.CASCADE)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    # None for favourites added before the time was recorded
+    created_at = models.DateTimeField(default=timezone.now, null=True)
+
+    objects = FavouriteJokeManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'joke'], name='unique_favourite_joke'),
+        ]
+        indexes = [
+            # Keyset pagination of a user's favourites in the order they were added
+            models.Index(fields=['owner', 'id'], name='favourite_owner_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"USER: {self.owner} | JOKE: {self.joke.text[:30]}..."
+
+
+class FavouriteBucketManager(models.Manager):
+    """Per-joke favourite counts in fixed time buckets (see ``joke_app.trending``)."""
+
+    UPSERT_SQL = (
+        "INSERT INTO {bucket} (joke_id, start, count) VALUES (%s, %s, %s) "
+        "ON CONFLICT (joke_id, start) DO UPDATE SET count = {bucket}.count + excluded.count"
+    )
+
+    def record(self, favourites, delta):
+        """Add ``delta`` to the bucket of each ``(joke_id, created_at)``.
+
+        A removal is taken off the bucket the favourite was added in, so a
+        window sums exactly the favourites added in it that still exist.
+        Favourites without ``created_at`` are not counted.
+        """
+        counts = Counter(
+            (joke_id, FavouriteBucket.bucket_start(created_at))
+            for joke_id, created_at in favourites if created_at is not None
+        )
+        if not counts:
+            return
+
+        connection = connections[self.db]
+        sql = self.UPSERT_SQL.format(bucket=connection.ops.quote_name(self.model._meta.db_table))
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [
+                (joke_id, connection.ops.adapt_datetimefield_value(start), count * delta)
+                for (joke_id, start), count in counts.items()
+            ])
+
+
+class FavouriteBucket(models.Model):
+    joke = models.ForeignKey(Joke, on_delete=models.CASCADE)
+    start = models.DateTimeField()
+    # Can go below zero in a bucket that only saw removals after compaction
+    count = models.IntegerField(default=0)
+
+    objects = FavouriteBucketManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['joke', 'start'], name='unique_favourite_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['start'], name='favourite_bucket_start_idx'),
+        ]
+
+    @staticmethod
+    def bucket_start(value, size=None):
+        """Start of the ``size`` long bucket (TRENDING_BUCKET_SECONDS by default) holding ``value``."""
+        size = int((size or timedelta(seconds=settings.TRENDING_BUCKET_SECONDS)).total_seconds())
+        if timezone.is_naive(value):
+            # SQLite hands back naive UTC values from raw queries
+            value = value.replace(tzinfo=dt_timezone.utc)
+        seconds = int(value.timestamp())
+        return datetime.fromtimestamp(seconds - seconds % size, tz=dt_timezone.utc)
 
     def __str__(self):
-        return f"USER: {self.owner} | JOKE: {self.joke[:30]}..."
\ No newline at end of file
+        return f"JOKE: {self.joke_id} | {self.start:%Y-%m-%d %H:%M}: {self.count}"
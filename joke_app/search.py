@@ -0,0 +1,88 @@
+"""Full-text search over the joke catalog.
+
+The index is kept by the database itself (migration 0013), so every joke
+written, whether by a favourite, the batch API or a bulk load, is
+searchable as soon as its transaction commits:
+
+* PostgreSQL: a generated ``tsvector`` column with a GIN index;
+* SQLite: an FTS5 table updated by triggers.
+
+Every word of the query has to match, as a prefix of a word in the joke.
+Matches are ordered by relevance, then popularity. Other databases get
+the same matching from an unindexed scan, ordered by popularity.
+"""
+import re
+from django.conf import settings
+from django.db import connections
+from .models import Joke, FavouriteJoke
+
+MAX_TERMS = 8
+
+# Scoring every match of a common word costs far more than finding them, so
+# only the first ``candidates`` matches are scored and ordered
+POSTGRESQL_SQL = (
+    "SELECT id, text, favourite_count FROM ("
+    "SELECT joke.id, joke.text, joke.favourite_count, ts_rank(joke.search_vector, query) AS rank "
+    "FROM {joke} joke, to_tsquery('english', %s) query "
+    "WHERE joke.search_vector @@ query{mine} LIMIT %s"
+    ") matches ORDER BY rank DESC, favourite_count DESC, id LIMIT %s"
+)
+SQLITE_SQL = (
+    "SELECT id, text, favourite_count FROM ("
+    "SELECT joke.id, joke.text, joke.favourite_count, {search}.rank AS rank "
+    "FROM {search} JOIN {joke} joke ON joke.id = {search}.rowid "
+    "WHERE {search} MATCH %s{mine} LIMIT %s"
+    ") matches ORDER BY rank, favourite_count DESC, id LIMIT %s"
+)
+MINE_SQL = (
+    " AND EXISTS (SELECT 1 FROM {favourite} favourite "
+    "WHERE favourite.joke_id = joke.id AND favourite.owner_id = %s)"
+)
+
+
+def query_terms(query):
+    """Lowercased words of ``query``; punctuation never reaches the query syntax."""
+    return re.findall(r'[^\W_]+', query.lower())[:MAX_TERMS]
+
+
+def search_jokes(query, owner_id=None, limit=20, candidates=None, using='default'):
+    """Up to ``limit`` jokes matching ``query`` as ``id``/``text``/``favourite_count`` dicts.
+
+    With ``owner_id`` only that user's favourites are searched. At most
+    ``candidates`` matches (SEARCH_RANKED_MATCHES by default) are ranked.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        sql, match = POSTGRESQL_SQL, ' & '.join(f"{term}:*" for term in terms)
+    elif connection.vendor == 'sqlite':
+        sql, match = SQLITE_SQL, ' '.join(f'"{term}"*' for term in terms)
+    else:
+        return _scan(terms, owner_id, limit, using)
+
+    tables = {
+        'joke': connection.ops.quote_name(Joke._meta.db_table),
+        'favourite': connection.ops.quote_name(FavouriteJoke._meta.db_table),
+        'search': connection.ops.quote_name(f"{Joke._meta.db_table}_search"),
+    }
+    mine = MINE_SQL.format(**tables) if owner_id is not None else ''
+    candidates = max(limit, candidates or settings.SEARCH_RANKED_MATCHES)
+    params = [match, owner_id] if owner_id is not None else [match]
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(mine=mine, **tables), [*params, candidates, limit])
+        return [
+            {'id': joke_id, 'text': text, 'favourite_count': favourite_count}
+            for joke_id, text, favourite_count in cursor.fetchall()
+        ]
+
+
+def _scan(terms, owner_id, limit, using):
+    jokes = Joke.objects.using(using)
+    for term in terms:
+        jokes = jokes.filter(text__icontains=term)
+    if owner_id is not None:
+        jokes = jokes.filter(favouritejoke__owner_id=owner_id)
+    return list(jokes.order_by('-favourite_count', 'id').values('id', 'text', 'favourite_count')[:limit])
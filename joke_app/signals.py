@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Joke, FavouriteJoke, FavouriteBucket
+from .cache_versions import bump_versions
+
+
+@receiver(post_save, sender=FavouriteJoke)
+def increment_favourite_count(sender, instance, created, **kwargs):
+    if created:
+        Joke.objects.filter(pk=instance.joke_id).update(
+            favourite_count=F('favourite_count') + 1
+        )
+        FavouriteBucket.objects.record([(instance.joke_id, instance.created_at)], 1)
+
+
+@receiver(post_delete, sender=FavouriteJoke)
+def decrement_favourite_count(sender, instance, **kwargs):
+    Joke.objects.filter(pk=instance.joke_id, favourite_count__gt=0).update(
+        favourite_count=F('favourite_count') - 1
+    )
+    FavouriteBucket.objects.record([(instance.joke_id, instance.created_at)], -1)
+
+
+@receiver([post_save, post_delete], sender=FavouriteJoke)
+def invalidate_favourites_cache(sender, instance, **kwargs):
+    bump_versions(instance.owner_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_cache(sender, instance, update_fields=None, **kwargs):
+    # A login only touches last_login; it still rotates the CSRF token in the
+    # user's cached pages, but leaves everyone else's data unchanged
+    only_login = update_fields is not None and set(update_fields) <= {'last_login'}
+    bump_versions(instance.id, global_version=not only_login)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_cache(sender, instance, **kwargs):
+    bump_versions()
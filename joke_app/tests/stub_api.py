@@ -0,0 +1,103 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubJokeAPI:
+    """Local stand-in for official-joke-api with configurable latency and failures.
+
+    Usage::
+
+        with StubJokeAPI(latency=0.05, failure_rate=0.1) as stub:
+            requests.get(stub.url)
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, batch_size=10):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.batch_size = batch_size
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self):
+        return f"{self.base_url}/random_ten"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes; avoid delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    number = stub.requests
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                if random.random() < stub.failure_rate:
+                    return self._send(500, {'error': 'stub failure'})
+                if self.path.startswith('/random_ten'):
+                    return self._send(200, [
+                        stub._joke(number, i) for i in range(stub.batch_size)
+                    ])
+                if self.path.startswith('/random_joke'):
+                    return self._send(200, stub._joke(number, 0))
+                return self._send(404, {'error': 'not found'})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 1024
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        # Clients that time out drop the connection mid-response; that is expected
+        self._server.handle_error = lambda request, client_address: None
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @staticmethod
+    def _joke(number, index):
+        return {
+            'id': number * 100 + index,
+            'type': 'general',
+            'setup': f"Stub setup {number}-{index}?",
+            'punchline': f"Stub punchline {number}-{index}!",
+        }
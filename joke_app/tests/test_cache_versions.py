@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+from joke_app.cache_versions import get_versions, bump_versions, versioned_etag
+from random_joke.tiered_cache import served_stale
+
+
+class TestCacheVersions:
+    def setup_method(self):
+        cache.clear()
+
+    def test_versions_are_stable_until_bumped(self):
+        assert get_versions(1) == get_versions(1)
+        assert get_versions()[1] is None
+
+    def test_bump_user_and_global(self):
+        global_version, user_version = get_versions(1)
+        _, other_version = get_versions(2)
+
+        bump_versions(1)
+
+        assert get_versions(1) == (global_version + 1, user_version + 1)
+        assert get_versions(2)[1] == other_version
+
+    def test_bump_user_only(self):
+        global_version, user_version = get_versions(1)
+
+        bump_versions(1, global_version=False)
+
+        assert get_versions(1) == (global_version, user_version + 1)
+
+    def test_bump_missing_key(self):
+        bump_versions(1)
+
+        assert None not in get_versions(1)
+
+
+class TestVersionedEtag:
+    def view(self, stale):
+        @versioned_etag(lambda request: 'page-v2', lambda request: {'public': True, 'max_age': 60})
+        def view(request):
+            if stale:
+                served_stale.set(True)
+            return HttpResponse('page')
+        return view
+
+    def test_fresh_response_validated(self):
+        response = self.view(stale=False)(RequestFactory().get('/'))
+
+        assert response['ETag'] == '"page-v2"'
+        assert 'max-age=60' in response['Cache-Control']
+
+    def test_stale_response_not_validated_or_shared(self):
+        response = self.view(stale=True)(RequestFactory().get('/'))
+
+        assert 'ETag' not in response
+        assert response['Cache-Control'] == 'no-cache'
+        assert not served_stale.get()
@@ -0,0 +1,14 @@
+import pytest
+from joke_app.checks import check_shared_cache
+
+
+@pytest.mark.parametrize('backend, debug, errors', [
+    ('django.core.cache.backends.filebased.FileBasedCache', False, ['joke_app.E001']),
+    ('django.core.cache.backends.filebased.FileBasedCache', True, []),
+    ('django.core.cache.backends.redis.RedisCache', False, []),
+])
+def test_shared_cache_must_be_atomic(settings, backend, debug, errors):
+    settings.DEBUG = debug
+    settings.CACHES = {**settings.CACHES, 'shared': {'BACKEND': backend, 'LOCATION': 'redis://localhost:6379/1'}}
+
+    assert [error.id for error in check_shared_cache(None)] == errors
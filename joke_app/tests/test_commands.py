@@ -0,0 +1,166 @@
+import gzip
+import json
+import pytest
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from joke_app.management.commands import serve
+from joke_app.models import Joke, FavouriteJoke, FavouriteBucket
+
+
+@pytest.mark.django_db
+class TestRebuildPopularity:
+    @pytest.fixture
+    def favourites(self):
+        jokes = [Joke.objects.for_text(f'Test joke {i}') for i in range(3)]
+        for i in range(3):
+            user = User.objects.create_user(username=f'user_{i}', password='Str0ngP@ssw0rd123!')
+            for joke in jokes[:i + 1]:
+                FavouriteJoke.objects.create(owner=user, joke=joke)
+        return jokes
+
+    def test_counters_maintained_by_signals(self, favourites):
+        counts = [Joke.objects.get(pk=joke.pk).favourite_count for joke in favourites]
+        assert counts == [3, 2, 1]
+
+        FavouriteJoke.objects.filter(joke=favourites[0]).first().delete()
+        assert Joke.objects.get(pk=favourites[0].pk).favourite_count == 2
+
+    def test_verify_reports_mismatch(self, favourites):
+        Joke.objects.update(favourite_count=0)
+
+        with pytest.raises(CommandError):
+            call_command('rebuild_popularity', '--verify', stdout=StringIO())
+        assert Joke.objects.filter(favourite_count=0).count() == 3
+
+    def test_rebuild_fixes_counters(self, favourites):
+        Joke.objects.update(favourite_count=7)
+        out = StringIO()
+
+        call_command('rebuild_popularity', '--chunk-size', '2', stdout=out)
+
+        counts = [Joke.objects.get(pk=joke.pk).favourite_count for joke in favourites]
+        assert counts == [3, 2, 1]
+        assert 'Checked 3 jokes, fixed 3 mismatched counters' in out.getvalue()
+        call_command('rebuild_popularity', '--verify', stdout=StringIO())
+
+
+@pytest.mark.django_db
+class TestCompactTrending:
+    def test_compact_and_rebuild(self):
+        user = User.objects.create_user(username='myuser', password='Str0ngP@ssw0rd123!')
+        FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke'))
+        out = StringIO()
+
+        call_command('compact_trending', stdout=out)
+        assert 'Compacted 0 hours, deleted 0 trending buckets' in out.getvalue()
+
+        FavouriteBucket.objects.update(count=5)
+        call_command('compact_trending', '--rebuild', stdout=out)
+        assert 'Rebuilt 1 trending buckets' in out.getvalue()
+        assert FavouriteBucket.objects.get().count == 1
+
+
+@pytest.mark.django_db
+class TestImportJokes:
+    RECORDS = [
+        {'text': 'First  joke'},
+        {'setup': 'Why?', 'punchline': 'Because.'},
+        'Plain string joke',
+        {'text': 'First joke'},
+        {'other': 1},
+    ]
+
+    @pytest.fixture
+    def jsonl(self, tmp_path):
+        path = tmp_path / 'jokes.jsonl'
+        path.write_text('\n'.join(json.dumps(record) for record in self.RECORDS) + '\nnot json\n')
+        return path
+
+    def texts(self):
+        return sorted(Joke.objects.values_list('text', flat=True))
+
+    def test_import_jsonl(self, jsonl):
+        Joke.objects.for_text('Plain string joke')
+        out = StringIO()
+
+        call_command('import_jokes', str(jsonl), '--batch-size', '2', stdout=out)
+
+        assert self.texts() == ['First joke', 'Plain string joke', 'Why? Because.']
+        assert 'Read 6 records: 2 new jokes, 2 duplicates, 2 invalid' in out.getvalue()
+        assert not (jsonl.parent / 'jokes.jsonl.progress').exists()
+
+    def test_import_gzipped_csv(self, tmp_path):
+        path = tmp_path / 'jokes.csv.gz'
+        with gzip.open(path, 'wt', newline='') as f:
+            f.write('id,joke\n1,"A joke, with a comma"\n2,"A joke\nover two lines"\n')
+
+        call_command('import_jokes', str(path), '--field', 'joke', stdout=StringIO())
+
+        assert self.texts() == ['A joke over two lines', 'A joke, with a comma']
+
+    def test_resume_skips_saved_progress(self, jsonl):
+        checkpoint = jsonl.parent / 'jokes.jsonl.progress'
+        checkpoint.write_text(json.dumps({'source': str(jsonl), 'records': 2}))
+        out = StringIO()
+
+        call_command('import_jokes', str(jsonl), '--resume', stdout=out)
+
+        assert self.texts() == ['First joke', 'Plain string joke']
+        assert 'Read 4 records after skipping 2' in out.getvalue()
+        assert not checkpoint.exists()
+
+    def test_checkpoint_of_other_file_rejected(self, jsonl):
+        (jsonl.parent / 'jokes.jsonl.progress').write_text(json.dumps({'source': '/other.jsonl', 'records': 2}))
+
+        with pytest.raises(CommandError):
+            call_command('import_jokes', str(jsonl), '--resume', stdout=StringIO())
+
+    def test_copy_needs_postgresql(self, jsonl):
+        with pytest.raises(CommandError, match='PostgreSQL'):
+            call_command('import_jokes', str(jsonl), '--method', 'copy', stdout=StringIO())
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(CommandError, match='--format'):
+            call_command('import_jokes', str(tmp_path / 'jokes.txt'), stdout=StringIO())
+
+
+
+class TestServe:
+    OPTIONS = dict(
+        bind='127.0.0.1:8000', workers=0, threads=1, max_requests=1000,
+        max_requests_jitter=100, timeout=30, graceful_timeout=20, asgi=False,
+    )
+
+    def test_workers_from_cpu_count(self, monkeypatch):
+        monkeypatch.setattr(serve.os, 'cpu_count', lambda: 4)
+        options = serve.server_options(**self.OPTIONS)
+
+        assert options['workers'] == 9
+        assert options['worker_class'] == 'sync'
+        assert options['preload_app'] is True
+        assert options['graceful_timeout'] == 20
+
+    def test_threads_and_asgi(self):
+        assert serve.server_options(**{**self.OPTIONS, 'threads': 4})['worker_class'] == 'gthread'
+        options = serve.server_options(**{**self.OPTIONS, 'workers': 3, 'asgi': True})
+        assert options['worker_class'] == serve.ASGI_WORKER
+        assert options['workers'] == 3
+
+    def test_recycling_disabled(self):
+        options = serve.server_options(**{**self.OPTIONS, 'max_requests': 0})
+        assert options['max_requests_jitter'] == 0
+
+    def test_asgi_requires_async_views(self, settings):
+        settings.ASYNC_VIEWS = False
+        with pytest.raises(CommandError, match='ASYNC_VIEWS'):
+            call_command('serve', asgi=True)
+
+    def test_config_accepted_by_gunicorn(self):
+        pytest.importorskip('gunicorn')
+        application = serve.make_application(serve.WSGI_APP, serve.server_options(**self.OPTIONS))
+
+        assert application.cfg.preload_app is True
+        assert application.cfg.max_requests == 1000
+        assert application.cfg.post_fork is serve.post_fork
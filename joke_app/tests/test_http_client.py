@@ -0,0 +1,94 @@
+import pytest
+import requests
+from joke_app.http_client import JokeAPIClient, CircuitBreaker, CircuitOpenError
+from joke_app.tests.stub_api import StubJokeAPI
+from random_joke.metrics import UPSTREAM_REQUESTS, UPSTREAM_LATENCY
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestJokeAPIClient:
+    def test_reuses_connection(self):
+        with StubJokeAPI() as stub:
+            client = JokeAPIClient()
+            for _ in range(5):
+                assert len(client.get_json(stub.url)) == 10
+
+            assert stub.requests == 5
+            assert stub.connections == 1
+
+    def test_read_timeout(self):
+        with StubJokeAPI(latency=0.5) as stub:
+            client = JokeAPIClient(read_timeout=0.05)
+
+            with pytest.raises(requests.Timeout):
+                client.get_json(stub.url)
+
+    def test_records_metrics(self):
+        requests_ok = UPSTREAM_REQUESTS.value('sync', 'ok')
+        timeouts = UPSTREAM_REQUESTS.value('sync', 'timeout')
+        observed = UPSTREAM_LATENCY.count('sync')
+
+        with StubJokeAPI() as stub:
+            JokeAPIClient().get_json(stub.url)
+        with StubJokeAPI(latency=0.5) as stub:
+            with pytest.raises(requests.Timeout):
+                JokeAPIClient(read_timeout=0.05).get_json(stub.url)
+
+        assert UPSTREAM_REQUESTS.value('sync', 'ok') == requests_ok + 1
+        assert UPSTREAM_REQUESTS.value('sync', 'timeout') == timeouts + 1
+        assert UPSTREAM_LATENCY.count('sync') == observed + 2
+
+    def test_breaker_opens_after_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=30)
+        with StubJokeAPI(failure_rate=1) as stub:
+            client = JokeAPIClient(breaker=breaker)
+            for _ in range(2):
+                with pytest.raises(requests.HTTPError):
+                    client.get_json(stub.url)
+
+            with pytest.raises(CircuitOpenError):
+                client.get_json(stub.url)
+
+            assert breaker.state == CircuitBreaker.OPEN
+            assert stub.requests == 2
+
+    def test_breaker_probes_after_cooldown(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=30, clock=clock)
+        with StubJokeAPI(failure_rate=1) as stub:
+            client = JokeAPIClient(breaker=breaker)
+            with pytest.raises(requests.HTTPError):
+                client.get_json(stub.url)
+
+            clock.now = 29
+            with pytest.raises(CircuitOpenError):
+                client.get_json(stub.url)
+
+            clock.now = 30
+            stub.failure_rate = 0
+            client.get_json(stub.url)
+
+            assert breaker.state == CircuitBreaker.CLOSED
+            assert stub.requests == 2
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, cooldown=30, clock=clock)
+        for _ in range(3):
+            breaker.record_failure()
+
+        clock.now = 30
+        assert breaker.allow_request()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.allow_request()
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
@@ -0,0 +1,125 @@
+import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import async_to_sync
+import requests
+from unittest.mock import Mock, patch
+from joke_app.joke_pool import JokePool, FALLBACK_JOKE, fetch_jokes
+from joke_app.http_client import CircuitOpenError
+
+
+class TestJokePool:
+    def make_pool(self, fetch, size=4, low_water=1):
+        pool = JokePool('https://example.com/random_ten', size, low_water, fetch)
+        pool.refill_in_background = Mock()
+        return pool
+
+    def test_fetch_jokes_batch(self):
+        with patch('joke_app.joke_pool.get_client') as mock_client:
+            mock_client.return_value.get_json.return_value = [
+                {'setup': 'Setup 1', 'punchline': 'Punchline 1'},
+                {'setup': 'Setup 2', 'punchline': 'Punchline 2'},
+            ]
+            jokes = fetch_jokes('https://example.com/random_ten')
+
+        assert jokes == ['Setup 1 Punchline 1', 'Setup 2 Punchline 2']
+
+    def test_refill_fills_up_to_size(self):
+        fetch = Mock(return_value=['a', 'b', 'c'])
+        pool = self.make_pool(fetch)
+
+        pool.refill()
+
+        assert fetch.call_count == 2
+        assert pool.stats()['buffered'] == 4
+        assert pool.stats()['refills'] == 2
+
+    def test_get_serves_from_memory(self):
+        fetch = Mock(return_value=['a', 'b', 'c', 'd'])
+        pool = self.make_pool(fetch)
+        pool.refill()
+
+        assert [pool.get() for _ in range(2)] == ['a', 'b']
+        assert fetch.call_count == 1
+        assert pool.stats()['hits'] == 2
+        assert pool.stats()['misses'] == 0
+
+    def test_low_water_triggers_background_refill(self):
+        pool = self.make_pool(Mock(return_value=['a', 'b', 'c']), size=3)
+        pool.refill()
+
+        pool.get()
+        pool.refill_in_background.assert_not_called()
+        pool.get()
+        pool.refill_in_background.assert_called_once()
+
+    def test_miss_fetches_one_batch(self):
+        fetch = Mock(return_value=['a', 'b'])
+        pool = self.make_pool(fetch, size=50)
+
+        assert pool.get() == 'a'
+        assert fetch.call_count == 1
+        assert pool.stats()['misses'] == 1
+        pool.refill_in_background.assert_called_once()
+
+    def test_miss_waits_for_next_batch_of_running_refill(self):
+        started, first, second = threading.Event(), threading.Event(), threading.Event()
+        batches = iter([(first, ['a']), (second, ['b'])])
+
+        def fetch(url):
+            started.set()
+            release, batch = next(batches, (None, []))
+            if release:
+                release.wait(5)
+            return batch
+
+        pool = self.make_pool(fetch)
+        refill = threading.Thread(target=pool.refill)
+        refill.start()
+        started.wait(5)
+
+        with ThreadPoolExecutor(1) as executor:
+            joke = executor.submit(pool.get)
+            first.set()
+            assert joke.result(timeout=5) == 'a'
+        assert refill.is_alive()
+
+        second.set()
+        refill.join(5)
+
+    @pytest.mark.parametrize('served, expected', [
+        (['old joke'], 'old joke'),
+        ([], FALLBACK_JOKE),
+    ])
+    def test_upstream_down(self, served, expected):
+        pool = self.make_pool(Mock(side_effect=requests.ConnectionError))
+        pool._stale.extend(served)
+
+        assert pool.get() == expected
+        assert pool.stats()['refill_errors'] == 1
+
+    def test_open_circuit_returns_fallback(self):
+        fetch = Mock(side_effect=CircuitOpenError)
+        pool = self.make_pool(fetch)
+
+        assert pool.get() == FALLBACK_JOKE
+        assert fetch.call_count == 1
+
+    def test_aget_miss_fetches_asynchronously(self):
+        async def afetch(url):
+            return ['a', 'b']
+
+        pool = JokePool('https://example.com/random_ten', 4, 1, fetch=Mock(), afetch=afetch)
+        pool.refill_in_background = Mock()
+
+        assert async_to_sync(pool.aget)() == 'a'
+        assert pool.stats()['misses'] == 1
+        pool._fetch.assert_not_called()
+
+    def test_size_zero_fetches_every_time(self):
+        fetch = Mock(return_value=['a', 'b'])
+        pool = self.make_pool(fetch, size=0, low_water=0)
+
+        assert [pool.get() for _ in range(3)] == ['a', 'a', 'a']
+        assert fetch.call_count == 3
+        assert pool.stats()['buffered'] == 0
@@ -1,6 +1,7 @@
 import pytest
 from django.contrib.auth.models import User
-from joke_app.models import FavouriteJoke
+from django.db import IntegrityError, transaction
+from joke_app.models import Joke, FavouriteJoke
 
 @pytest.mark.django_db
 def test_favourite_joke_model():
@@ -9,9 +10,59 @@ def test_favourite_joke_model():
         password='Str0ngP@ssw0rd123!',
         )
     joke_object = FavouriteJoke.objects.create(
-        joke='Test joke',
+        joke=Joke.objects.for_text('Test joke'),
         owner=user,
         )
 
-    assert joke_object.joke == 'Test joke'
-    assert joke_object.owner == user
\ No newline at end of file
+    assert joke_object.joke.text == 'Test joke'
+    assert joke_object.owner == user
+
+@pytest.mark.django_db
+def test_joke_catalog_dedupes_by_content_hash():
+    joke = Joke.objects.for_text('Test   joke\n')
+
+    assert joke.text == 'Test joke'
+    assert len(joke.content_hash) == 64
+    assert Joke.objects.for_text('Test joke') == joke
+    assert Joke.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_favourite_joke_unique_per_owner():
+    user = User.objects.create_user(
+        username='myuser',
+        password='Str0ngP@ssw0rd123!',
+        )
+    joke = Joke.objects.for_text('Test joke')
+    FavouriteJoke.objects.create(joke=joke, owner=user)
+
+    with pytest.raises(IntegrityError):
+        with transaction.atomic():
+            FavouriteJoke.objects.create(joke=joke, owner=user)
+
+
+@pytest.mark.django_db
+def test_add_and_remove_favourite_keep_count():
+    user = User.objects.create_user(
+        username='myuser',
+        password='Str0ngP@ssw0rd123!',
+        )
+    joke = Joke.objects.for_text('Test joke')
+
+    assert FavouriteJoke.objects.add_favourite(user.id, joke.id) == (True, 1)
+    assert FavouriteJoke.objects.add_favourite(user.id, joke.id) == (False, 1)
+    assert FavouriteJoke.objects.filter(owner=user).count() == 1
+
+    assert FavouriteJoke.objects.remove_favourite(user.id, joke.id) == (True, 0)
+    assert FavouriteJoke.objects.remove_favourite(user.id, joke.id) == (False, 0)
+    assert not FavouriteJoke.objects.filter(owner=user).exists()
+
+
+@pytest.mark.django_db
+def test_remove_favourite_of_missing_joke():
+    user = User.objects.create_user(
+        username='myuser',
+        password='Str0ngP@ssw0rd123!',
+        )
+
+    assert FavouriteJoke.objects.remove_favourite(user.id, 999999) == (False, None)
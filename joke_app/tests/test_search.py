@@ -0,0 +1,62 @@
+import pytest
+from django.contrib.auth.models import User
+from joke_app.models import Joke, FavouriteJoke
+from joke_app.search import query_terms, search_jokes
+
+
+def test_query_terms():
+    assert query_terms('Chicken, "road" OR foo_bar*') == ['chicken', 'road', 'or', 'foo', 'bar']
+    assert query_terms(' '.join(['word'] * 20)) == ['word'] * 8
+    assert query_terms('-- ; "') == []
+
+
+@pytest.mark.django_db
+class TestSearchJokes:
+    @pytest.fixture
+    def jokes(self):
+        return [Joke.objects.for_text(text) for text in (
+            'Why did the chicken cross the road?',
+            'Chickens make terrible comedians',
+            'A dog walks into a bar',
+        )]
+
+    def texts(self, results):
+        return [joke['text'] for joke in results]
+
+    def test_prefix_and_all_terms(self, jokes):
+        assert sorted(self.texts(search_jokes('chick'))) == [
+            'Chickens make terrible comedians', 'Why did the chicken cross the road?',
+        ]
+        assert self.texts(search_jokes('chicken ro')) == ['Why did the chicken cross the road?']
+        assert search_jokes('chicken dog') == []
+        assert search_jokes('') == []
+
+    def test_results_carry_popularity(self, jokes):
+        user = User.objects.create_user(username='myuser', password='Str0ngP@ssw0rd123!')
+        FavouriteJoke.objects.add_favourite(user.id, jokes[1].id)
+
+        assert search_jokes('comedians') == [
+            {'id': jokes[1].id, 'text': 'Chickens make terrible comedians', 'favourite_count': 1},
+        ]
+        assert len(search_jokes('chick', limit=1)) == 1
+        assert len(search_jokes('chick', limit=2, candidates=1)) == 2
+
+    def test_only_my_favourites(self, jokes):
+        user = User.objects.create_user(username='myuser', password='Str0ngP@ssw0rd123!')
+        other = User.objects.create_user(username='other', password='Str0ngP@ssw0rd123!')
+        FavouriteJoke.objects.add_favourite(user.id, jokes[0].id)
+        FavouriteJoke.objects.add_favourite(other.id, jokes[1].id)
+
+        assert self.texts(search_jokes('chicken', owner_id=user.id)) == ['Why did the chicken cross the road?']
+        assert search_jokes('dog', owner_id=user.id) == []
+
+    def test_index_follows_writes(self, jokes):
+        assert search_jokes('cat') == []
+
+        Joke.objects.filter(pk=jokes[2].pk).update(text='A cat walks into a bar')
+        Joke.objects.for_text('The cat sat on the keyboard')
+        assert len(search_jokes('cat')) == 2
+        assert search_jokes('dog') == []
+
+        Joke.objects.filter(text__startswith='The cat').delete()
+        assert self.texts(search_jokes('cat')) == ['A cat walks into a bar']
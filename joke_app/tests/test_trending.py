@@ -0,0 +1,99 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from api.batch import parse_operations, apply_batch
+from joke_app import trending
+from joke_app.models import Joke, FavouriteJoke, FavouriteBucket
+
+NOW = datetime(2026, 10, 18, 12, 34, 56, tzinfo=timezone.utc)
+
+
+def bucket_total(joke):
+    return FavouriteBucket.objects.filter(joke=joke).aggregate(total=Sum('count'))['total'] or 0
+
+
+@pytest.mark.django_db
+class TestTrending:
+    @pytest.fixture
+    def users(self):
+        return [User.objects.create_user(username=f'user_{i}', password='Str0ngP@ssw0rd123!') for i in range(4)]
+
+    @pytest.fixture
+    def jokes(self):
+        return [Joke.objects.for_text(f'Test joke {i}') for i in range(3)]
+
+    def favourite(self, user, joke, age):
+        return FavouriteJoke.objects.create(owner=user, joke=joke, created_at=NOW - age)
+
+    def test_bucket_start(self, settings):
+        settings.TRENDING_BUCKET_SECONDS = 300
+        assert FavouriteBucket.bucket_start(NOW) == datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+        assert FavouriteBucket.bucket_start(NOW, trending.HOUR) == datetime(2026, 10, 18, 12, tzinfo=timezone.utc)
+        assert FavouriteBucket.bucket_start(NOW.replace(tzinfo=None)) == FavouriteBucket.bucket_start(NOW)
+
+    def test_buckets_follow_every_write_path(self, users, jokes):
+        user, other = users[:2]
+        assert FavouriteJoke.objects.add_favourite(user.id, jokes[0].id) == (True, 1)
+        FavouriteJoke.objects.create(owner=other, joke=jokes[0])
+        apply_batch(user, parse_operations([{'op': 'add', 'joke_id': jokes[1].id}], 10))
+        assert bucket_total(jokes[0]) == 2
+        assert bucket_total(jokes[1]) == 1
+
+        FavouriteJoke.objects.remove_favourite(user.id, jokes[0].id)
+        FavouriteJoke.objects.get(owner=other, joke=jokes[0]).delete()
+        apply_batch(user, parse_operations([{'op': 'remove', 'joke_id': jokes[1].id}], 10))
+        assert bucket_total(jokes[0]) == 0
+        assert bucket_total(jokes[1]) == 0
+
+    def test_removal_counted_in_bucket_it_was_added(self, users, jokes):
+        favourite = self.favourite(users[0], jokes[0], timedelta(hours=5))
+        favourite.delete()
+
+        assert FavouriteBucket.objects.get().count == 0
+
+    def test_favourites_without_time_not_counted(self, users, jokes):
+        FavouriteJoke.objects.create(owner=users[0], joke=jokes[0], created_at=None)
+        FavouriteJoke.objects.remove_favourite(users[0].id, jokes[0].id)
+
+        assert not FavouriteBucket.objects.exists()
+
+    def test_leaderboard_windows(self, users, jokes):
+        for user in users[:3]:
+            self.favourite(user, jokes[0], timedelta(days=2))
+        for user in users[:2]:
+            self.favourite(user, jokes[1], timedelta(hours=3))
+        self.favourite(users[0], jokes[2], timedelta(minutes=10))
+
+        def board(window):
+            return [(joke['id'], joke['favourite_count']) for joke in trending.leaderboard(window, now=NOW)]
+
+        assert board('1h') == [(jokes[2].id, 1)]
+        assert board('24h') == [(jokes[1].id, 2), (jokes[2].id, 1)]
+        assert board('7d') == [(jokes[0].id, 3), (jokes[1].id, 2), (jokes[2].id, 1)]
+        assert trending.leaderboard('7d', limit=1, now=NOW)[0]['text'] == 'Test joke 0'
+
+    def test_compact_keeps_window_sums(self, users, jokes):
+        for i, user in enumerate(users):
+            self.favourite(user, jokes[0], timedelta(hours=3, minutes=10 * i))
+        self.favourite(users[0], jokes[1], timedelta(minutes=10))
+        self.favourite(users[1], jokes[1], timedelta(days=8))
+        before = {window: trending.leaderboard(window, now=NOW) for window in trending.WINDOWS}
+
+        hours, deleted = trending.compact(now=NOW)
+
+        assert hours == 1
+        assert deleted == 5
+        assert FavouriteBucket.objects.count() == 2
+        assert {window: trending.leaderboard(window, now=NOW) for window in trending.WINDOWS} == before
+        assert trending.compact(now=NOW) == (0, 0)
+
+    def test_rebuild_matches_maintained_buckets(self, users, jokes):
+        for i, user in enumerate(users):
+            self.favourite(user, jokes[i % 3], timedelta(hours=i * 7, minutes=5))
+        trending.compact(now=NOW)
+        expected = {window: trending.leaderboard(window, now=NOW) for window in trending.WINDOWS}
+        FavouriteBucket.objects.all().delete()
+
+        assert trending.rebuild(now=NOW) == FavouriteBucket.objects.count()
+        assert {window: trending.leaderboard(window, now=NOW) for window in trending.WINDOWS} == expected
@@ -8,6 +8,7 @@ from joke_app import views
             ('joke_app:index', '/', views.index),
             ('joke_app:favourites', '/favourites', views.favourites),
             ('joke_app:jokes_rating', '/rating', views.jokes_rating),
+            ('joke_app:search', '/search', views.search),
             ]
         )
 def test_joke_app_urls(url, path_to_app, view):
@@ -1,12 +1,29 @@
 import pytest
+import re
+import requests
+from datetime import timedelta
 from unittest.mock import patch
-from django.urls import reverse
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+from django.urls import reverse, path, include
+from django.utils import timezone
 from django.utils.html import escape
 from django.contrib.auth.models import User
 from django.db import DatabaseError
-from django.db.models.query import QuerySet
-from django.core.cache import cache
-from joke_app.models import FavouriteJoke
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from joke_app.models import Joke, FavouriteJoke
+from joke_app.joke_pool import JokePool
+from joke_app.http_client import JokeAPIClient
+from joke_app.cache_versions import get_versions
+from joke_app import views
+
+
+class AsyncIndexURLs:
+    urlpatterns = [
+        path('', views.index_async),
+        path('', include('random_joke.urls')),
+    ]
 
 @pytest.mark.django_db
 class TestJokeAppViews:
@@ -36,15 +53,23 @@ class TestJokeAppViews:
     def clear_cache(self):
         cache.clear()
 
+    @pytest.fixture
+    def joke_pool(self):
+        pool = JokePool('https://example.com/random_ten', size=10, low_water=0)
+        with patch('joke_app.views.get_pool', return_value=pool), \
+                patch('joke_app.joke_pool.get_client', return_value=JokeAPIClient()), \
+                patch.object(pool, 'refill_in_background'):
+            yield pool
+
     class TestIndex:
-        def test_get(self, client):
+        def test_get(self, client, joke_pool):
             TestJokeAppViews.authenticated_user(client)
             mock_response = {
                 'setup': "Why don't scientists trust atoms?",
                 'punchline': 'Because they make up everything!'
             }
 
-            with patch('requests.get') as mock_get:
+            with patch('requests.Session.get') as mock_get:
                 mock_get.return_value.status_code = 200
                 mock_get.return_value.json.return_value = mock_response
 
@@ -58,27 +83,29 @@ class TestJokeAppViews:
                     t.name for t in response.templates
                 ]
 
-        def test_post(self, client, test_joke):
+        def test_post(self, client, test_joke, joke_pool):
             user = TestJokeAppViews.authenticated_user(client)
             FavouriteJoke.objects.create(
-                joke=test_joke,
+                joke=Joke.objects.for_text(test_joke),
                 owner=user,
             )
 
-            response = client.post(
-                reverse('joke_app:index'), {'joke': test_joke}
-            )
+            with patch('requests.Session.get') as mock_get:
+                response = client.post(
+                    reverse('joke_app:index'), {'joke': test_joke}
+                )
+                mock_get.assert_not_called()
 
             assert response.status_code == 302
             assert response.url == reverse('joke_app:index')
             assert FavouriteJoke.objects.filter(
-                joke=test_joke,
+                joke__text=test_joke,
                 owner=user
             ).count() == 1
 
-        def test_api_failure(self, client):
+        def test_api_failure(self, client, joke_pool):
             TestJokeAppViews.authenticated_user(client)
-            with patch('requests.get') as mock_get:
+            with patch('requests.Session.get') as mock_get:
                 mock_get.return_value.status_code = 500
                 mock_get.return_value.json.side_effect = ValueError(
                     "Invalid JSON"
@@ -91,6 +118,51 @@ class TestJokeAppViews:
                     "Could not fetch joke. Please try again later."
                 ) in response.content.decode('UTF-8')
 
+        def test_serves_stale_joke_when_api_down(self, client, joke_pool):
+            TestJokeAppViews.authenticated_user(client)
+            joke_pool._stale.append('Stale joke')
+
+            with patch('requests.Session.get') as mock_get:
+                mock_get.side_effect = requests.ConnectionError
+
+                response = client.get(reverse('joke_app:index'))
+
+            assert response.status_code == 200
+            assert 'Stale joke' in response.content.decode('UTF-8')
+            assert joke_pool.stats()['misses'] == 1
+
+    class TestIndexAsync:
+        @pytest.fixture
+        def async_client(self, settings):
+            settings.ROOT_URLCONF = AsyncIndexURLs
+            return AsyncClient()
+
+        def test_get(self, async_client, joke_pool):
+            user = TestJokeAppViews.authenticated_user(async_client)
+            joke_pool._jokes.append('Async joke')
+
+            response = async_to_sync(async_client.get)(reverse('joke_app:index'))
+            content = response.content.decode('UTF-8')
+
+            assert response.status_code == 200
+            assert 'Async joke' in content
+            assert user.username in content
+
+        def test_post(self, async_client, test_joke, joke_pool):
+            user = TestJokeAppViews.authenticated_user(async_client)
+
+            for _ in range(2):
+                response = async_to_sync(async_client.post)(
+                    reverse('joke_app:index'), {'joke': test_joke}
+                )
+
+            assert response.status_code == 302
+            assert response.url == reverse('joke_app:index')
+            assert FavouriteJoke.objects.filter(
+                joke__text=test_joke,
+                owner=user
+            ).count() == 1
+
 
     class TestFavourites:
         def test_login_required(self, client, clear_cache):
@@ -103,7 +175,7 @@ class TestJokeAppViews:
         def test_get(self, client, test_joke, clear_cache):
             user = TestJokeAppViews.authenticated_user(client)
             FavouriteJoke.objects.create(
-                joke=test_joke,
+                joke=Joke.objects.for_text(test_joke),
                 owner=user,
             )
 
@@ -120,13 +192,13 @@ class TestJokeAppViews:
         def test_post(self, client, test_joke, clear_cache):
             user = TestJokeAppViews.authenticated_user(client)
             FavouriteJoke.objects.create(
-                joke=test_joke,
+                joke=Joke.objects.for_text(test_joke),
                 owner=user,
             )
 
             response = client.post(
                 reverse('joke_app:favourites'),
-                {'joke': test_joke}
+                {'joke_id': Joke.objects.get(text=test_joke).id}
             )
             content = response.content.decode('UTF-8')
 
@@ -134,21 +206,281 @@ class TestJokeAppViews:
             assert FavouriteJoke.objects.count() == 0
             assert escape(test_joke) not in content
         
-        @pytest.mark.parametrize(
-            'key', [
-                'favourites_cache_key_', 'favourites_cache_timestamp_key_'
-            ]
-        )
-        def test_cache_keys(self, client, key, clear_cache):
+        def test_cache_keys(self, client, clear_cache):
             user = TestJokeAppViews.authenticated_user(client)
-            KEY = f"{key}{user.id}"
 
             response = client.get(reverse('joke_app:favourites'))
-            assert cache.get(KEY) is not None
+            _, version = get_versions(user.id)
+            assert cache.get(f"favourites_cache_key_{user.id}_v{version}") is not None
 
             response_cached = client.get(reverse('joke_app:favourites'))
-            assert response.content == response_cached.content
+            assert response.context['favourite_jokes'] == response_cached.context['favourite_jokes']
+
+        def test_cached_page_has_csrf_token_of_each_browser(self, test_joke, clear_cache):
+            user = TestJokeAppViews.authenticated_user(None, login=False)
+            joke = Joke.objects.for_text(test_joke)
+            FavouriteJoke.objects.create(owner=user, joke=joke)
+            first, second = Client(enforce_csrf_checks=True), Client(enforce_csrf_checks=True)
+            for browser in (first, second):
+                browser.force_login(user)
+
+            second.get(reverse('joke_app:favourites'))
+            page = first.get(reverse('joke_app:favourites')).content.decode('UTF-8')
+            token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page).group(1)
+
+            response = first.post(reverse('joke_app:toggle_favourite'),
+                                  {'csrfmiddlewaretoken': token, 'joke_id': joke.id, 'favourite': 'false'})
+            assert response.status_code == 302
+            assert not FavouriteJoke.objects.filter(owner=user).exists()
+
+        def test_cache_hit_without_queries(self, rf, test_joke, clear_cache, django_assert_num_queries):
+            user = TestJokeAppViews.authenticated_user(None, login=False)
+            FavouriteJoke.objects.create(joke=Joke.objects.for_text(test_joke), owner=user)
+            request = rf.get(reverse('joke_app:favourites'))
+            request.user = user
+            views.favourites(request)
+
+            with django_assert_num_queries(0):
+                response = views.favourites(request)
+
+            assert escape(test_joke) in response.content.decode('UTF-8')
+
+        def test_cache_invalidated_on_add_and_delete(self, client, test_joke, joke_pool, clear_cache):
+            TestJokeAppViews.authenticated_user(client)
+            client.get(reverse('joke_app:favourites'))
+
+            client.post(reverse('joke_app:index'), {'joke': test_joke})
+            response = client.get(reverse('joke_app:favourites'))
+            assert escape(test_joke) in response.content.decode('UTF-8')
+
+            response = client.post(
+                reverse('joke_app:favourites'),
+                {'joke_id': Joke.objects.get(text=test_joke).id}
+            )
+            assert escape(test_joke) not in response.content.decode('UTF-8')
+            response = client.get(reverse('joke_app:favourites'))
+            assert escape(test_joke) not in response.content.decode('UTF-8')
+
+        def test_cache_hit_without_queries_end_to_end(self, client, test_joke, clear_cache,
+                                                      django_assert_num_queries):
+            user = TestJokeAppViews.authenticated_user(client)
+            FavouriteJoke.objects.create(joke=Joke.objects.for_text(test_joke), owner=user)
+            client.get(reverse('joke_app:favourites'))
+
+            # Session, user and page all come from the cache
+            with django_assert_num_queries(0):
+                response = client.get(reverse('joke_app:favourites'))
+
+            assert escape(test_joke) in response.content.decode('UTF-8')
+
+        def test_keyset_pages(self, client, settings, clear_cache):
+            settings.FAVOURITES_PAGE_SIZE = 2
+            user = TestJokeAppViews.authenticated_user(client)
+            favourites = [
+                FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text(f'Test joke {i}'))
+                for i in range(5)
+            ]
+
+            pages = []
+            url = reverse('joke_app:favourites')
+            while url:
+                response = client.get(url)
+                pages.append([joke.text for joke in response.context['favourite_jokes']])
+                next_after = response.context['next_after']
+                url = f"{reverse('joke_app:favourites')}?after={next_after}" if next_after else None
+
+            assert pages == [['Test joke 0', 'Test joke 1'], ['Test joke 2', 'Test joke 3'], ['Test joke 4']]
+            _, version = get_versions(user.id)
+            assert cache.get(f"favourites_cache_key_{user.id}_v{version}_after_{favourites[1].id}") is not None
+
+        def test_page_is_one_query(self, django_assert_num_queries):
+            user = TestJokeAppViews.authenticated_user(None, login=False)
+            favourites = [
+                FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text(f'Test joke {i}'))
+                for i in range(10)
+            ]
+
+            with django_assert_num_queries(1):
+                jokes, next_after = views.favourites_page(user.id, favourites[5].id, 3)
+
+            assert [joke.text for joke in jokes] == ['Test joke 6', 'Test joke 7', 'Test joke 8']
+            assert next_after == favourites[8].id
+            assert views.favourites_page(user.id, next_after, 3) == ([favourites[9].joke], None)
+
+        def test_invalid_cursor_shows_first_page(self, client, test_joke, clear_cache):
+            user = TestJokeAppViews.authenticated_user(client)
+            FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text(test_joke))
+
+            response = client.get(reverse('joke_app:favourites') + '?after=abc')
+            assert response.context['after'] == 0
+            assert escape(test_joke) in response.content.decode('UTF-8')
+
+        def test_not_modified(self, client, test_joke, clear_cache, django_assert_max_num_queries):
+            user = TestJokeAppViews.authenticated_user(client)
+            FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text(test_joke))
+            response = client.get(reverse('joke_app:favourites'))
+            etag = response['ETag']
+            assert etag.startswith('W/')
+            assert 'private' in response['Cache-Control']
+
+            with django_assert_max_num_queries(1):
+                response = client.get(reverse('joke_app:favourites'), HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304
+            assert response.templates == []
+
+            other_page = client.get(reverse('joke_app:favourites') + '?after=1', HTTP_IF_NONE_MATCH=etag)
+            assert other_page.status_code == 200
+
+            FavouriteJoke.objects.filter(owner=user).delete()
+            response = client.get(reverse('joke_app:favourites'), HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200
+            assert escape(test_joke) not in response.content.decode('UTF-8')
+
+        def test_error_page_not_validated(self, client, clear_cache):
+            TestJokeAppViews.authenticated_user(client)
+            with patch('joke_app.views.favourites_page', side_effect=DatabaseError):
+                response = client.get(reverse('joke_app:favourites'))
+
+            assert 'ETag' not in response
+            assert 'no-store' in response['Cache-Control']
+
+        def test_one_form_per_page(self, client, clear_cache):
+            user = TestJokeAppViews.authenticated_user(client)
+            for i in range(5):
+                FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text(f'Test joke {i}'))
+
+            content = client.get(reverse('joke_app:favourites')).content.decode('UTF-8')
+
+            # One token for the page's favourite form, one for the logout form in base.html
+            assert content.count('csrfmiddlewaretoken') == 2
+            assert content.count('name="joke_id"') == 5
+
+
+    class TestToggleFavourite:
+        def post(self, client, data, json=True):
+            headers = {'Accept': 'application/json'} if json else {}
+            return client.post(reverse('joke_app:toggle_favourite'), data, headers=headers)
+
+        def test_login_required(self, client):
+            response = self.post(client, {'joke_id': 1})
+            assert response.status_code == 302
+
+        def test_get_not_allowed(self, client):
+            TestJokeAppViews.authenticated_user(client)
+            assert client.get(reverse('joke_app:toggle_favourite')).status_code == 405
+
+        def test_add_and_remove(self, client, clear_cache):
+            user = TestJokeAppViews.authenticated_user(client)
+            joke = Joke.objects.for_text('Test joke')
+
+            response = self.post(client, {'joke_id': joke.id, 'favourite': 'true'})
+            assert response.json() == {
+                'joke_id': joke.id, 'favourite': True, 'changed': True, 'favourite_count': 1,
+            }
+            assert FavouriteJoke.objects.filter(owner=user, joke=joke).exists()
+
+            response = self.post(client, {'joke_id': joke.id, 'favourite': 'true'})
+            assert response.json()['changed'] is False
+            assert FavouriteJoke.objects.filter(owner=user).count() == 1
+
+            response = self.post(client, {'joke_id': joke.id, 'favourite': 'false'})
+            assert response.json() == {
+                'joke_id': joke.id, 'favourite': False, 'changed': True, 'favourite_count': 0,
+            }
+            assert not FavouriteJoke.objects.filter(owner=user).exists()
+
+        def test_invalidates_cached_pages(self, client, clear_cache):
+            TestJokeAppViews.authenticated_user(client)
+            joke = Joke.objects.for_text('Test joke')
+            client.get(reverse('joke_app:favourites'))
+
+            self.post(client, {'joke_id': joke.id, 'favourite': 'true'})
 
+            response = client.get(reverse('joke_app:favourites'))
+            assert escape('Test joke') in response.content.decode('UTF-8')
+
+        def test_direction_from_query_string(self, client, clear_cache):
+            user = TestJokeAppViews.authenticated_user(client)
+            joke = Joke.objects.for_text('Test joke')
+            FavouriteJoke.objects.create(owner=user, joke=joke)
+
+            response = client.post(
+                reverse('joke_app:toggle_favourite') + '?favourite=false', {'joke_id': joke.id},
+                headers={'Accept': 'application/json'},
+            )
+            assert response.json()['favourite'] is False
+            assert not FavouriteJoke.objects.filter(owner=user).exists()
+
+        def test_form_post_redirects(self, client, clear_cache):
+            TestJokeAppViews.authenticated_user(client)
+            joke = Joke.objects.for_text('Test joke')
+
+            response = self.post(client, {
+                'joke_id': joke.id, 'next': reverse('joke_app:jokes_rating'),
+            }, json=False)
+            assert response.status_code == 302
+            assert response.url == reverse('joke_app:jokes_rating')
+
+            response = self.post(client, {
+                'joke_id': joke.id, 'next': 'https://example.com/',
+            }, json=False)
+            assert response.url == reverse('joke_app:favourites')
+
+        @pytest.mark.parametrize('data', [{'joke_id': 'abc'}, {'joke_id': 1, 'favourite': 'maybe'}])
+        def test_bad_request(self, client, data):
+            TestJokeAppViews.authenticated_user(client)
+            assert self.post(client, data).status_code == 400
+
+        def test_unknown_joke(self, client):
+            TestJokeAppViews.authenticated_user(client)
+            assert self.post(client, {'joke_id': 999999, 'favourite': 'false'}).status_code == 404
+
+
+    class TestSearch:
+        def test_search_page(self, client):
+            Joke.objects.for_text('Why did the chicken cross the road?')
+            Joke.objects.for_text('A dog walks into a bar')
+
+            response = client.get(reverse('joke_app:search'), {'q': 'chick'})
+
+            assert response.status_code == 200
+            assert [joke['text'] for joke in response.context['results']] == ['Why did the chicken cross the road?']
+            assert 'Only my favourites' not in response.content.decode('UTF-8')
+
+        def test_empty_query(self, client):
+            response = client.get(reverse('joke_app:search'))
+
+            assert response.status_code == 200
+            assert response.context['results'] == []
+            assert 'No jokes match' not in response.content.decode('UTF-8')
+
+        def test_only_my_favourites(self, client):
+            user = TestJokeAppViews.authenticated_user(client)
+            other = User.objects.create_user(username='other', password='Str0ngP@ssw0rd123!')
+            FavouriteJoke.objects.add_favourite(user.id, Joke.objects.for_text('My chicken joke').id)
+            FavouriteJoke.objects.add_favourite(other.id, Joke.objects.for_text('Their chicken joke').id)
+
+            response = client.get(reverse('joke_app:search'), {'q': 'chicken', 'mine': '1'})
+
+            assert response.context['mine'] is True
+            assert [joke['text'] for joke in response.context['results']] == ['My chicken joke']
+            assert 'checked' in response.content.decode('UTF-8')
+
+        def test_mine_ignored_when_anonymous(self, client):
+            Joke.objects.for_text('A chicken joke')
+
+            response = client.get(reverse('joke_app:search'), {'q': 'chicken', 'mine': '1'})
+
+            assert response.context['mine'] is False
+            assert len(response.context['results']) == 1
+
+        def test_handles_db_error(self, client):
+            with patch('joke_app.views.search_jokes', side_effect=DatabaseError):
+                response = client.get(reverse('joke_app:search'), {'q': 'chicken'})
+
+            assert response.status_code == 200
+            assert response.context['results'] == []
+            assert 'no-store' in response['Cache-Control']
 
     class TestJokesRating:
         def assert_jokes_rating(self, response, user_authenticated=False):
@@ -157,11 +489,10 @@ class TestJokeAppViews:
                 t.name for t in response.templates
             ]
 
-            assert isinstance(response.context['popular_jokes'], QuerySet)
-            if user_authenticated:
-                assert isinstance(response.context['favourite_jokes'], QuerySet)
-            else:
-                assert response.context['favourite_jokes'] == []
+            assert isinstance(response.context['popular_jokes'], list)
+            assert isinstance(response.context['favourite_ids'], set)
+            if not user_authenticated:
+                assert response.context['favourite_ids'] == set()
 
         @pytest.mark.parametrize('user', ['authenticated', 'anonymous'])
         def test_get(self, client, user, clear_cache):
@@ -178,7 +509,7 @@ class TestJokeAppViews:
             for i in range(20):
                 FavouriteJoke.objects.create(
                     owner=user, 
-                    joke=f'Test joke {i}'
+                    joke=Joke.objects.for_text(f'Test joke {i}')
                 )
     
             response = client.get(reverse('joke_app:jokes_rating'))
@@ -187,7 +518,7 @@ class TestJokeAppViews:
         
         def test_handles_db_error(self, client, clear_cache):
             with patch(
-                'joke_app.models.FavouriteJoke.objects.values'
+                'joke_app.models.Joke.objects.filter'
             ) as mock_values:
                 mock_values.side_effect = DatabaseError
                 response = client.get(reverse('joke_app:jokes_rating'))
@@ -196,25 +527,150 @@ class TestJokeAppViews:
                 assert 'popular_jokes' in response.context
                 assert response.context['popular_jokes'] == []
 
-        @pytest.mark.parametrize(
-            'key, user', [
-                ('rating_cache_key', 'authenticated'),
-                ('rating_cache_key', 'anonymous'),
-                ('rating_cache_timestamp_key', 'authenticated'),
-                ('rating_cache_timestamp_key', 'anonymous'),
-            ]
-        )
-        def test_cache_keys_behaviour(self, client, key, user, clear_cache):
+        @pytest.mark.parametrize('user', ['authenticated', 'anonymous'])
+        def test_cache_keys_behaviour(self, client, user, clear_cache):
             if user == 'authenticated':
                 myuser = TestJokeAppViews.authenticated_user(client)
-                key = f"{key}_{myuser.id}"
 
             response = client.get(reverse('joke_app:jokes_rating'))
-            assert cache.get(key) is not None
+            if user == 'authenticated':
+                global_version, user_version = get_versions(myuser.id)
+                assert cache.get(f"rating_leaderboard_v{global_version}") is not None
+                assert cache.get(f"favourite_ids_{myuser.id}_v{user_version}") is not None
+                assert cache.get(f"rating_cache_key_{myuser.id}_v{global_version}_{user_version}") is None
+            else:
+                global_version, _ = get_versions()
+                assert cache.get(f"rating_cache_key_v{global_version}") is not None
 
             response_cached = client.get(reverse('joke_app:jokes_rating'))
-            assert response.content == response_cached.content  
-            
+            if user == 'authenticated':
+                assert response.context['popular_jokes'] == response_cached.context['popular_jokes']
+            else:
+                assert response.content == response_cached.content
+
+        def test_cache_hit_without_queries(self, client, clear_cache, django_assert_num_queries):
+            user = User.objects.create_user(username='myuser', password='Str0ngP@ssw0rd123!')
+            FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke'))
+            client.get(reverse('joke_app:jokes_rating'))
+
+            with django_assert_num_queries(0):
+                response = client.get(reverse('joke_app:jokes_rating'))
+
+            assert escape('Test joke') in response.content.decode('UTF-8')
+
+        def test_leaderboard_shared_between_users(self, client, clear_cache):
+            user = TestJokeAppViews.authenticated_user(client)
+            other = User.objects.create_user(username='other', password='Str0ngP@ssw0rd123!')
+            FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke'))
+            client.get(reverse('joke_app:jokes_rating'))
+
+            client.force_login(other)
+            with patch('joke_app.models.Joke.objects.filter') as mock_filter:
+                response = client.get(reverse('joke_app:jokes_rating'))
+
+            mock_filter.assert_not_called()
+            content = response.content.decode('UTF-8')
+            assert escape('Test joke') in content
+            assert response.context['favourite_ids'] == set()
+
+        def test_rows_fragment_shared_by_favourite_state(self, client, clear_cache):
+            user = TestJokeAppViews.authenticated_user(client)
+            other = User.objects.create_user(username='other', password='Str0ngP@ssw0rd123!')
+            FavouriteJoke.objects.create(owner=other, joke=Joke.objects.for_text('Test joke'))
+            global_version, _ = get_versions(user.id)
+
+            response = client.get(reverse('joke_app:jokes_rating'))
+            assert response.context['favourite_states'] == '0'
+            key = make_template_fragment_key('rating_rows', [global_version, '0'])
+            assert 'Add joke to favourites' in caches['template_fragments'].get(key)
+
+            client.force_login(other)
+            response = client.get(reverse('joke_app:jokes_rating'))
+            assert 'Delete joke from favourites' in response.content.decode('UTF-8')
+
+        def test_database_error_not_cached(self, client, clear_cache):
+            TestJokeAppViews.authenticated_user(client)
+            with patch('joke_app.views.get_leaderboard', side_effect=DatabaseError):
+                response = client.get(reverse('joke_app:jokes_rating'))
+
+            assert response.context['fragment_timeout'] == 0
+            assert 'There are no popular jokes yet.' in response.content.decode('UTF-8')
+
+        @pytest.mark.parametrize('user', ['authenticated', 'anonymous'])
+        def test_trending_window(self, client, user, clear_cache):
+            if user == 'authenticated':
+                TestJokeAppViews.authenticated_user(client)
+            other = User.objects.create_user(username='other', password='Str0ngP@ssw0rd123!')
+            FavouriteJoke.objects.create(owner=other, joke=Joke.objects.for_text('Old joke'),
+                                         created_at=timezone.now() - timedelta(days=2))
+            FavouriteJoke.objects.create(owner=other, joke=Joke.objects.for_text('New joke'))
+            all_time = client.get(reverse('joke_app:jokes_rating'))
+
+            response = client.get(reverse('joke_app:jokes_rating'), {'window': '24h'})
+
+            assert response['ETag'] != all_time['ETag']
+            assert response.context['window'] == '24h'
+            assert [joke['text'] for joke in response.context['popular_jokes']] == ['New joke']
+            content = response.content.decode('UTF-8')
+            assert 'Added in the last 24h: <span>1</span>' in content
+            assert escape('Old joke') not in content
+            assert [joke['text'] for joke in client.get(
+                reverse('joke_app:jokes_rating'), {'window': '7d'}
+            ).context['popular_jokes']] == ['Old joke', 'New joke']
+
+        def test_unknown_window_shows_all_time(self, client, clear_cache):
+            response = client.get(reverse('joke_app:jokes_rating'), {'window': '1y'})
+
+            assert response.context['window'] is None
+            assert response['ETag'] == client.get(reverse('joke_app:jokes_rating'))['ETag']
+
+        def test_anonymous_page_cacheable_by_proxies(self, client, settings, clear_cache,
+                                                     django_assert_num_queries):
+            settings.RATING_CACHE_MAX_AGE = 120
+            response = client.get(reverse('joke_app:jokes_rating'))
+            etag = response['ETag']
+            assert 'public' in response['Cache-Control']
+            assert 'max-age=120' in response['Cache-Control']
+
+            with django_assert_num_queries(0):
+                response = client.get(reverse('joke_app:jokes_rating'), HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304
+            assert response.templates == []
+            assert 'public' in response['Cache-Control']
+
+        def test_authenticated_page_private(self, client, clear_cache, django_assert_max_num_queries):
+            TestJokeAppViews.authenticated_user(client)
+            response = client.get(reverse('joke_app:jokes_rating'))
+            etag = response['ETag']
+            assert etag.startswith('W/')
+            assert 'private' in response['Cache-Control']
+
+            with django_assert_max_num_queries(1):
+                response = client.get(reverse('joke_app:jokes_rating'), HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304
+            assert response.templates == []
+
+        def test_overlay_follows_own_favourites(self, client, clear_cache):
+            user = TestJokeAppViews.authenticated_user(client)
+            joke = Joke.objects.for_text('Test joke')
+            FavouriteJoke.objects.create(owner=user, joke=joke)
+
+            response = client.get(reverse('joke_app:jokes_rating'))
+            assert response.context['favourite_ids'] == {joke.id}
+
+            FavouriteJoke.objects.filter(owner=user).delete()
+            response = client.get(reverse('joke_app:jokes_rating'))
+            assert response.context['favourite_ids'] == set()
+
+        def test_cache_invalidated_by_other_users(self, client, clear_cache):
+            user = User.objects.create_user(username='myuser', password='Str0ngP@ssw0rd123!')
+            client.get(reverse('joke_app:jokes_rating'))
+
+            FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke'))
+            response = client.get(reverse('joke_app:jokes_rating'))
+
+            assert escape('Test joke') in response.content.decode('UTF-8')
+
         def test_popular_jokes_sorted(self, client, clear_cache):
             """Test that popular jokes are sorted by frequency."""
             joke_counts = {
@@ -226,27 +682,27 @@ class TestJokeAppViews:
             for joke, count in joke_counts.items():
                 for i in range(count):
                     user = User.objects.create_user(username=f'user_{joke}_{i}', password='Str0ngP@ssw0rd123!')
-                    FavouriteJoke.objects.create(owner=user, joke=joke)
+                    FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text(joke))
 
             response = client.get(reverse('joke_app:jokes_rating'))
             popular_jokes = response.context['popular_jokes']
-            jokes_in_order = [j['joke'] for j in popular_jokes]
+            jokes_in_order = [j['text'] for j in popular_jokes]
 
             assert jokes_in_order == ['Test joke 0', 'Test joke 1', 'Test joke 2']
 
         def test_joke_in_template(self, client, clear_cache):
             user = TestJokeAppViews.authenticated_user(client)
-            joke = FavouriteJoke.objects.create(owner=user, joke='Test joke')
+            joke = FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke'))
 
             response = client.get(reverse('joke_app:jokes_rating'))
             content = response.content.decode('UTF-8')
 
             assert FavouriteJoke.objects.count() == 1
-            assert escape(joke.joke) in content
+            assert escape(joke.joke.text) in content
 
         def test_deleted_joke(self, client, clear_cache):
             user = TestJokeAppViews.authenticated_user(client)
-            joke = FavouriteJoke.objects.create(owner=user, joke='Test joke')
+            joke = FavouriteJoke.objects.create(owner=user, joke=Joke.objects.for_text('Test joke'))
 
             assert FavouriteJoke.objects.count() == 1
 
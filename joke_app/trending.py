@@ -0,0 +1,102 @@
+"""Windowed leaderboards from per-joke favourite counts in time buckets.
+
+Every favourite added or removed adjusts the bucket it was added in (see
+``FavouriteBucketManager.record``), so the jokes favourited most in a
+window are a sum over that window's bucket rows, which do not grow with
+the favourites table. ``compact`` keeps the rows few: buckets of hours the
+shortest window no longer reaches are merged into one row per joke and
+hour, and buckets older than the longest window are dropped.
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .models import Joke, FavouriteJoke, FavouriteBucket
+
+HOUR = timedelta(hours=1)
+WINDOWS = {
+    '1h': timedelta(hours=1),
+    '24h': timedelta(days=1),
+    '7d': timedelta(days=7),
+}
+
+
+def window_start(window, now=None):
+    """Start of the oldest bucket summed for ``window``.
+
+    Windows up to an hour start on a bucket boundary; longer ones on an hour
+    boundary, since their older buckets may have been compacted into hours.
+    """
+    now = now or timezone.now()
+    span = WINDOWS[window]
+    return FavouriteBucket.bucket_start(now - span, None if span <= HOUR else HOUR)
+
+
+def leaderboard(window, limit=15, now=None):
+    """The ``limit`` jokes favourited most in ``window``, shaped like the all-time board."""
+    totals = list(
+        FavouriteBucket.objects.filter(start__gte=window_start(window, now))
+        .values('joke').annotate(total=Sum('count')).filter(total__gt=0)
+        .order_by('-total', 'joke').values_list('joke', 'total')[:limit]
+    )
+    texts = Joke.objects.in_bulk([joke_id for joke_id, _ in totals])
+    return [
+        {'id': joke_id, 'text': texts[joke_id].text, 'favourite_count': total}
+        for joke_id, total in totals if joke_id in texts
+    ]
+
+
+def compact(now=None):
+    """Merge the buckets of each finished hour outside the shortest window and drop expired ones.
+
+    Returns ``(merged_hours, deleted_rows)``. Window sums are the same
+    before and after, so it can run at any time and any number of times.
+    """
+    expired, cutoff = _limits(now or timezone.now())
+    with transaction.atomic():
+        deleted, _ = FavouriteBucket.objects.filter(start__lt=expired).delete()
+        starts = FavouriteBucket.objects.filter(start__lt=cutoff).values_list('start', flat=True).distinct()
+        hours = sorted({
+            FavouriteBucket.bucket_start(start, HOUR) for start in starts
+            if start != FavouriteBucket.bucket_start(start, HOUR)
+        })
+        for hour in hours:
+            rows = FavouriteBucket.objects.filter(start__gte=hour, start__lt=hour + HOUR)
+            totals = list(rows.values('joke').annotate(total=Sum('count')).order_by().values_list('joke', 'total'))
+            deleted += rows.delete()[0]
+            FavouriteBucket.objects.bulk_create(
+                [FavouriteBucket(joke_id=joke_id, start=hour, count=total) for joke_id, total in totals if total]
+            )
+    return len(hours), deleted
+
+
+def rebuild(now=None, batch_size=5000):
+    """Recount every bucket from ``FavouriteJoke.created_at``; returns the number of rows written.
+
+    For favourites inserted without going through the managers or signals.
+    Favourites that compaction would have merged land in hourly buckets.
+    """
+    expired, cutoff = _limits(now or timezone.now())
+    counts = {}
+    favourites = FavouriteJoke.objects.filter(created_at__gte=expired).values_list('joke_id', 'created_at')
+    for joke_id, created_at in favourites.iterator(chunk_size=batch_size):
+        start = FavouriteBucket.bucket_start(created_at)
+        if start < cutoff:
+            start = FavouriteBucket.bucket_start(created_at, HOUR)
+        counts[joke_id, start] = counts.get((joke_id, start), 0) + 1
+
+    with transaction.atomic():
+        FavouriteBucket.objects.all().delete()
+        FavouriteBucket.objects.bulk_create(
+            (FavouriteBucket(joke_id=joke_id, start=start, count=count)
+             for (joke_id, start), count in counts.items()),
+            batch_size=batch_size,
+        )
+    return len(counts)
+
+
+def _limits(now):
+    """Where the longest window starts, and the first hour the shortest may still reach."""
+    expired = window_start(max(WINDOWS, key=WINDOWS.get), now)
+    cutoff = FavouriteBucket.bucket_start(now - min(WINDOWS.values()), HOUR)
+    return expired, cutoff
@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'joke_app'
 urlpatterns = [
-    path('', views.index, name='index'),
+    path('', views.index_async if settings.ASYNC_VIEWS else views.index, name='index'),
     path('favourites', views.favourites, name='favourites'),
+    path('favourites/toggle', views.toggle_favourite, name='toggle_favourite'),
     path('rating', views.jokes_rating, name='jokes_rating'),
+    path('search', views.search, name='search'),
 ]
\ No newline at end of file
@@ -1,157 +1,317 @@
-import requests
 import logging
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count
-from django.db import DatabaseError
-from django.core.cache import cache
-from .models import FavouriteJoke
+from django.db import DatabaseError, IntegrityError
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+from random_joke.tiered_cache import get_or_compute
+from .models import Joke, FavouriteJoke, FavouriteBucket
+from .joke_pool import get_pool
+from .search import search_jokes
+from . import trending
+from .cache_versions import get_versions, versioned_etag
 
 logger = logging.getLogger('joke_app')
 
 def index(request):
-    logger.info(f"Processing request: {request.method} {request.path}")
+    logger.info("Processing request: %s %s", request.method, request.path)
 
-    try:
-        url = 'https://official-joke-api.appspot.com/random_joke'
-        response = requests.get(url)
-        response.raise_for_status()
-        joke_data = response.json()
-        joke = f"{joke_data['setup']} {joke_data['punchline']}"
-        logger.info(f"Successfully fetched joke from external API: {joke}")
+    if request.method == 'POST':
+        joke_text = request.POST.get("joke")
+        if joke_text and request.user.is_authenticated:
+            joke = Joke.objects.for_text(joke_text)
+            added, _ = FavouriteJoke.objects.add_favourite(request.user.id, joke.id)
+            logger.info("Joke %s %s favourites for user %s", joke.id,
+                        "added to" if added else "already in", request.user.username)
+
+        logger.info("User %s Redirecting to the index page", request.user.username)
+        return redirect('joke_app:index')
+
+    joke = get_pool().get()
+    logger.debug("Serving joke from pool: %s", joke)
+
+    context = {'joke': joke}
+    return render(request, 'joke_app/index.html', context)
 
-    except (requests.RequestException, ValueError, KeyError) as e:
-        logger.error(f"Outer API error occurred: {e}", exc_info=True)
-        joke = "Could not fetch joke. Please try again later."
+
+async def index_async(request):
+    logger.info("Processing request: %s %s", request.method, request.path)
+
+    # Resolve the user up front so the template never hits the DB synchronously
+    request.user = await request.auser()
 
     if request.method == 'POST':
         joke_text = request.POST.get("joke")
-        existing_joke = FavouriteJoke.objects.filter(
-            joke=joke_text,
-            owner=request.user
-        ).exists()
-        logger.info(f"Checking if joke '{joke_text}' exists for user {request.user.username}: {existing_joke}")
-
-        if joke_text and not existing_joke:
-            logger.info(f"Joke '{joke_text}' doesn't exist, adding to favourites for user {request.user.username}")
-            FavouriteJoke.objects.create(
-                joke=joke_text,
-                owner=request.user
-            )
-            logger.info(f"Joke '{joke_text}' successfully added to favourites for user {request.user.username}")
+        if joke_text and request.user.is_authenticated:
+            joke = await Joke.objects.afor_text(joke_text)
+            added, _ = await FavouriteJoke.objects.aadd_favourite(request.user.id, joke.id)
+            logger.info("Joke %s %s favourites for user %s", joke.id,
+                        "added to" if added else "already in", request.user.username)
 
-        logger.info(f"User {request.user.username} Redirecting to the index page")
+        logger.info("User %s Redirecting to the index page", request.user.username)
         return redirect('joke_app:index')
 
+    joke = await get_pool().aget()
+    logger.debug("Serving joke from pool: %s", joke)
+
     context = {'joke': joke}
     return render(request, 'joke_app/index.html', context)
 
 
+def favourites_etag(request):
+    _, user_version = get_versions(request.user.id)
+    after = request.GET.get('after', '')
+    # Weak: each render masks the CSRF token differently, the page is otherwise the same
+    return f'W/"favourites-{request.user.id}-{user_version}-{int(after) if after.isdigit() else 0}"'
+
+
 @login_required
+@versioned_etag(favourites_etag, lambda request: {'private': True, 'no_cache': True})
 def favourites(request):
-    logger.info(f"Processing request: {request.method} {request.path}")
+    logger.info("Processing request: %s %s", request.method, request.path)
 
     user_id = request.user.id
-    CACHE_FAVOURITES_KEY = f"favourites_cache_key_{user_id}"
-    CACHE_FAVOURITES_TIMESTAMP_KEY = f"favourites_cache_timestamp_key_{user_id}"
 
     if request.method == 'POST':
-        joke_to_delete = request.POST.get('joke')
-        favourite_joke = FavouriteJoke.objects.filter(
-            owner=request.user,
-            joke=joke_to_delete
-        )
-        logger.info(f"Checking if joke '{joke_to_delete}' exists for user {request.user.username}")
-
-        if favourite_joke.exists():
-            favourite_joke.delete()
-            logger.info(f"Deleting {joke_to_delete} for user {request.user.username}")
+        joke_to_delete = request.POST.get('joke_id', '')
+        removed = joke_to_delete.isdigit() and FavouriteJoke.objects.remove_favourite(
+            user_id, int(joke_to_delete)
+        )[0]
+
+        if removed:
+            logger.info("Deleted joke %s for user %s", joke_to_delete, request.user.username)
         else:
-            logger.warning(f"Joke '{joke_to_delete}' not found in favourites for user {request.user.username}")
+            logger.warning("Joke %s not found in favourites for user %s", joke_to_delete, request.user.username)
 
-    try:
-        favourite_jokes = FavouriteJoke.objects.filter(
-            owner=request.user
-        ).values_list('joke', flat=True)
+    after = request.GET.get('after', '')
+    after = int(after) if after.isdigit() else 0
+
+    _, user_version = get_versions(user_id)
+    CACHE_FAVOURITES_KEY = f"favourites_cache_key_{user_id}_v{user_version}"
+    if after:
+        CACHE_FAVOURITES_KEY += f"_after_{after}"
 
-        logger.info(f"Retrieved {len(favourite_jokes)} favourite jokes for user {request.user.username}")
+    # Only the rows are cached: the page carries a CSRF token masked for
+    # this browser's cookie, so it is rendered on every request
+    def load_favourites():
+        favourite_jokes, next_after = favourites_page(user_id, after, settings.FAVOURITES_PAGE_SIZE)
+        logger.info("Retrieved %s favourite jokes after %s for user %s",
+                    len(favourite_jokes), after, request.user.username)
+        logger.info("Cache updated for user %s", request.user.username)
+        return favourite_jokes, next_after
+
+    try:
+        favourite_jokes, next_after = get_or_compute(CACHE_FAVOURITES_KEY, load_favourites, 60 * 15)
     except DatabaseError as e:
-        logger.error(f"Error retrieving favourite jokes for user {request.user.username}: {e}", exc_info=True)
+        logger.error("Error retrieving favourite jokes for user %s: %s", request.user.username, e, exc_info=True)
+        return uncacheable(render(request, 'joke_app/favourites.html', {'favourite_jokes': []}))
+
+    context = {'favourite_jokes': favourite_jokes, 'after': after, 'next_after': next_after}
+    return render(request, 'joke_app/favourites.html', context)
+
+
+def favourites_page(user_id, after, page_size):
+    """One page of a user's jokes in the order they were added, and the cursor of the next page.
+
+    Seeks past ``after`` (a FavouriteJoke id) on the ``(owner, id)`` index,
+    so a page costs the same however many favourites come before it.
+    """
+    favourites = list(
+        FavouriteJoke.objects.filter(owner_id=user_id, id__gt=after)
+        .select_related('joke').order_by('id')[:page_size + 1]
+    )
+    next_after = favourites[page_size - 1].id if len(favourites) > page_size else None
+    return [favourite.joke for favourite in favourites[:page_size]], next_after
 
-    cache_state = hash(tuple(favourite_jokes))
-    cache_timestamp = cache.get(CACHE_FAVOURITES_TIMESTAMP_KEY)
 
-    if cache_state == cache_timestamp:
-        cached_response = cache.get(CACHE_FAVOURITES_KEY)
-        if cached_response:
-            logger.info(f"Returning cached response for user {request.user.username}")
-            return cached_response
+@login_required
+@require_POST
+def toggle_favourite(request):
+    """Set one joke's favourite state; answers JSON to XHR and redirects plain form posts."""
+    logger.info("Processing request: %s %s", request.method, request.path)
+
+    joke_id = request.POST.get('joke_id', '')
+    # Rows of the rating page share one form; their buttons put the direction in the query string
+    favourite = request.POST.get('favourite', request.GET.get('favourite', 'true'))
+    if not joke_id.isdigit() or favourite not in ('true', 'false'):
+        return JsonResponse({'detail': 'joke_id must be an integer and favourite true or false'}, status=400)
+
+    joke_id = int(joke_id)
+    try:
+        if favourite == 'true':
+            changed, favourite_count = FavouriteJoke.objects.add_favourite(request.user.id, joke_id)
         else:
-            logger.warning(f"Cache mismatch or missing cache for user {request.user.username}, generating new response.")
+            changed, favourite_count = FavouriteJoke.objects.remove_favourite(request.user.id, joke_id)
+    except IntegrityError:
+        favourite_count = None
+
+    if favourite_count is None:
+        logger.warning("Joke %s not found for user %s", joke_id, request.user.username)
+        return JsonResponse({'detail': 'joke not found'}, status=404)
+
+    logger.info("Joke %s favourite=%s for user %s (changed: %s)", joke_id, favourite, request.user.username, changed)
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'joke_id': joke_id,
+            'favourite': favourite == 'true',
+            'changed': changed,
+            'favourite_count': favourite_count,
+        })
+
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(
+        next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        return redirect(next_url)
+    return redirect('joke_app:favourites')
+
+
+def search(request):
+    """Full-text search over all jokes, or with ``mine=1`` over the user's favourites."""
+    logger.info("Processing request: %s %s", request.method, request.path)
+
+    query = request.GET.get('q', '').strip()
+    mine = request.user.is_authenticated and request.GET.get('mine') == '1'
+    context = {'query': query, 'mine': mine, 'results': []}
+    if not query:
+        return render(request, 'joke_app/search.html', context)
 
-    context = {'favourite_jokes': favourite_jokes}
-    response = render(request, 'joke_app/favourites.html', context)
+    try:
+        context['results'] = search_jokes(query, request.user.id if mine else None, settings.SEARCH_RESULTS)
+    except DatabaseError as e:
+        logger.error("Database error while searching jokes: %s", e, exc_info=True)
+        return uncacheable(render(request, 'joke_app/search.html', context))
 
-    cache.set(CACHE_FAVOURITES_KEY, response, 60 * 15)
-    cache.set(CACHE_FAVOURITES_TIMESTAMP_KEY, cache_state, 60 * 15)
-    logger.info(f"Cache updated for user {request.user.username}")
+    logger.info("Search returned %s jokes (mine: %s)", len(context['results']), mine)
+    return render(request, 'joke_app/search.html', context)
 
-    return response
 
+def rating_window(request):
+    """The leaderboard window asked for with ``?window=``, None for all-time counts."""
+    window = request.GET.get('window')
+    return window if window in trending.WINDOWS else None
 
-def jokes_rating(request):
-    logger.info(f"Processing request: {request.method} {request.path}")
 
-    CACHE_RATING_KEY = 'rating_cache_key'
-    CACHE_RATING_TIMESTAMP_KEY = 'rating_cache_timestamp_key'
+def leaderboard_version(global_version, window):
+    """Versions the cached leaderboard; a window's also moves on with every bucket."""
+    if window is None:
+        return global_version
+    return f"{global_version}_{window}_{int(FavouriteBucket.bucket_start(timezone.now()).timestamp())}"
 
+
+def rating_etag(request):
+    window = rating_window(request)
+    if not request.user.is_authenticated:
+        global_version, _ = get_versions()
+        return f"rating-{leaderboard_version(global_version, window)}"
+    global_version, user_version = get_versions(request.user.id)
+    # Weak: each render masks the CSRF token differently, the page is otherwise the same
+    return f'W/"rating-{leaderboard_version(global_version, window)}-{request.user.id}-{user_version}"'
+
+
+def rating_cache_control(request):
     if request.user.is_authenticated:
-        user_id = request.user.id
-        CACHE_RATING_KEY += f"_{user_id}"
-        CACHE_RATING_TIMESTAMP_KEY += f"_{user_id}"
+        return {'private': True, 'no_cache': True}
+    # Anonymous visitors all get the same page, which proxies may share
+    return {'public': True, 'max_age': settings.RATING_CACHE_MAX_AGE}
+
+
+@versioned_etag(rating_etag, rating_cache_control)
+def jokes_rating(request):
+    logger.info("Processing request: %s %s", request.method, request.path)
+
+    user_id = request.user.id if request.user.is_authenticated else None
+    global_version, user_version = get_versions(user_id)
+    window = rating_window(request)
+    version = leaderboard_version(global_version, window)
+
+    if user_id is None:
+        # Anonymous visitors all see the same page, so cache it whole
+        CACHE_RATING_KEY = f"rating_cache_key_v{version}"
+
+        def render_anonymous():
+            logger.info("User %s is not authenticated, no favourite jokes found", request.user.username)
+            return render_rating(request, get_leaderboard(version, window), set(), version, window)
+
+        try:
+            return get_or_compute(
+                CACHE_RATING_KEY, render_anonymous, 60 * 15,
+                stale_key=f"rating_cache_key_{window}" if window else 'rating_cache_key',
+            )
+        except DatabaseError as e:
+            logger.error("Database error occurred while retrieving popular jokes: %s", e, exc_info=True)
+            return uncacheable(render_rating(request, [], set(), None, window))
 
     try:
-        popular_jokes = FavouriteJoke.objects.values('joke').annotate(
-            total_users=Count('owner')
-        ).order_by('-total_users')[:15]
-        
-        logger.info(f"Retrieved {len(popular_jokes)} popular jokes")
+        popular_jokes = get_leaderboard(version, window)
+        favourite_ids = get_favourite_ids(request.user, user_version)
     except DatabaseError as e:
-        logger.error(f"Database error occurred while retrieving popular jokes: {e}", exc_info=True)
-        popular_jokes = []
+        logger.error("Database error occurred while retrieving popular jokes: %s", e, exc_info=True)
+        return uncacheable(render_rating(request, [], set(), None, window))
 
-    current_state = [
-        hash(tuple((joke['joke'], joke['total_users']) for joke in popular_jokes))
-    ]
+    return render_rating(request, popular_jokes, favourite_ids, version, window)
 
-    cache_timestamp = cache.get(CACHE_RATING_TIMESTAMP_KEY)
 
-    if cache_timestamp == current_state:
-        cached_response = cache.get(CACHE_RATING_KEY)
-        if cached_response:
-            logger.info(f"Returning cached response for user {request.user.username}")
-            return cached_response
+def get_leaderboard(version, window=None):
+    """Top 15 jokes of all time or of a ``trending.WINDOWS`` window, cached once for all users."""
+    def build_leaderboard():
+        if window is not None:
+            popular_jokes = trending.leaderboard(window, 15)
         else:
-            logger.warning(f"Cache mismatch or missing cache for user {request.user.username}, generating new response.")
+            popular_jokes = list(Joke.objects.filter(
+                favourite_count__gt=0
+            ).order_by('-favourite_count', 'id').values('id', 'text', 'favourite_count')[:15])
+        logger.info("Retrieved %s popular jokes (window: %s)", len(popular_jokes), window or 'all')
+        return popular_jokes
+
+    return get_or_compute(
+        f"rating_leaderboard_v{version}", build_leaderboard, 60 * 15,
+        stale_key=f"rating_leaderboard_{window}" if window else 'rating_leaderboard',
+    )
 
+
+def get_favourite_ids(user, user_version):
+    def build_favourite_ids():
+        favourite_ids = set(FavouriteJoke.objects.filter(
+            owner=user
+        ).values_list('joke_id', flat=True))
+        logger.info("Retrieved %s favourite jokes for user %s", len(favourite_ids), user.username)
+        return favourite_ids
+
+    return get_or_compute(f"favourite_ids_{user.id}_v{user_version}", build_favourite_ids, 60 * 15)
+
+
+def render_rating(request, popular_jokes, favourite_ids, version, window=None):
+    """Each row pairs a joke with the user's favourite state (None when anonymous).
+
+    The rows are a cached fragment keyed by ``version`` and the row states,
+    so users who have favourited the same jokes on the board share it. A
+    ``version`` of None (a failed lookup) is rendered but not cached.
+    """
     if request.user.is_authenticated:
-        favourite_jokes = FavouriteJoke.objects.filter(
-            owner=request.user
-        ).values_list('joke', flat=True)
-        logger.info(f"Retrieved {len(favourite_jokes)} favourite jokes for user {request.user.username}")
+        rows = [(joke, joke['id'] in favourite_ids) for joke in popular_jokes]
+        favourite_states = ''.join('1' if favourite else '0' for _, favourite in rows)
     else:
-        favourite_jokes = []
-        logger.info(f"User {request.user.username} is not authenticated, no favourite jokes found")
-
+        rows = [(joke, None) for joke in popular_jokes]
+        favourite_states = 'anonymous'
     context = {
         'popular_jokes': popular_jokes,
-        'favourite_jokes': favourite_jokes
+        'favourite_ids': favourite_ids,
+        'rows': rows,
+        'version': version,
+        'favourite_states': favourite_states,
+        'fragment_timeout': 0 if version is None else 60 * 15,
+        'window': window,
+        'windows': list(trending.WINDOWS),
     }
-    response = render(request, 'joke_app/rating.html', context)
+    return render(request, 'joke_app/rating.html', context)
 
-    cache.set(CACHE_RATING_KEY, response, 60 * 15)
-    cache.set(CACHE_RATING_TIMESTAMP_KEY, current_state, 60 * 15)
-    logger.info(f"Cache updated for user {request.user.username}")
 
+def uncacheable(response):
+    """Mark a fallback rendered after an error so neither browsers nor proxies keep it."""
+    patch_cache_control(response, no_store=True)
     return response
-    
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""Logging helpers used by ``settings.LOGGING``.
+
+Request threads only put records on a queue (``BackgroundHandler``); a
+``QueueListener`` thread formats and writes them. INFO records can be
+sampled before they are queued, and ``JSONFormatter`` writes one JSON
+object per line so several worker processes can append to the same file
+through ``WatchedFileHandler`` and leave rotation to logrotate.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only ``rate`` of the records at INFO and below; warnings and errors always pass."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.INFO or self.rate >= 1 or random.random() < self.rate
+
+
+class BackgroundHandler(QueueHandler):
+    """Queue records for the handlers named in ``handlers``, written by a listener thread.
+
+    ``handlers`` are names from the same LOGGING dict. ``dictConfig`` only
+    learned to wire up queue listeners in Python 3.12; before that it
+    configures handlers in name order, so this one must sort after its
+    targets. When the queue is full new records are dropped and counted in
+    ``dropped`` rather than blocking the request. A forked worker starts
+    its own listener, since threads do not survive ``fork()``.
+    """
+
+    def __init__(self, handlers, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.targets = [_handler_by_name(name) for name in handlers]
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.listener = None
+        self._pid = None
+        atexit.register(self.close)
+
+    def prepare(self, record):
+        # The queue never leaves the process, so skip the eager formatting
+        # QueueHandler does to make records picklable; the listener thread
+        # formats the message when it writes it
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every queued record has been written."""
+        if self.listener is not None and self._pid == os.getpid():
+            self.queue.join()
+
+    def close(self):
+        self.acquire()
+        try:
+            if self.listener is not None and self._pid == os.getpid():
+                self.listener.stop()
+            self.listener = None
+            self._pid = None
+        finally:
+            self.release()
+        super().close()
+
+    def _start_listener(self):
+        self.acquire()
+        try:
+            if self._pid != os.getpid():
+                if self._pid is not None:
+                    # Inherited from the parent process without its thread
+                    self.queue = queue.Queue(self.maxsize)
+                self._pid = os.getpid()
+                self.listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+                self.listener.start()
+        finally:
+            self.release()
+
+
+def _handler_by_name(name):
+    get_handler = getattr(logging, 'getHandlerByName', None)
+    handler = get_handler(name) if get_handler else logging._handlers.get(name)
+    if handler is None:
+        raise ValueError(f"Handler {name!r} is not configured yet; it must sort before the queue handler")
+    return handler
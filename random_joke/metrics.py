@@ -0,0 +1,347 @@
+"""In-process metrics registry exposed in the Prometheus text format.
+
+Counters and histograms are plain Python objects guarded by a lock, cheap
+enough to update on every request. ``metrics_middleware`` records per-view
+request latency plus the number and time of SQL queries each request ran;
+other modules record into the module-level metrics below. Values owned by
+other code, such as the database and joke pool statistics, are copied in
+by collectors when the registry is rendered.
+
+The registry is per process: with several workers each scrape sees the
+worker that served it, so scrape every worker or aggregate with ``sum``.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.decorators import sync_and_async_middleware
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _labels(self, labels, extra=()):
+        pairs = list(zip(self.labelnames, labels)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, value, *labels):
+        """For totals kept elsewhere and copied in by a collector at scrape time."""
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def _samples(self, labels, value):
+        yield f"{self.name}{self._labels(labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *labels):
+        entry = self._values.get(labels)
+        return entry[2] if entry else 0
+
+    def _samples(self, labels, value):
+        counts, total, count = value
+        cumulative = 0
+        for bound, bucket in zip(self.buckets + ('+Inf',), counts):
+            cumulative += bucket
+            le = bound if bound == '+Inf' else _number(bound)
+            yield f"{self.name}_bucket{self._labels(labels, [('le', le)])} {cumulative}"
+        yield f"{self.name}_sum{self._labels(labels)} {_number(total)}"
+        yield f"{self.name}_count{self._labels(labels)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """``collect()`` runs before every render to refresh values owned by other code."""
+        self.collectors.append(collect)
+        return collect
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+    def render(self):
+        for collect in self.collectors:
+            collect()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Time to produce a response, by URL name.',
+    ['view', 'method'],
+))
+REQUESTS = REGISTRY.register(Counter(
+    'http_requests_total', 'Responses sent, by URL name and status code.',
+    ['view', 'method', 'status'],
+))
+REQUEST_QUERIES = REGISTRY.register(Histogram(
+    'http_request_db_queries', 'SQL queries run per request, by URL name.',
+    ['view'], buckets=QUERY_COUNT_BUCKETS,
+))
+QUERY_TIME = REGISTRY.register(Counter(
+    'db_query_duration_seconds_total', 'Time spent in SQL queries, by URL name.',
+    ['view'],
+))
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    'joke_api_request_duration_seconds', 'Joke API call latency, by client.',
+    ['client'],
+))
+UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    'joke_api_requests_total', 'Joke API calls, by client and outcome.',
+    ['client', 'outcome'],
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'cache_requests_total', 'View cache lookups, by key family and result (hit, stale, miss).',
+    ['family', 'result'],
+))
+
+DB_POOL_SIZE = REGISTRY.register(Gauge(
+    'db_pool_connections', 'Connections held by the pool, by database alias.', ['alias'],
+))
+DB_POOL_IN_USE = REGISTRY.register(Gauge(
+    'db_pool_connections_in_use', 'Connections currently checked out, by database alias.', ['alias'],
+))
+DB_POOL_MAX = REGISTRY.register(Gauge(
+    'db_pool_connections_max', 'Configured pool max_size, by database alias.', ['alias'],
+))
+DB_POOL_WAITING = REGISTRY.register(Gauge(
+    'db_pool_requests_waiting', 'Requests waiting for a connection, by database alias.', ['alias'],
+))
+DB_POOL_REQUESTS = REGISTRY.register(Counter(
+    'db_pool_requests_total', 'Connections requested from the pool, by database alias.', ['alias'],
+))
+DB_POOL_QUEUED = REGISTRY.register(Counter(
+    'db_pool_requests_queued_total', 'Requests that had to wait for a connection, by database alias.', ['alias'],
+))
+DB_POOL_WAIT = REGISTRY.register(Counter(
+    'db_pool_wait_seconds_total', 'Time spent waiting for a connection, by database alias.', ['alias'],
+))
+DB_POOL_ERRORS = REGISTRY.register(Counter(
+    'db_pool_errors_total', 'Failed requests for a connection (timeouts included), by database alias.', ['alias'],
+))
+
+JOKE_POOL_BUFFERED = REGISTRY.register(Gauge(
+    'joke_pool_jokes_buffered', 'Jokes buffered in the joke pool.',
+))
+JOKE_POOL_HITS = REGISTRY.register(Counter(
+    'joke_pool_hits_total', 'Jokes served from the joke pool buffer.',
+))
+JOKE_POOL_MISSES = REGISTRY.register(Counter(
+    'joke_pool_misses_total', 'Jokes requested while the joke pool buffer was empty.',
+))
+JOKE_POOL_REFILLS = REGISTRY.register(Counter(
+    'joke_pool_refills_total', 'Batches of jokes stored in the joke pool.',
+))
+JOKE_POOL_REFILL_ERRORS = REGISTRY.register(Counter(
+    'joke_pool_refill_errors_total', 'Failed upstream fetches for the joke pool.',
+))
+
+_FAMILY_RE = re.compile(r'_v?\d')
+
+
+def cache_family(key):
+    """``favourites_cache_key_5_v17`` -> ``favourites_cache_key``; keeps label cardinality bounded."""
+    match = _FAMILY_RE.search(key)
+    return key[:match.start()] if match else key
+
+
+def record_cache(key, result):
+    CACHE_REQUESTS.inc(cache_family(key), result)
+
+
+def record_upstream(client, outcome, elapsed):
+    UPSTREAM_LATENCY.observe(elapsed, client)
+    UPSTREAM_REQUESTS.inc(client, outcome)
+
+
+@REGISTRY.add_collector
+def collect_db_pools():
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        alias = connection.alias
+        DB_POOL_SIZE.set(stats.get('pool_size', 0), alias)
+        DB_POOL_IN_USE.set(stats.get('pool_size', 0) - stats.get('pool_available', 0), alias)
+        DB_POOL_MAX.set(stats.get('pool_max', pool.max_size), alias)
+        DB_POOL_WAITING.set(stats.get('requests_waiting', 0), alias)
+        DB_POOL_REQUESTS.set(stats.get('requests_num', 0), alias)
+        DB_POOL_QUEUED.set(stats.get('requests_queued', 0), alias)
+        DB_POOL_WAIT.set(stats.get('requests_wait_ms', 0) / 1000, alias)
+        DB_POOL_ERRORS.set(stats.get('requests_errors', 0), alias)
+
+
+@REGISTRY.add_collector
+def collect_joke_pool():
+    # Imported here: the joke pool's HTTP client records into this module
+    from joke_app.joke_pool import get_pool
+
+    stats = get_pool().stats()
+    JOKE_POOL_BUFFERED.set(stats['buffered'])
+    JOKE_POOL_HITS.set(stats['hits'])
+    JOKE_POOL_MISSES.set(stats['misses'])
+    JOKE_POOL_REFILLS.set(stats['refills'])
+    JOKE_POOL_REFILL_ERRORS.set(stats['refill_errors'])
+
+
+class RequestStats:
+    __slots__ = ('queries', 'query_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+
+# Set for the duration of a request; context variables follow the request
+# into sync_to_async threads, so queries from async views are counted too
+_current_request = ContextVar('metrics_request', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_time += time.perf_counter() - started
+
+
+def _install_query_counter(connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def install_query_counter():
+    connection_created.connect(_install_query_counter, dispatch_uid='metrics_query_counter')
+    for connection in connections.all(initialized_only=True):
+        _install_query_counter(connection)
+
+
+def _record_request(request, status, stats, elapsed):
+    match = request.resolver_match
+    view = match.view_name if match else 'unresolved'
+    REQUEST_LATENCY.observe(elapsed, view, request.method)
+    REQUESTS.inc(view, request.method, str(status))
+    REQUEST_QUERIES.observe(stats.queries, view)
+    if stats.queries:
+        QUERY_TIME.inc(view, amount=stats.query_time)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    install_query_counter()
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            stats = RequestStats()
+            token = _current_request.set(stats)
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = await get_response(request)
+                status = response.status_code
+                return response
+            finally:
+                _current_request.reset(token)
+                _record_request(request, status, stats, time.perf_counter() - started)
+    else:
+        def middleware(request):
+            stats = RequestStats()
+            token = _current_request.set(stats)
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = get_response(request)
+                status = response.status_code
+                return response
+            finally:
+                _current_request.reset(token)
+                _record_request(request, status, stats, time.perf_counter() - started)
+
+    return middleware
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -54,7 +54,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'random_joke.metrics.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
+    'random_joke.static.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -69,7 +71,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -77,16 +78,45 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates are compiled once per process, also when DEBUG is on
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'random_joke.wsgi.application'
 
+# Serve async views where available; enabled by default under asgi.py
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', default=False)
+
+# Used by `manage.py serve`; SERVER_WORKERS=0 derives the count from the CPUs
+SERVER_BIND = env('SERVER_BIND', default='0.0.0.0:8000')
+SERVER_WORKERS = env.int('SERVER_WORKERS', default=0)
+SERVER_THREADS = env.int('SERVER_THREADS', default=1)
+SERVER_MAX_REQUESTS = env.int('SERVER_MAX_REQUESTS', default=10000)
+SERVER_MAX_REQUESTS_JITTER = env.int('SERVER_MAX_REQUESTS_JITTER', default=1000)
+SERVER_TIMEOUT = env.int('SERVER_TIMEOUT', default=30)
+SERVER_GRACEFUL_TIMEOUT = env.int('SERVER_GRACEFUL_TIMEOUT', default=30)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connections come from a per-process psycopg pool; with DB_POOL off they can
+# instead be kept open between requests for DB_CONN_MAX_AGE seconds.
+# A sync worker thread holds at most one connection, so by default a worker
+# keeps one connection and grows to one per thread: up to SERVER_WORKERS *
+# SERVER_THREADS in total (33 with the serve defaults on 16 CPUs). ASGI
+# workers run each request's ORM calls on a thread of its own and may use
+# up to 10 each, so set SERVER_WORKERS or DB_POOL_MAX_SIZE for them. Keep
+# the total, plus any other clients, under the server's max_connections
+DB_POOL = env.bool('DB_POOL', default=True)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -95,6 +125,19 @@ DATABASES = {
         'PASSWORD': env('DATABASE_PASSWORD'),
         'HOST': env('DATABASE_HOST'),
         'PORT': env('DATABASE_PORT'),
+        'CONN_MAX_AGE': 0 if DB_POOL else env.int('DB_CONN_MAX_AGE', default=0),
+        'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', default=True),
+        'OPTIONS': {
+            'pool': {
+                'name': 'default',
+                'min_size': env.int('DB_POOL_MIN_SIZE', default=1),
+                'max_size': env.int('DB_POOL_MAX_SIZE', default=10 if ASYNC_VIEWS else SERVER_THREADS),
+                # Seconds a request waits for a free connection before failing
+                'timeout': env.float('DB_POOL_TIMEOUT', default=10),
+                'max_idle': env.float('DB_POOL_MAX_IDLE', default=600),
+                'max_lifetime': env.float('DB_POOL_MAX_LIFETIME', default=3600),
+            },
+        } if DB_POOL else {},
     }
 }
 
@@ -135,6 +178,19 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic writes content-hashed copies plus .gz and .br variants;
+# StaticFilesMiddleware (WhiteNoise) serves the hashed names with an immutable one-year
+# Cache-Control and picks the variant matching Accept-Encoding
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -146,87 +202,165 @@ LOGIN_REDIRECT_URL = 'joke_app:index'
 
 LOGIN_URL = '/'
 
+# Jokes are served from a process-local pool that is refilled in batches
+JOKE_API_URL = env('JOKE_API_URL', default='https://official-joke-api.appspot.com/random_ten')
+JOKE_POOL_SIZE = env.int('JOKE_POOL_SIZE', default=50)
+JOKE_POOL_LOW_WATER = env.int('JOKE_POOL_LOW_WATER', default=10)
+
+JOKE_API_CONNECT_TIMEOUT = env.float('JOKE_API_CONNECT_TIMEOUT', default=3.05)
+JOKE_API_READ_TIMEOUT = env.float('JOKE_API_READ_TIMEOUT', default=5)
+JOKE_API_POOL_MAXSIZE = env.int('JOKE_API_POOL_MAXSIZE', default=10)
+JOKE_API_BREAKER_THRESHOLD = env.int('JOKE_API_BREAKER_THRESHOLD', default=5)
+JOKE_API_BREAKER_COOLDOWN = env.float('JOKE_API_BREAKER_COOLDOWN', default=30)
+
+# Jokes per page of joke_app:favourites
+FAVOURITES_PAGE_SIZE = env.int('FAVOURITES_PAGE_SIZE', default=50)
+
+# Jokes per page of joke_app:search, and the default limit of api:search
+SEARCH_RESULTS = env.int('SEARCH_RESULTS', default=20)
+# A query matching more jokes than this is ranked among the first ones found
+SEARCH_RANKED_MATCHES = env.int('SEARCH_RANKED_MATCHES', default=1000)
+
+# Seconds browsers and shared proxies may reuse the anonymous rating page
+RATING_CACHE_MAX_AGE = env.int('RATING_CACHE_MAX_AGE', default=60)
+
+# Favourites are counted per joke in buckets of this many seconds for the
+# ?window= leaderboards; must divide an hour, which compaction merges into
+TRENDING_BUCKET_SECONDS = env.int('TRENDING_BUCKET_SECONDS', default=300)
+
+# Largest number of operations accepted by api:favourites_batch
+FAVOURITES_BATCH_MAX = env.int('FAVOURITES_BATCH_MAX', default=1000)
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',  # Only JSON
     ),
 }
 
+# Small per-process LRU in front of a cache shared by all workers
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'random_joke.tiered_cache.TieredCache',
         'LOCATION': 'unique-snowflake',
-    }
+        'OPTIONS': {
+            'L2_ALIAS': 'shared',
+            'L1_MAX_ENTRIES': env.int('CACHE_L1_MAX_ENTRIES', default=1000),
+            'L1_TIMEOUT': env.float('CACHE_L1_TIMEOUT', default=2),
+        },
+    },
+    # Holds recompute locks, version counters and sessions, so it must be
+    # Redis or Memcached: the file cache default is a stand-in for tests and
+    # development, and the joke_app.E001 check refuses it when DEBUG is off
+    'shared': env.cache('SHARED_CACHE_URL', default='filecache:///tmp/random_joke_cache'),
+    # Used by {% cache %}. Fragments are keyed by joke id and version, so they
+    # never go stale and a per-process cache saves a shared-cache hit per row
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template-fragments',
+        'OPTIONS': {'MAX_ENTRIES': env.int('CACHE_FRAGMENTS_MAX_ENTRIES', default=10000)},
+    },
 }
 
+# Sessions are read from the cache and written through to the database;
+# they and the cached users skip the per-process L1, so a logout or a
+# password change takes effect in every worker at once
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'shared'
+
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = env.int('AUTH_USER_CACHE_TIMEOUT', default=60 * 15)
+
+# Fraction of INFO records kept; warnings and errors are never sampled
+LOG_INFO_SAMPLE_RATE = env.float('LOG_INFO_SAMPLE_RATE', default=1.0)
+
+# Loggers only enqueue records; a background listener formats and writes them.
+# Files are JSON lines opened in append mode, safe to share between worker
+# processes; rotate them externally (WatchedFileHandler reopens on rotation).
+# Handlers are configured in name order, so 'queue' must sort after its targets
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {name} {message}',
-            'style': '{',
-        },
         'simple': {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'random_joke.log.JSONFormatter',
+        },
+    },
+    'filters': {
+        'sample_info': {
+            '()': 'random_joke.log.SamplingFilter',
+            'rate': LOG_INFO_SAMPLE_RATE,
+        },
+        'joke_app': {
+            'name': 'joke_app',
+        },
+        'users': {
+            'name': 'users',
+        },
+        'api': {
+            'name': 'api',
+        },
     },
     'handlers': {
+        'queue': {
+            '()': 'random_joke.log.BackgroundHandler',
+            'handlers': ['console', 'file_joke_app', 'file_users', 'file_api', 'file_errors'],
+            'filters': ['sample_info'],
+        },
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
-        'joke_app_file': {
+        'file_joke_app': {
             'level': 'WARNING',
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'logging.handlers.WatchedFileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'joke_app.log'),
-            'formatter': 'verbose',
-            'maxBytes': 1024 * 1024 * 5,
-            'backupCount': 3,
+            'formatter': 'json',
+            'filters': ['joke_app'],
         },
-        'users_file': {
+        'file_users': {
             'level': 'WARNING',
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'logging.handlers.WatchedFileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'users.log'),
-            'formatter': 'verbose',
-            'maxBytes': 1024 * 1024 * 5,
-            'backupCount': 3,
+            'formatter': 'json',
+            'filters': ['users'],
         },
-        'api_file': {
+        'file_api': {
             'level': 'WARNING',
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'logging.handlers.WatchedFileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'api.log'),
-            'formatter': 'verbose',
-            'maxBytes': 1024 * 1024 * 5,
-            'backupCount': 3,
+            'formatter': 'json',
+            'filters': ['api'],
         },
-        'error_file': {
+        'file_errors': {
             'level': 'ERROR',
-            'class': 'logging.FileHandler',
+            'class': 'logging.handlers.WatchedFileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'errors.log'),
-            'formatter': 'verbose',
+            'formatter': 'json',
         },
     },
     'loggers': {
         'joke_app': {
-            'handlers': ['console', 'joke_app_file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
         'users': {
-            'handlers': ['console', 'users_file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
         'api': {
-            'handlers': ['console', 'api_file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
         'django': {
-            'handlers': ['console', 'error_file'],
+            'handlers': ['queue'],
             'level': 'ERROR',
             'propagate': True,
         },
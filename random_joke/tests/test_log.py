@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import sys
+import pytest
+from random_joke.log import JSONFormatter, SamplingFilter, BackgroundHandler
+
+
+def make_record(level=logging.INFO, msg='Joke %s added', args=(42,), exc_info=None):
+    return logging.LogRecord('joke_app', level, __file__, 1, msg, args, exc_info)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record, self.format(record)))
+
+
+class TestJSONFormatter:
+    def test_one_json_object_per_record(self):
+        line = JSONFormatter().format(make_record())
+        entry = json.loads(line)
+
+        assert '\n' not in line
+        assert entry['level'] == 'INFO'
+        assert entry['logger'] == 'joke_app'
+        assert entry['message'] == 'Joke 42 added'
+
+    def test_exception(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = make_record(logging.ERROR, 'failed', (), sys.exc_info())
+
+        entry = json.loads(JSONFormatter().format(record))
+        assert 'ValueError: boom' in entry['exc_info']
+
+
+class TestSamplingFilter:
+    def test_drops_info(self):
+        sampler = SamplingFilter(rate=0)
+        assert not sampler.filter(make_record())
+        assert sampler.filter(make_record(logging.WARNING))
+
+    def test_keeps_fraction(self):
+        sampler = SamplingFilter(rate=0.25)
+        kept = sum(sampler.filter(make_record()) for _ in range(4000))
+        assert 700 < kept < 1300
+
+
+class TestBackgroundHandler:
+    @pytest.fixture
+    def target(self):
+        target = ListHandler()
+        target.name = 'test_log_target'
+        yield target
+        target.close()
+
+    def test_writes_from_listener_thread(self, target):
+        handler = BackgroundHandler(['test_log_target'])
+        logger = logging.getLogger('test_log.background')
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            logger.info('Joke %s added', 42)
+            handler.flush()
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+        assert [line for _, line in target.records] == ['Joke 42 added']
+        assert target.records[0][0].args == (42,)
+
+    def test_formats_lazily(self, target):
+        class Expensive:
+            calls = 0
+
+            def __str__(self):
+                Expensive.calls += 1
+                return 'expensive'
+
+        handler = BackgroundHandler(['test_log_target'])
+        handler.addFilter(SamplingFilter(rate=0))
+        handler.handle(make_record(msg='%s', args=(Expensive(),)))
+        handler.close()
+
+        assert Expensive.calls == 0
+        assert target.records == []
+
+    def test_drops_when_full(self, target):
+        handler = BackgroundHandler(['test_log_target'], maxsize=1)
+        # Pretend the listener is running but stalled, so nothing drains the queue
+        handler._pid = os.getpid()
+        for _ in range(3):
+            handler.handle(make_record())
+
+        assert handler.dropped == 2
+        handler.close()
+
+    def test_unknown_handler(self):
+        with pytest.raises(ValueError):
+            BackgroundHandler(['no_such_handler'])
@@ -0,0 +1,150 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from joke_app import joke_pool
+from joke_app.joke_pool import JokePool
+from random_joke import metrics
+from random_joke.metrics import (
+    Counter, Histogram, Registry, REQUESTS, REQUEST_QUERIES, CACHE_REQUESTS, cache_family,
+)
+
+
+class TestRegistry:
+    def test_counter_render(self):
+        registry = Registry()
+        counter = registry.register(Counter('jobs_total', 'Jobs run.', ['kind']))
+        counter.inc('a')
+        counter.inc('a', amount=2)
+        counter.inc('b "quoted"')
+
+        assert registry.render().splitlines() == [
+            '# HELP jobs_total Jobs run.',
+            '# TYPE jobs_total counter',
+            'jobs_total{kind="a"} 3',
+            'jobs_total{kind="b \\"quoted\\""} 1',
+        ]
+
+    def test_histogram_render(self):
+        histogram = Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+
+        assert histogram.render()[2:] == [
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            'latency_seconds_sum 3.65',
+            'latency_seconds_count 4',
+        ]
+
+    @pytest.mark.parametrize('key, family', [
+        ('favourites_cache_key_5_v1700000000', 'favourites_cache_key'),
+        ('rating_cache_key_v12', 'rating_cache_key'),
+        ('favourite_ids_5_v3', 'favourite_ids'),
+        ('plain', 'plain'),
+    ])
+    def test_cache_family(self, key, family):
+        assert cache_family(key) == family
+
+    def test_collectors_run_on_render(self):
+        registry = Registry()
+        gauge = registry.register(metrics.Gauge('queue_depth', 'Items queued.'))
+        registry.add_collector(lambda: gauge.set(7))
+
+        assert registry.render().splitlines()[1:] == ['# TYPE queue_depth gauge', 'queue_depth 7']
+
+
+class FakePool:
+    max_size = 10
+
+    def get_stats(self):
+        return {
+            'pool_min': 2, 'pool_max': 10, 'pool_size': 4, 'pool_available': 1,
+            'requests_waiting': 2, 'requests_num': 120, 'requests_queued': 5,
+            'requests_wait_ms': 1500, 'requests_errors': 1,
+        }
+
+
+class FakeConnection:
+    alias = 'default'
+    pool = FakePool()
+
+
+class TestDatabasePoolMetrics:
+    def test_collects_pool_stats(self, monkeypatch):
+        monkeypatch.setattr(metrics.connections, 'all', lambda: [FakeConnection()])
+        output = metrics.REGISTRY.render()
+
+        assert 'db_pool_connections{alias="default"} 4' in output
+        assert 'db_pool_connections_in_use{alias="default"} 3' in output
+        assert 'db_pool_connections_max{alias="default"} 10' in output
+        assert 'db_pool_requests_waiting{alias="default"} 2' in output
+        assert 'db_pool_requests_total{alias="default"} 120' in output
+        assert 'db_pool_requests_queued_total{alias="default"} 5' in output
+        assert 'db_pool_wait_seconds_total{alias="default"} 1.5' in output
+        assert 'db_pool_errors_total{alias="default"} 1' in output
+
+    @pytest.mark.django_db
+    def test_skips_connections_without_pool(self):
+        metrics.DB_POOL_SIZE.clear()
+        metrics.REGISTRY.render()
+
+        assert metrics.DB_POOL_SIZE.value('default') == 0
+
+
+class TestJokePoolMetrics:
+    def test_collects_pool_stats(self, monkeypatch):
+        pool = JokePool('https://example.com/random_ten', size=4, fetch=lambda url: ['a', 'b', 'c'])
+        pool.refill_in_background = lambda: None
+        pool.get()
+        pool.get()
+        monkeypatch.setattr(joke_pool, '_pool', pool)
+
+        output = metrics.REGISTRY.render()
+
+        assert 'joke_pool_jokes_buffered 1' in output
+        assert 'joke_pool_hits_total 1' in output
+        assert 'joke_pool_misses_total 1' in output
+        assert 'joke_pool_refills_total 1' in output
+        assert 'joke_pool_refill_errors_total 0' in output
+
+
+@pytest.mark.django_db
+class TestMetricsMiddleware:
+    def test_records_request_and_queries(self, client):
+        cache.clear()
+        before = REQUESTS.value('api:get_data', 'GET', '200')
+        queries_before = REQUEST_QUERIES.count('api:get_data')
+
+        assert client.get(reverse('api:get_data')).status_code == 200
+
+        assert REQUESTS.value('api:get_data', 'GET', '200') == before + 1
+        assert REQUEST_QUERIES.count('api:get_data') == queries_before + 1
+        entry = REQUEST_QUERIES._values[('api:get_data',)]
+        assert entry[1] >= 1
+
+    def test_records_cache_hits(self, client):
+        cache.clear()
+        hits = CACHE_REQUESTS.value('get_data_cache_key', 'hit')
+        misses = CACHE_REQUESTS.value('get_data_cache_key', 'miss')
+
+        client.get(reverse('api:get_data'))
+        client.get(reverse('api:get_data'))
+
+        assert CACHE_REQUESTS.value('get_data_cache_key', 'miss') == misses + 1
+        assert CACHE_REQUESTS.value('get_data_cache_key', 'hit') == hits + 1
+
+    def test_unresolved_path(self, client):
+        before = REQUESTS.value('unresolved', 'GET', '404')
+        client.get('/no/such/page')
+        assert REQUESTS.value('unresolved', 'GET', '404') == before + 1
+
+    def test_endpoint(self, client):
+        client.get(reverse('api:get_data'))
+        response = client.get(reverse('api:metrics'))
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        body = response.content.decode()
+        assert '# TYPE http_request_duration_seconds histogram' in body
+        assert 'http_requests_total{view="api:get_data",method="GET",status="200"}' in body
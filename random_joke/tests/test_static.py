@@ -0,0 +1,60 @@
+import pytest
+from io import StringIO
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.http import HttpResponse
+from django.test import AsyncClient
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.urls import reverse
+from random_joke.static import StaticFilesMiddleware
+
+
+@pytest.fixture
+def collected(settings, tmp_path):
+    settings.STATIC_ROOT = tmp_path
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+    }
+    call_command('collectstatic', interactive=False, stdout=StringIO())
+    return tmp_path
+
+
+class TestStaticFiles:
+    def test_collectstatic_writes_hashed_and_compressed_files(self, collected):
+        names = {path.name for path in (collected / 'js').iterdir()}
+        hashed = static('js/jquery-3.7.1.min.js').rsplit('/', 1)[1]
+
+        assert hashed != 'jquery-3.7.1.min.js'
+        assert {hashed, hashed + '.gz', hashed + '.br'} <= names
+
+    def test_hashed_file_served_immutable_and_compressed(self, collected, client):
+        response = client.get(static('css/style.css'), HTTP_ACCEPT_ENCODING='gzip, br')
+
+        assert response.status_code == 200
+        assert response['Content-Encoding'] == 'br'
+        assert 'immutable' in response['Cache-Control']
+        assert 'max-age=315360000' in response['Cache-Control']
+        assert 'Accept-Encoding' in response['Vary']
+
+    def test_served_by_async_client(self, collected):
+        response = async_to_sync(AsyncClient().get)(static('css/style.css'))
+
+        assert response.status_code == 200
+        assert 'immutable' in response['Cache-Control']
+
+    def test_async_stack_is_not_adapted(self, collected):
+        async def get_response(request):
+            return HttpResponse()
+
+        assert iscoroutinefunction(StaticFilesMiddleware(get_response))
+        assert not iscoroutinefunction(StaticFilesMiddleware(lambda request: HttpResponse()))
+
+    @pytest.mark.django_db
+    def test_pages_use_local_jquery(self, client, django_user_model):
+        user = django_user_model.objects.create_user(username='static_user', password='Str0ngP@ssw0rd123!')
+        client.force_login(user)
+        content = client.get(reverse('joke_app:favourites')).content.decode()
+
+        assert static('js/jquery-3.7.1.min.js') in content
+        assert 'code.jquery.com' not in content
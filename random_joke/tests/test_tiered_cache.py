@@ -0,0 +1,105 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from django.core.cache import caches
+from random_joke.tiered_cache import TieredCache, served_stale
+
+
+class TestTieredCache:
+    @pytest.fixture(autouse=True)
+    def shared_cache(self, settings):
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'shared': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'tiered-cache-tests',
+            },
+        }
+        caches['shared'].clear()
+
+    @pytest.fixture
+    def tiered(self):
+        cache = TieredCache('tiered-cache-tests', {
+            'OPTIONS': {'L2_ALIAS': 'shared', 'L1_MAX_ENTRIES': 3, 'L1_TIMEOUT': 2},
+        })
+        cache.clear()
+        return cache
+
+    def test_writes_through_to_l2(self, tiered):
+        tiered.set('key', 'value')
+
+        assert caches['shared'].get('key') == 'value'
+        assert tiered.get('key') == 'value'
+
+    def test_l1_serves_until_timeout(self, tiered):
+        tiered.set('key', 'old')
+        caches['shared'].set('key', 'new')
+
+        assert tiered.get('key') == 'old'
+        with patch('random_joke.tiered_cache.time.monotonic', return_value=time.monotonic() + 3):
+            assert tiered.get('key') == 'new'
+
+    def test_l1_is_shared_between_threads(self, tiered):
+        tiered.set('key', 'value')
+        caches['shared'].delete('key')
+        results = []
+
+        thread = threading.Thread(target=lambda: results.append(
+            TieredCache('tiered-cache-tests', {'OPTIONS': {'L2_ALIAS': 'shared'}}).get('key')
+        ))
+        thread.start()
+        thread.join()
+
+        assert results == ['value']
+
+    def test_l1_is_bounded_lru(self, tiered):
+        for key in ['a', 'b', 'c']:
+            tiered.set(key, key)
+        tiered.get('a')
+        tiered.set('d', 'd')
+        caches['shared'].clear()
+
+        assert tiered.get('a') == 'a'
+        assert tiered.get('b') is None
+
+    def test_incr_and_get_many(self, tiered):
+        tiered.set('counter', 1)
+        tiered.incr('counter')
+        caches['shared'].set('other', 'value')
+
+        assert tiered.get_many(['counter', 'other', 'missing']) == {'counter': 2, 'other': 'value'}
+
+    def test_concurrent_misses_compute_once(self, tiered):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(tiered.get_or_compute('page', compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ['value'] * 5
+
+    def test_serves_stale_while_recomputing(self, tiered):
+        caches['shared'].set('page', 'old')
+        caches['shared'].add('page_v2:lock', 1)
+
+        value = tiered.get_or_compute('page_v2', lambda: 'new', stale_key='page')
+
+        assert value == 'old'
+        assert tiered.get('page_v2') is None
+        assert served_stale.get()
+        served_stale.set(False)
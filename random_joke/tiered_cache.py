@@ -0,0 +1,208 @@
+"""Two-tier cache: a small in-process LRU (L1) in front of a shared backend (L2).
+
+Configured as the ``default`` cache with the L2 given by alias::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'random_joke.tiered_cache.TieredCache',
+            'OPTIONS': {'L2_ALIAS': 'shared', 'L1_MAX_ENTRIES': 1000, 'L1_TIMEOUT': 2},
+        },
+        'shared': {...},
+    }
+
+Writes go to both tiers. L1 entries live at most ``L1_TIMEOUT`` seconds, which
+bounds how long one worker can miss an invalidation made by another.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from random_joke.metrics import record_cache
+
+# Set when get_or_compute answers from ``stale_key``: the value belongs to an
+# older version than the one the caller looked up, so responses built from it
+# must not be validated or shared under the current version
+served_stale = ContextVar('served_stale', default=False)
+
+# Cache backends are instantiated per thread; like LocMemCache, keep the L1
+# store at module level so every thread in the process shares it
+_l1_stores = {}
+_l1_locks = {}
+
+
+class TieredCache(BaseCache):
+    _missing = object()
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2_ALIAS', 'shared')
+        self._l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self._l1_timeout = options.get('L1_TIMEOUT', 2)
+        self._l1 = _l1_stores.setdefault(location, OrderedDict())
+        self._lock = _l1_locks.setdefault(location, threading.Lock())
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def get(self, key, default=None, version=None):
+        l1_key = self._l1_key(key, version)
+        value = self._l1_get(l1_key)
+        if value is not self._missing:
+            return value
+
+        value = self.l2.get(key, self._missing, version=version)
+        if value is self._missing:
+            return default
+        self._l1_set(l1_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._l1_get(self._l1_key(key, version))
+            if value is self._missing:
+                missing.append(key)
+            else:
+                found[key] = value
+
+        if missing:
+            for key, value in self.l2.get_many(missing, version=version).items():
+                self._l1_set(self._l1_key(key, version), value)
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        self._l1_set(self._l1_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._l1_set(self._l1_key(key, version), value, timeout)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        self._l1_set(self._l1_key(key, version), value)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(self._l1_key(key, version))
+        return self.l2.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        if self._l1_get(self._l1_key(key, version)) is not self._missing:
+            return True
+        return self.l2.has_key(key, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.l2.clear()
+
+    def clear_l1(self):
+        with self._lock:
+            self._l1.clear()
+
+    def get_or_compute(self, key, compute, timeout=DEFAULT_TIMEOUT, stale_key=None,
+                       lock_timeout=30, wait=5):
+        """Return the cached value for ``key``, computing it at most once across workers.
+
+        The first worker to miss takes a lock in L2 and runs ``compute()``.
+        The others serve the last value stored under ``stale_key`` if there is
+        one, setting ``served_stale``, otherwise poll L2 for up to ``wait``
+        seconds before computing themselves.
+        """
+        value = self.get(key)
+        if value is not None:
+            record_cache(key, 'hit')
+            return value
+
+        lock_key = f"{key}:lock"
+        if self.l2.add(lock_key, 1, lock_timeout):
+            record_cache(key, 'miss')
+            try:
+                value = compute()
+                self.set(key, value, timeout)
+                if stale_key:
+                    self.l2.set(stale_key, value, None)
+                return value
+            finally:
+                self.l2.delete(lock_key)
+
+        if stale_key:
+            value = self.l2.get(stale_key)
+            if value is not None:
+                record_cache(key, 'stale')
+                served_stale.set(True)
+                return value
+
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self.get(key)
+            if value is not None:
+                record_cache(key, 'hit')
+                return value
+        record_cache(key, 'miss')
+        return compute()
+
+    def _l1_key(self, key, version):
+        return f"{self.version if version is None else version}:{key}"
+
+    def _l1_get(self, l1_key):
+        with self._lock:
+            entry = self._l1.get(l1_key)
+            if entry is None:
+                return self._missing
+            expires, data = entry
+            if expires <= time.monotonic():
+                del self._l1[l1_key]
+                return self._missing
+            self._l1.move_to_end(l1_key)
+            return pickle.loads(data)
+
+    def _l1_set(self, l1_key, value, timeout=DEFAULT_TIMEOUT):
+        ttl = self._l1_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            if timeout <= 0:
+                self._l1_delete(l1_key)
+                return
+            ttl = min(ttl, timeout)
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[l1_key] = (time.monotonic() + ttl, data)
+            self._l1.move_to_end(l1_key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, l1_key):
+        with self._lock:
+            self._l1.pop(l1_key, None)
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT, stale_key=None):
+    """Single entry point for view caching; coalesces misses when the default cache is tiered."""
+    backend = caches['default']
+    if isinstance(backend, TieredCache):
+        return backend.get_or_compute(key, compute, timeout, stale_key=stale_key)
+
+    value = cache.get(key)
+    if value is not None:
+        record_cache(key, 'hit')
+        return value
+
+    record_cache(key, 'miss')
+    value = compute()
+    cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,49 @@
+"""Authentication backend that resolves the logged-in user from the cache.
+
+``AuthenticationMiddleware`` loads the user on every request. The cached
+copy sits next to the sessions in ``SESSION_CACHE_ALIAS``, which is shared
+by all workers, and is dropped whenever the user row changes (a password
+change included) or the user logs in or out; see ``signals.py``.
+Django still checks the session's password hash against the cached user,
+so sessions started before a password change stop working.
+
+The key is the user id alone, not the id plus a password-hash version as
+first planned. ``get_user`` only receives the id, so a hash component
+would have to come from the cached user itself or from another cache
+entry kept up to date by the same signals; neither notices a password
+written with ``QuerySet.update()`` or raw SQL without reading the user
+row, which is the query this cache removes. Code that changes passwords
+that way must call ``invalidate_user``; otherwise old sessions keep
+working for up to ``AUTH_USER_CACHE_TIMEOUT`` seconds.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from random_joke.metrics import record_cache
+
+
+def user_cache_key(user_id):
+    return f"auth_user_{user_id}"
+
+
+def user_cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def invalidate_user(user_id):
+    user_cache().delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = user_cache().get(key)
+        if user is not None:
+            record_cache(key, 'hit')
+        else:
+            record_cache(key, 'miss')
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            user_cache().set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
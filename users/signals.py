@@ -1,13 +1,25 @@
 import logging
-from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from .backends import invalidate_user
 
 logger = logging.getLogger('users')
 @receiver(user_logged_in)
 def log_login(sender, request, user, **kwargs):
-    logger.info(f"User {user.username} logged in successfully")
+    logger.info("User %s logged in successfully", user.username)
 
 @receiver(user_login_failed)
 def log_login_failed(sender, credentials, request, **kwargs):
     username = credentials.get('username', 'unknown')
-    logger.warning(f"Failed login attempt for username: {username}")
\ No newline at end of file
+    logger.warning("Failed login attempt for username: %s", username)
+
+@receiver([post_save, post_delete], sender=User)
+@receiver(user_logged_in)
+@receiver(user_logged_out)
+def invalidate_cached_user(sender, user=None, instance=None, **kwargs):
+    # Saves cover password changes and the last_login update of a login
+    user = user or instance
+    if user is not None:
+        invalidate_user(user.id)
\ No newline at end of file
@@ -0,0 +1,50 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from users.backends import CachedModelBackend, user_cache, user_cache_key
+
+
+@pytest.mark.django_db
+class TestCachedModelBackend:
+    @pytest.fixture
+    def user(self):
+        user = User.objects.create_user(username='myuser', password='Str0ngP@ssw0rd123!')
+        user_cache().delete(user_cache_key(user.id))
+        return user
+
+    def test_user_cached_after_first_lookup(self, user, django_assert_num_queries):
+        backend = CachedModelBackend()
+        with django_assert_num_queries(1):
+            backend.get_user(user.id)
+        with django_assert_num_queries(0):
+            assert backend.get_user(user.id) == user
+
+    def test_inactive_user_rejected(self, user):
+        backend = CachedModelBackend()
+        backend.get_user(user.id)
+        user.is_active = False
+        user.save()
+
+        assert backend.get_user(user.id) is None
+
+    def test_missing_user(self):
+        assert CachedModelBackend().get_user(999999) is None
+
+    def test_login_and_logout_invalidate(self, client, user):
+        client.login(username='myuser', password='Str0ngP@ssw0rd123!')
+        client.get(reverse('joke_app:favourites'))
+        assert user_cache().get(user_cache_key(user.id)) is not None
+
+        client.post(reverse('users:logout'))
+        assert user_cache().get(user_cache_key(user.id)) is None
+
+    def test_password_change_ends_other_sessions(self, client, user):
+        client.login(username='myuser', password='Str0ngP@ssw0rd123!')
+        response = client.get(reverse('joke_app:favourites'))
+        assert response.wsgi_request.user.is_authenticated
+
+        user.set_password('An0therP@ssw0rd456!')
+        user.save()
+
+        response = client.get(reverse('joke_app:favourites'))
+        assert not response.wsgi_request.user.is_authenticated
@@ -6,17 +6,17 @@ from django.contrib.auth.forms import UserCreationForm
 logger = logging.getLogger('users')
 
 def logout_view(request):
-    logger.info(f"Processing request: {request.method} {request.path}")
+    logger.info("Processing request: %s %s", request.method, request.path)
 
     if request.method == 'POST':
         user = request.user
         logout(request)
-        logger.info(f"{user} has been logged out")
+        logger.info("%s has been logged out", user)
         return render(request, 'users/logged_out.html')
 
 
 def register(request):
-    logger.info(f"Processing request: {request.method} {request.path}")
+    logger.info("Processing request: %s %s", request.method, request.path)
 
     if request.method == 'POST':
         form = UserCreationForm(data=request.POST)
@@ -24,13 +24,13 @@ def register(request):
         if form.is_valid():
             logger.info("Registration form is valid")
             new_user = form.save()
-            logger.info(f"New user {new_user.username} registered successfully")
+            logger.info("New user %s registered successfully", new_user.username)
                         
             login(request, new_user)
-            logger.info(f"User {new_user.username} logged in and redirected to index")
+            logger.info("User %s logged in and redirected to index", new_user.username)
             return redirect('joke_app:index')
         else:
-            logger.warning(f"Invalid registration form: {form.errors}")
+            logger.warning("Invalid registration form: %s", form.errors)
     else:
         logger.info("Displaying registration form")
         form = UserCreationForm()